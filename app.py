@@ -2,8 +2,14 @@ import streamlit as st
 
 import streamlit as st
 
+from src.warmup import start_warmup
+
 st.set_page_config(page_title="Silicus TA 2.0", page_icon="🎓")
 
+# load every course index and pre-answer the suggested questions in the
+# background (once per course version per process)
+start_warmup(st.secrets["MISTRAL_API_KEY"])
+
 st.title("Silicus TA 2.0  🎓🤖")
 st.markdown(
 """
@@ -20,7 +26,6 @@ Welcome to **Silicus TA 2.0**, your course‑aware teaching assistant.
 
 ### What Silicus *cannot* do (yet)
 * Reason about material **outside** the uploaded PDFs.  
-* Handle very large (> 8 K‑token) single pages without truncating.  
 * Guarantee 100 % accuracy—always verify critical answers.
 
 ### Student tips
@@ -30,7 +35,8 @@ Welcome to **Silicus TA 2.0**, your course‑aware teaching assistant.
 
 **How it works**  
 1. 📄 We pre‑OCR all lecture PDFs and store page‑level embeddings.  
-2. 🔍 When you ask a question, we pull the 10 most relevant pages.  
+2. 🔍 When you ask a question, we pull the 10 most relevant pages and keep
+   their most relevant passages within a fixed token budget.  
 3. 🤖 Mistral’s chat model answers using those excerpts (RAG).
 
 *No personal data is stored.* You can inspect the source on GitHub and fork it for your own courses!
@@ -0,0 +1,227 @@
+# benchmarks/bench_chat.py
+"""Offline benchmark of the Chat page's question path.
+
+For each store size a synthetic course is generated (see
+``synthetic_store``) and every question goes through the same calls as
+``pages/1_Silicus_TA.py``, with Mistral replaced by a local ``FakeMistral``:
+
+    load      cold ``CourseIndexCache.get`` (once per size)
+    embed     query embedding through ``QueryEmbeddingCache`` (cache miss)
+    retrieve  ``HybridRetriever.retrieve`` with the embedding already known
+    pages     ``CourseIndex.pages`` for the top-k rows
+    pack      ``pack_context``
+    ttft      generation, time to first streamed token
+    generate  generation, full stream
+    total     sum of the above for one question
+
+Reported per stage: p50/p95/p99 latency, throughput (ops/s) and peak
+traced memory (0 for ``ttft`` and ``total``, which overlap other stages);
+plus end-to-end questions/s at ``--concurrency``.  Limits in
+``thresholds.json`` (and, with ``--baseline``, a previous ``--json`` run)
+turn the run into a regression check: the exit status is 1 on any breach.
+
+    python -m benchmarks.bench_chat --sizes 1000 10000 100000 --queries 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from tabulate import tabulate
+
+from benchmarks.fake_mistral import FakeMistral, Latency
+from benchmarks.synthetic_store import sample_queries, synthetic_course
+from src.answer_stream import AnswerStreamer
+from src.context_packer import CONTEXT_TOKEN_BUDGET, count_tokens, pack_context
+from src.embedding_cache import QueryEmbeddingCache
+from src.hybrid_search import HybridRetriever
+from src.index_cache import CourseIndexCache
+from src.metrics import MetricsStore, set_metrics_store
+from src.mistral_client import SharedMistral
+
+HERE = Path(__file__).parent
+STAGES = ("load", "embed", "retrieve", "pages", "pack", "ttft", "generate", "total")
+
+
+class Recorder:
+    """Per-stage latency samples and peak traced memory."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.samples: dict[str, list[float]] = {s: [] for s in STAGES}
+        self.peak_mb: dict[str, float] = {}
+        self.trace_memory = trace_memory
+
+    @contextmanager
+    def stage(self, name: str):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t0 = time.perf_counter()
+        yield
+        self.samples[name].append(time.perf_counter() - t0)
+        if self.trace_memory:
+            peak = (tracemalloc.get_traced_memory()[1] - base) / 1_048_576
+            self.peak_mb[name] = max(self.peak_mb.get(name, 0.0), peak)
+
+    def summary(self) -> dict[str, dict]:
+        out = {}
+        for name, xs in self.samples.items():
+            if not xs:
+                continue
+            ms = np.array(xs) * 1000
+            out[name] = {"n": len(xs), "p50_ms": float(np.percentile(ms, 50)),
+                         "p95_ms": float(np.percentile(ms, 95)),
+                         "p99_ms": float(np.percentile(ms, 99)),
+                         "ops_per_s": float(len(xs) / (ms.sum() / 1000))}
+        return out
+
+
+class ChatPath:
+    """The Chat page's per-question calls, against one loaded course."""
+
+    def __init__(self, course_index, client: SharedMistral, mode: str, k: int = 10):
+        self.ci = course_index
+        self.client = client
+        self.streamer = AnswerStreamer("bench", client=client)
+        self.query_cache = QueryEmbeddingCache()
+        self.mode = mode
+        self.k = k
+
+    def ask(self, question: str, rec: Recorder) -> None:
+        t0 = time.perf_counter()
+        with rec.stage("embed"):
+            q_vec = self.query_cache.embed([question], self.client.embed)[0]
+        retriever = HybridRetriever(self.ci, embed_fn=lambda texts: [q_vec], deadline_s=None)
+        with rec.stage("retrieve"):
+            hit = retriever.retrieve(question, k=self.k, mode=self.mode)
+        with rec.stage("pages"):
+            top_pages = self.ci.pages(hit.rows)
+            top_pages["similarity"] = hit.scores
+        with rec.stage("pack"):
+            packed = pack_context(question, top_pages, budget=CONTEXT_TOKEN_BUDGET)
+        g0 = first = time.perf_counter()
+        with rec.stage("generate"):
+            for i, _ in enumerate(self.streamer.stream(question, packed.pages,
+                                                       course=self.ci.course)):
+                if i == 0:
+                    first = time.perf_counter()
+        rec.samples["ttft"].append(first - g0)
+        rec.samples["total"].append(time.perf_counter() - t0)
+
+
+def bench_size(n_pages: int, args, fake: FakeMistral) -> dict:
+    t0 = time.perf_counter()
+    parquet_path = synthetic_course(args.workdir, n_pages, dim=args.dim,
+                                    store_dtype=args.store_dtype)
+    build_s = time.perf_counter() - t0
+
+    rec = Recorder()
+    tracemalloc.start()
+    mem = Recorder(trace_memory=True)
+    with mem.stage("load"):
+        ci = CourseIndexCache().get(parquet_path.parent.name, parquet_path)
+    rec.samples["load"] = mem.samples["load"]
+
+    client = SharedMistral("bench", server_url=fake.url)
+    path = ChatPath(ci, client, args.mode)
+    questions = sample_queries(args.queries + args.warmup, seed=n_pages)
+    for q in questions[:args.warmup]:                  # tokenizer, first mmap touches
+        path.ask(q + " warmup", Recorder())
+    for q in questions[:3]:
+        path.ask(q + " traced", mem)
+    tracemalloc.stop()
+
+    for q in questions[args.warmup:]:
+        path.ask(q, rec)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        list(pool.map(lambda q: path.ask(q + " concurrent", Recorder()),
+                      questions[args.warmup:]))
+    qps = len(questions[args.warmup:]) / (time.perf_counter() - t0)
+
+    stages = rec.summary()
+    for name in stages:
+        stages[name]["peak_mb"] = round(mem.peak_mb.get(name, 0.0), 2)
+    return {"pages": n_pages, "build_s": round(build_s, 2), "mode": args.mode,
+            "ann": ci.ann is not None, "concurrency": args.concurrency,
+            "questions_per_s": round(qps, 2), "stages": stages}
+
+
+def check(results: list[dict], thresholds: dict, baseline: dict | None,
+          tolerance: float) -> list[str]:
+    """Threshold (and baseline) breaches, one line each."""
+    breaches = []
+    base = {r["pages"]: r for r in (baseline or {}).get("results", [])}
+    for res in results:
+        limits = {**thresholds.get("default", {}), **thresholds.get(str(res["pages"]), {})}
+        for stage, stats in res["stages"].items():
+            for metric, limit in limits.get(stage, {}).items():
+                if stats.get(metric, 0) > limit:
+                    breaches.append(f"{res['pages']} pages: {stage} {metric} "
+                                    f"{stats[metric]:.1f} > limit {limit}")
+            prev = base.get(res["pages"], {}).get("stages", {}).get(stage)
+            if prev and stats["p95_ms"] > tolerance * prev["p95_ms"] and stats["p95_ms"] > 1.0:
+                breaches.append(f"{res['pages']} pages: {stage} p95 {stats['p95_ms']:.1f} ms "
+                                f"> {tolerance:.2f} x baseline {prev['p95_ms']:.1f} ms")
+    return breaches
+
+
+def report(results: list[dict]) -> None:
+    for res in results:
+        print(f"\n{res['pages']:,} pages · mode={res['mode']} · ann={res['ann']} · "
+              f"build {res['build_s']} s · {res['questions_per_s']} questions/s "
+              f"at concurrency {res['concurrency']}")
+        rows = [[name, s["n"], s["p50_ms"], s["p95_ms"], s["p99_ms"], s["ops_per_s"],
+                 s["peak_mb"]] for name, s in res["stages"].items()]
+        print(tabulate(rows, headers=["stage", "n", "p50 ms", "p95 ms", "p99 ms", "ops/s",
+                                      "peak MB"], floatfmt=".2f"))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--dim", type=int, default=1024)
+    ap.add_argument("--mode", choices=["hybrid", "dense", "lexical"], default="hybrid")
+    ap.add_argument("--store-dtype", choices=["float32", "float16", "int8"], default="float32")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--embed-latency", type=float, default=Latency.embed_s)
+    ap.add_argument("--first-token-latency", type=float, default=Latency.first_token_s)
+    ap.add_argument("--token-latency", type=float, default=Latency.token_s)
+    ap.add_argument("--answer-tokens", type=int, default=Latency.answer_tokens)
+    ap.add_argument("--workdir", type=Path, default=HERE / ".data")
+    ap.add_argument("--thresholds", type=Path, default=HERE / "thresholds.json")
+    ap.add_argument("--baseline", type=Path, help="previous --json output to compare p95 against")
+    ap.add_argument("--tolerance", type=float, default=1.25)
+    ap.add_argument("--json", type=Path, help="write results here")
+    args = ap.parse_args(argv)
+
+    set_metrics_store(MetricsStore(args.workdir / "metrics"))   # keep the live log clean
+    count_tokens("warm")                               # load the tokenizer outside timings
+    latency = Latency(args.embed_latency, args.first_token_latency, args.token_latency,
+                      args.answer_tokens)
+    with FakeMistral(latency, dim=args.dim) as fake:
+        results = [bench_size(n, args, fake) for n in args.sizes]
+    report(results)
+
+    if args.json:
+        args.json.write_text(json.dumps({"latency": vars(latency), "results": results}, indent=2))
+    thresholds = json.loads(args.thresholds.read_text()) if args.thresholds.is_file() else {}
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+    breaches = check(results, thresholds, baseline, args.tolerance)
+    for line in breaches:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if breaches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# benchmarks/fake_mistral.py
+"""Local stand-in for the Mistral API with configurable latency.
+
+Serves the two endpoints the Chat page hits per question:
+
+* ``POST /v1/embeddings``        deterministic unit vectors (seeded by text)
+* ``POST /v1/chat/completions``  SSE stream of ``answer_tokens`` chunks
+
+and the ones a course build uses (no latency; the tests drive these):
+
+* ``POST /v1/files``, ``GET /v1/files/{id}/url``, ``DELETE /v1/files/{id}``
+* ``POST /v1/ocr``               ``ocr_pages`` pages of ``"<file> p<n>"``
+
+``fail_next(kind, *statuses)`` makes the next requests of one kind
+(``"embeddings"``, ``"chat"``, ``"files"``, ``"ocr"``) answer with those
+statuses in order (200 lets one through).  Every request is logged in
+``calls`` as ``(kind, monotonic time)``.
+
+Point a client at it with ``Mistral(api_key="x", server_url=fake.url)``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+@dataclass
+class Latency:
+    embed_s: float = 0.15          # per embeddings request
+    first_token_s: float = 0.40    # chat: time to first chunk
+    token_s: float = 0.01          # chat: gap between chunks
+    answer_tokens: int = 120
+
+
+def _vector(text: str, dim: int) -> list[float]:
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (v / np.linalg.norm(v)).round(6).tolist()
+
+
+class FakeMistral:
+    """Threaded HTTP server; use as a context manager."""
+
+    def __init__(self, latency: Latency | None = None, dim: int = 1024, ocr_pages: int = 2,
+                 retry_after: float | None = None):
+        self.latency = latency or Latency()
+        self.dim = dim
+        self.ocr_pages = ocr_pages
+        self.retry_after = retry_after           # header sent with injected 429 / 5xx
+        self.requests = {"embeddings": 0, "chat": 0, "files": 0, "ocr": 0}
+        self.calls: list[tuple[str, float]] = []
+        self.files: dict[str, str] = {}          # uploaded and not yet deleted: id -> name
+        self._faults: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "FakeMistral":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, kind: str, *statuses: int) -> None:
+        with self._lock:
+            self._faults.setdefault(kind, []).extend(statuses)
+
+    def _hit(self, kind: str) -> int:
+        """Count a request; the status it must answer with."""
+        with self._lock:
+            self.requests[kind] += 1
+            self.calls.append((kind, time.monotonic()))
+            faults = self._faults.get(kind)
+            return faults.pop(0) if faults else 200
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, obj: dict) -> None:
+                body = json.dumps(obj).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _fail(self, status: int) -> None:
+                body = json.dumps({"object": "error", "message": f"injected {status}"}).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                if fake.retry_after is not None:
+                    self.send_header("retry-after", str(fake.retry_after))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _file(self, file_id: str, name: str) -> dict:
+                return {"id": file_id, "object": "file", "bytes": 0, "created_at": 0,
+                        "filename": name, "purpose": "ocr", "sample_type": "ocr_input",
+                        "source": "upload"}
+
+            def do_GET(self):
+                m = re.fullmatch(r"/v1/files/([^/?]+)/url(?:\?.*)?", self.path)
+                if m is None:
+                    return self.send_error(404)
+                if (status := fake._hit("files")) != 200:
+                    return self._fail(status)
+                self._json({"url": f"{fake.url}/signed/{m.group(1)}"})
+
+            def do_DELETE(self):
+                m = re.fullmatch(r"/v1/files/([^/?]+)", self.path)
+                if m is None:
+                    return self.send_error(404)
+                if (status := fake._hit("files")) != 200:
+                    return self._fail(status)
+                with fake._lock:
+                    fake.files.pop(m.group(1), None)
+                self._json({"id": m.group(1), "object": "file", "deleted": True})
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("content-length", 0)))
+                lat = fake.latency
+                if self.path.startswith("/v1/files"):
+                    if (status := fake._hit("files")) != 200:
+                        return self._fail(status)
+                    m = re.search(rb'filename="([^"]+)"', raw)
+                    name = m.group(1).decode() if m else "upload.pdf"
+                    with fake._lock:
+                        file_id = f"file-{len(fake.calls)}"
+                        fake.files[file_id] = name
+                    return self._json(self._file(file_id, name))
+                body = json.loads(raw)
+                if self.path.startswith("/v1/ocr"):
+                    if (status := fake._hit("ocr")) != 200:
+                        return self._fail(status)
+                    file_id = body["document"]["document_url"].rsplit("/", 1)[-1]
+                    name = fake.files.get(file_id, file_id)
+                    return self._json({
+                        "model": body["model"], "usage_info": {"pages_processed": fake.ocr_pages},
+                        "pages": [{"index": i, "markdown": f"{name} p{i + 1}", "images": [],
+                                   "dimensions": None} for i in range(fake.ocr_pages)],
+                    })
+                if self.path.startswith("/v1/embeddings"):
+                    if (status := fake._hit("embeddings")) != 200:
+                        return self._fail(status)
+                    time.sleep(lat.embed_s)
+                    inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+                    return self._json({
+                        "id": "emb", "object": "list", "model": body["model"],
+                        "usage": {"prompt_tokens": 0, "total_tokens": 0, "completion_tokens": 0},
+                        "data": [{"object": "embedding", "index": i,
+                                  "embedding": _vector(t, fake.dim)} for i, t in enumerate(inputs)],
+                    })
+                if self.path.startswith("/v1/chat/completions"):
+                    if (status := fake._hit("chat")) != 200:
+                        return self._fail(status)
+                    return self._stream(body["model"], lat)
+                self.send_error(404)
+
+            def _stream(self, model: str, lat: Latency) -> None:
+                # HTTP/1.0 response: the stream ends when the connection closes
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.end_headers()
+                time.sleep(lat.first_token_s)
+                for i in range(lat.answer_tokens):
+                    if i:
+                        time.sleep(lat.token_s)
+                    content = f"word{i} " + ("[1] " if i % 40 == 39 else "")
+                    chunk = {"id": "cmpl", "object": "chat.completion.chunk", "created": 0,
+                             "model": model, "choices": [{
+                                 "index": 0, "delta": {"role": "assistant", "content": content},
+                                 "finish_reason": None}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
@@ -0,0 +1,101 @@
+# benchmarks/synthetic_store.py
+"""Synthetic course stores in the ``<course>_pages.parquet`` schema.
+
+Pages are grouped into lectures (``LectureN.pdf``, 40 slides each) and drawn
+from topic clusters: each page's text samples its topic's vocabulary and its
+embedding is the topic centroid plus noise, so both BM25 and cosine search
+see realistic structure.  The parquet is written in chunks; the derived
+files (mapped store, BM25, IVF) are then built with the app's own builders,
+exactly as ``update_course`` would.
+
+Building 1M x 1024 pages needs roughly 10 GB of RAM (``write_store`` and the
+IVF build hold the full matrix); 100k fits comfortably in 2 GB.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.ann_index import build_ann_index
+from src.embedding_store import stored_dtype, write_store
+from src.lexical_index import build_bm25_index
+
+SLIDES_PER_LECTURE = 40
+N_TOPICS = 64
+WORDS_PER_TOPIC = 200
+PAGE_WORDS = (40, 160)
+_CHUNK = 20_000
+_SCHEMA = pa.schema([
+    ("filename", pa.string()), ("page_number", pa.int64()), ("page_content", pa.string()),
+    ("file_path", pa.string()), ("embedding", pa.list_(pa.float32())),
+])
+
+
+def topic_words(seed: int = 0) -> list[list[str]]:
+    """Per-topic vocabularies of pronounceable pseudo-words."""
+    rng = np.random.default_rng(seed)
+    syll = [c + v for c in "bcdfgklmnprstvz" for v in "aeiou"]
+    return [["".join(rng.choice(syll, size=rng.integers(2, 5))) for _ in range(WORDS_PER_TOPIC)]
+            for _ in range(N_TOPICS)]
+
+
+def write_synthetic_parquet(path: Path, n_pages: int, dim: int = 1024, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    vocab = topic_words(seed)
+    centroids = rng.standard_normal((N_TOPICS, dim)).astype(np.float32)
+    tmp = path.with_name(path.name + ".tmp")
+    with pq.ParquetWriter(tmp, _SCHEMA) as writer:
+        for start in range(0, n_pages, _CHUNK):
+            rows = np.arange(start, min(start + _CHUNK, n_pages))
+            lecture = rows // SLIDES_PER_LECTURE + 1
+            topics = (lecture * 7 + rows % SLIDES_PER_LECTURE // 8) % N_TOPICS
+            emb = centroids[topics] + 0.8 * rng.standard_normal((len(rows), dim)).astype(np.float32)
+            texts = [" ".join(rng.choice(vocab[t], size=rng.integers(*PAGE_WORDS)))
+                     for t in topics]
+            names = [f"Lecture{n}.pdf" for n in lecture]
+            writer.write_table(pa.table({
+                "filename": names,
+                "page_number": (rows % SLIDES_PER_LECTURE + 1).astype(np.int64),
+                "page_content": texts,
+                "file_path": [f"pdfs/{n}" for n in names],
+                "embedding": pa.FixedSizeListArray.from_arrays(emb.ravel(), dim).cast(
+                    pa.list_(pa.float32())),
+            }, schema=_SCHEMA))
+    tmp.replace(path)
+
+
+def synthetic_course(root: Path, n_pages: int, dim: int = 1024,
+                     store_dtype: str = "float32", seed: int = 0) -> Path:
+    """Create (or reuse) ``root/synth<n>/synth<n>_pages.parquet`` and its indexes.
+
+    A reused course whose mapped store is in another dtype gets the store rewritten.
+    """
+    course = f"synth{n_pages}"
+    course_dir = root / course
+    parquet_path = course_dir / f"{course}_pages.parquet"
+    if not parquet_path.is_file():
+        course_dir.mkdir(parents=True, exist_ok=True)
+        write_synthetic_parquet(parquet_path, n_pages, dim, seed)
+        write_store(parquet_path, dtype=store_dtype)
+        build_bm25_index(parquet_path)
+        build_ann_index(course_dir)
+    elif stored_dtype(parquet_path) != store_dtype:
+        write_store(parquet_path, dtype=store_dtype)
+    return parquet_path
+
+
+def sample_queries(n: int, seed: int = 1) -> list[str]:
+    """Topic-word questions, with every fifth naming a lecture slide."""
+    rng = np.random.default_rng(seed)
+    vocab = topic_words(0)
+    out = []
+    for i in range(n):
+        words = " ".join(rng.choice(vocab[rng.integers(N_TOPICS)], size=4))
+        if i % 5 == 4:
+            out.append(f"What is on slide {rng.integers(1, SLIDES_PER_LECTURE)} of lecture 1?")
+        else:
+            out.append(f"Explain {words}")
+    return out
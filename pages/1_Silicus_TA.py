@@ -5,9 +5,21 @@ import pandas as pd
 import numpy as np
 import json
 
-from src.mistral_rag_pipeline import MistralRAGPipeline
+from src.mistral_client import get_mistral
+from src.ann_index import DEFAULT_NPROBE
+from src.index_cache import get_index_cache
+from src.embedding_cache import QueryEmbeddingCache
+from src.answer_cache import AnswerCache
+from src.course_catalog import get_course_catalog
+from src.answer_stream import AnswerStreamer, slide_link
+from src.citations import page_url
+from src.hybrid_search import HybridRetriever
+from src.context_packer import count_tokens, pack_context
+from src.chat_history import ConversationMemory
+from src.metrics import current_trace, span, trace
+from src.warmup import ANSWER_CACHE_PATH, QUERY_CACHE_PATH, SUGGESTED_QUESTIONS, start_warmup
 
-import base64, streamlit.components.v1 as components
+import streamlit.components.v1 as components
 
 # --------------------------------------------------------------------- #
 # ─── 0. Configuration ──────────────────────────────────────────────── #
@@ -15,19 +27,32 @@ st.set_page_config(page_title="Silicus TA", page_icon="💬")
 
 DATA_ROOT = Path(__file__).parents[1] / "data"      # data/<course>/
 DEFAULT_COURSE = "econ167"                          # fallback
+ANSWER_CACHE_THRESHOLD = 0.97                       # min question similarity to reuse
+INDEX_CACHE_MB = 1024                               # resident budget for all courses
+EMBED_DEADLINE_S = 2.0                              # then fall back to keyword search
+CONTEXT_TOKEN_BUDGET = 3000                         # excerpt tokens sent to the model
+HISTORY_TOKEN_CEILING = 600                         # summary + last turn sent to the model
 
-def discover_courses(root: Path) -> dict[str, Path]:
-    """Return {course_name: parquet_path} for every existing store."""
-    courses = {}
-    for p in root.glob("*/*_pages.parquet"):
-        course = p.parent.name          # folder name == course
-        courses[course] = p
-    return courses
-
-COURSES = discover_courses(DATA_ROOT)
+# {course: CourseRecord} for every built store; revalidated by stat, not rescanned
+catalog = get_course_catalog(DATA_ROOT)
+COURSES = catalog.records()
 if DEFAULT_COURSE not in COURSES and COURSES:
     DEFAULT_COURSE = sorted(COURSES)[0]
 
+@st.cache_resource
+def get_query_cache() -> QueryEmbeddingCache:
+    """One query-embedding cache per process, shared by every session/course."""
+    return QueryEmbeddingCache(disk_path=QUERY_CACHE_PATH)
+
+query_cache = get_query_cache()
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    """Semantic answer cache, keyed per course on the store version."""
+    return AnswerCache(ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD)
+
+answer_cache = get_answer_cache()
+
 # --------------------------------------------------------------------- #
 # ─── 1. Sidebar – course selector ───────────────────────────────────── #
 with st.sidebar.expander("👤 User settings", expanded=True):
@@ -38,37 +63,62 @@ with st.sidebar.expander("👤 User settings", expanded=True):
         index=sorted(COURSES).index(DEFAULT_COURSE),
     )
 
+# sessions that open the Chat page directly skip the home page's warm-up;
+# a no-op once this course's store version is warm (or backing off)
+start_warmup(st.secrets["MISTRAL_API_KEY"], [chosen_course])
+
 with st.sidebar.expander("💡 Suggested Questions", expanded=True):
     st.markdown("**Try asking:**")
-    st.markdown("""
-    * What are the key learning outcomes for this course?
-    * Explain the concept of MLE from lecture 3
-    * What's the professor's policy on late assignments?
-    * When is the final exam and what does it cover?
-    * How does regression relate to maximum likelihood?
-    """)
+    # pre-answered per course by src.warmup, so these are served from the answer cache
+    st.markdown("\n".join(f"* {q}" for q in SUGGESTED_QUESTIONS))
+
+with st.sidebar.expander("⚙️ Retrieval", expanded=False):
+    search_mode = st.radio(
+        "Search mode", ["hybrid", "dense", "lexical"], horizontal=True,
+        format_func={"hybrid": "Hybrid", "dense": "Semantic", "lexical": "Keyword"}.get,
+        help="Keyword search skips the embedding API call entirely.",
+    )
+    nprobe = st.slider(
+        "Search breadth (large courses only)",
+        min_value=1, max_value=64, value=DEFAULT_NPROBE,
+        help="Clusters scanned per question: higher = better recall, slower search.",
+    )
+    qc = query_cache.stats()
+    st.caption(f"Query-embedding cache: {qc['hits'] + qc['disk_hits']} hits / "
+               f"{qc['misses']} misses ({qc['hit_rate']:.0%})")
+    mc = get_mistral(st.secrets["MISTRAL_API_KEY"]).stats()
+    st.caption(f"Mistral requests: {mc['upstream_calls']} sent, "
+               f"{mc['coalesced']} shared with another session")
 
 
 # Reset chat if the user switched courses
 if "active_course" not in st.session_state or st.session_state.active_course != chosen_course:
     st.session_state.active_course = chosen_course
     st.session_state.messages = []        # wipe chat history
+    st.session_state.memory = ConversationMemory(HISTORY_TOKEN_CEILING)
 
 # --------------------------------------------------------------------- #
 # ─── 2. Load embeddings for the chosen course (cached) ─────────────── #
-@st.cache_resource(show_spinner="Loading embeddings …")
+@st.cache_resource
+def load_clients():
+    """One pooled, single-flight Mistral client shared by every course and session."""
+    client = get_mistral(st.secrets["MISTRAL_API_KEY"])
+    return client, AnswerStreamer(st.secrets["MISTRAL_API_KEY"], client=client)
+
+index_cache = get_index_cache(INDEX_CACHE_MB)
+
 def load_pipeline_and_df(course: str):
-    parquet_path = COURSES[course]
-    df = pd.read_parquet(parquet_path)
-    api_key = st.secrets["MISTRAL_API_KEY"]
-    pipeline = MistralRAGPipeline(api_key)
-    return pipeline, df
+    parquet_path = COURSES[course].parquet_path
+    with st.spinner("Loading embeddings …"):
+        entry = index_cache.get(course, parquet_path)   # reloads only if rebuilt
+    client, streamer = load_clients()
+    return client, streamer, entry
 
 if not COURSES:
     st.error("No course stores found in data/. Ask admin to upload PDFs.")
     st.stop()
 
-pipeline, df_pages = load_pipeline_and_df(chosen_course)
+client, streamer, course_index = load_pipeline_and_df(chosen_course)
 
 # --------------------------------------------------------------------- #
 # ─── 3. Chat UI  ────────────────────────────────────────────────────── #
@@ -96,106 +146,140 @@ if "prefill_chat" in st.session_state:
     """
     st.components.v1.html(js_code, height=0)
     
+def citation_url(course: str, filename: str, page_number: int) -> str | None:
+    """Served single-page PDF of a cited slide (extracted once, cached by deck hash)."""
+    return page_url(DATA_ROOT / course / "pdfs" / Path(filename).name, page_number)
+
+# Modal handler for ?slide=<course>|<file>|<page> citation links; the page PDF is
+# only extracted here, when a citation is actually clicked
+clicked = st.query_params.get("slide")
+if clicked:
+    link_course, _, rest = clicked.partition("|")
+    filename, sep, page_num = rest.rpartition("|")
+    url = (citation_url(link_course, filename, int(page_num))
+           if link_course in COURSES and sep and page_num.isdigit()
+           else None)                                        # ignore malformed links
+    if url:
+        with st.popover(f"PDF Source: {Path(filename).name}, Page {page_num}", use_container_width=True):
+            st.link_button("📄 Open page in new tab", url, use_container_width=True)
+    # Clear query param so refresh doesn't reopen
+    st.query_params.clear()
+
 if prompt:
     # ---- a) store + echo user ----
     st.session_state.messages.append({"role": "user", "content": prompt})
     with st.chat_message("user", avatar="🧑‍🎓"):
         st.markdown(prompt)
 
-    # ---- b) retrieval -------------
-    q_vec = pipeline._embed_batch([prompt])[0]
-    sims = 1 - np.array([
-        (np.dot(q_vec, emb) /
-         (np.linalg.norm(q_vec) * np.linalg.norm(emb)))
-        for emb in df_pages["embedding"]
-    ])
-    top_idx = sims.argsort()[:10]
-    top_pages = df_pages.iloc[top_idx].copy()
-    top_pages["similarity"] = 1 - sims[top_idx]
-
-    # ---- c) build chat‑history string (last 6 turns) ----
-    history = "\n".join(
-        f"{m['role']}: {m['content']}"
-        for m in st.session_state.messages[-6:]
-    )
+    with trace("chat", course=chosen_course, mode=search_mode) as chat_span:
+        memory = st.session_state.memory
 
-    # ----- d) generation -----
-    answer, numbered_sources = pipeline.generate_answer_with_links(
-        prompt, top_pages, course=chosen_course, chat_history=history, temperature=0.2
-    )
-    
-    # Add after generating the answer, before displaying it
-    avg_similarity = top_pages["similarity"].mean()
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        if avg_similarity > 0.60:
-            st.success("🎯 High confidence response")
-        elif avg_similarity > 0.45:
-            st.info("ℹ️ Medium confidence response")
+        # ---- b) retrieval (follow-ups borrow the previous question) ----
+        chat_trace = current_trace()
+
+        def embed_query(texts):
+            # runs on the retriever's embedding thread, so the trace is passed explicitly
+            with span("chat.embed", parent=chat_trace) as s:
+                misses = query_cache.misses
+                # the model the course's page vectors were built with (store.json)
+                model = course_index.embed_model
+                vecs = query_cache.embed(texts, lambda t: client.embed(t, model=model), model)
+                s["api_calls"] = query_cache.misses - misses
+                s["cache_hit"] = s["api_calls"] == 0
+                return vecs
+
+        retriever = HybridRetriever(course_index, embed_fn=embed_query,
+                                    deadline_s=EMBED_DEADLINE_S)
+        with span("chat.retrieve", nprobe=nprobe) as s:       # includes chat.embed
+            hit = retriever.retrieve(memory.retrieval_query(prompt), k=10, mode=search_mode,
+                                     nprobe=nprobe)
+            s["mode"] = hit.mode
+        q_vec = hit.q_vec                            # None on the keyword-only paths
+        with span("chat.pages", rows=len(hit.rows)):
+            top_pages = course_index.pages(hit.rows)     # texts loaded for these rows only
+        top_pages["similarity"] = hit.scores
+
+        # ---- c) bounded chat history: rolling summary + last turn verbatim ----
+        history = memory.render()
+
+        # ---- c2) pack the best passages of the retrieved pages into the budget ----
+        with span("chat.pack") as s:
+            packed = pack_context(prompt, top_pages, budget=CONTEXT_TOKEN_BUDGET)
+            s.update(context_tokens=packed.context_tokens, dropped_tokens=packed.dropped_tokens)
+
+        # ----- d) confidence badge (known as soon as retrieval is done) -----
+        course_version = course_index.store_version    # the snapshot actually served
+        page_set = list(zip(top_pages["filename"], top_pages["page_number"]))
+        with span("chat.answer_cache") as s:
+            cached = answer_cache.lookup(chosen_course, course_version, q_vec, page_set,
+                                         history=history, question=prompt)
+            s["cache_hit"] = chat_span["cached"] = cached is not None
+
+        avg_similarity = top_pages["similarity"].mean()
+        col1, col2 = st.columns([2, 1])
+        if q_vec is None:
+            # keyword results carry BM25 scores, which are not on the cosine scale
+            col1.info("🔎 Keyword match (no embedding used)")
         else:
-            st.warning("⚠️ Low confidence - please verify")
-    with col2:
-        st.metric("Relevance Score", f"{avg_similarity:.2f}", delta=None)
-
-    # Render assistant answer with live links
-    st.session_state.messages.append({"role": "assistant", "content": answer})
-    with st.chat_message("assistant", avatar="🤖"):
-        st.markdown(answer, unsafe_allow_html=True)
-
-        # Modal handler (one per citation click)
-        clicked = st.query_params.get("slide")
-        if clicked:
-            path, page_num = clicked.split("|")
-            pdf_path = Path(path)
-            if pdf_path.is_file():
-                # Create a temporary link to the PDF
-                st.session_state.pdf_view = {
-                    "path": pdf_path,
-                    "page": page_num
-                }
-                
-                # Open PDF in new tab
-                b64 = base64.b64encode(pdf_path.read_bytes()).decode()
-                pdf_url = f"data:application/pdf;base64,{b64}#page={page_num}"
-                
-                with st.popover(f"PDF Source: {pdf_path.name}, Page {page_num}", use_container_width=True):
-                    st.link_button("📄 Open PDF in new tab", pdf_url, use_container_width=True)
-                    
-                
-                # Clear query param so refresh doesn't reopen
-                st.query_params.clear()
-
-
-        with st.expander("📚 Sources", expanded=False):
-            for i, (_, row) in enumerate(top_pages.iterrows(), 1):
-                # Simple two-column layout
-                col1, col2 = st.columns([5, 1])
-                
-                with col1:
-                    st.markdown(f"**Source [{i}]** · {row.filename} (Page {row.page_number})")
-                    # Clean display for the excerpt
-                    st.text_area(
-                            label=f"Source content {i}",  # Meaningful label
-                            value=row.page_content, 
-                            height=150, 
-                            key=f"source_text_{i}",
-                            label_visibility="collapsed"  # Hide visually but keep for screen readers
-                        )
-                
-                with col2:
-                    # Add download button
-                    pdf_path = DATA_ROOT / chosen_course / "pdfs" / row.filename
-                    if pdf_path.exists():
-                        with open(pdf_path, "rb") as file:
-                            st.download_button(
-                                label="📄 PDF",
-                                data=file,
-                                file_name=row.filename,
-                                mime="application/pdf",
-                                key=f"dl_{i}_{row.filename.replace('.', '_')}"
+            with col1:
+                if avg_similarity > 0.60:
+                    st.success("🎯 High confidence response")
+                elif avg_similarity > 0.45:
+                    st.info("ℹ️ Medium confidence response")
+                else:
+                    st.warning("⚠️ Low confidence - please verify")
+            with col2:
+                st.metric("Relevance Score", f"{avg_similarity:.2f}", delta=None)
+        if cached is not None:
+            st.caption("⚡ Served from the answer cache")
+
+        # ----- e) generation, streamed token by token unless cached -----
+        with st.chat_message("assistant", avatar="🤖"):
+            if cached is not None:
+                answer, numbered_sources = cached
+                st.markdown(answer, unsafe_allow_html=True)
+            else:
+                answer_slot = st.empty()
+                with span("chat.generate", api_calls=1) as s:
+                    stream = streamer.stream(
+                        prompt, packed.pages, course=chosen_course, chat_history=history,
+                        temperature=0.2,
+                    )
+                    with answer_slot.container():
+                        st.write_stream(stream)
+                    s.update(ttft_ms=stream.ttft_ms, prompt_tokens=stream.prompt_tokens,
+                             coalesced=stream.coalesced,
+                             completion_tokens=count_tokens(stream.raw_answer))
+                answer, numbered_sources = stream.answer, stream.numbered_sources
+                answer_slot.markdown(answer, unsafe_allow_html=True)   # swap in live links
+                st.caption(f"🧮 Prompt: {stream.prompt_tokens} tokens "
+                           f"({packed.context_tokens} excerpt, {packed.dropped_tokens} trimmed)")
+                answer_cache.store(chosen_course, course_version, prompt, q_vec,
+                                   page_set, answer, numbered_sources, history=history)
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+            memory.update(prompt, answer)
+
+            with span("chat.sources", pages=len(packed.pages)), \
+                    st.expander("📚 Sources", expanded=False):
+                for i, (_, row) in enumerate(packed.pages.iterrows(), 1):
+                    # Simple two-column layout
+                    col1, col2 = st.columns([5, 1])
+
+                    with col1:
+                        st.markdown(f"**Source [{i}]** · {row.filename} (Page {row.page_number})")
+                        # Clean display for the excerpt
+                        st.text_area(
+                                label=f"Source content {i}",  # Meaningful label
+                                value=row.page_content, 
+                                height=150, 
+                                key=f"source_text_{i}",
+                                label_visibility="collapsed"  # Hide visually but keep for screen readers
                             )
-                
-                st.markdown("---")
-        
-        
-        
\ No newline at end of file
+
+                    with col2:
+                        # resolved to the single-page PDF by the ?slide= handler on click
+                        link = slide_link({"course": chosen_course, "filename": row.filename,
+                                           "page_number": row.page_number})
+                        st.markdown(f"[📄 Page]({link})")
+
+                    st.markdown("---")
@@ -1,6 +1,6 @@
 # pages/9_Admin.py  –  Streamlit Admin console
 from __future__ import annotations
-import base64, hashlib, json, os, shutil, tempfile
+import base64, hashlib, json, os, shutil, tempfile, time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Tuple
@@ -18,6 +18,8 @@ import base64, streamlit.components.v1 as components
 st.set_page_config(page_title="Silicus Admin", page_icon="🛠️")
 DATA_ROOT = Path(__file__).parents[1] / "data"         # data/<course>/
 MAX_COURSE_MB = 300                                    # hard cap
+BUILD_WORKERS = 4                                      # concurrent OCR/embed requests
+STORE_DTYPE = "float16"                                # mmap embedding store precision
 GH_API = "https://api.github.com"
 HEADERS = {"Authorization": f"token {st.secrets['GH_TOKEN']}"}
 GH_REPO = st.secrets["GH_REPO"]                        # "user/repo"
@@ -33,37 +35,115 @@ def safe_load_json(path: pathlib.Path) -> dict:
         return {}
 
 
-def discover_courses(root: Path) -> Dict[str, Path]:
-    """Return {slug: parquet_path} for every existing course store."""
-    return {p.parent.name: p for p in root.glob("*/*_pages.parquet")}
-
 def file_sha256(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
 
 def bytes_mb(n_bytes: int) -> float:
     return n_bytes / 1_048_576
 
-def folder_size(path: Path) -> float:
-    return bytes_mb(sum(f.stat().st_size for f in path.rglob("*") if f.is_file()))
+from src.metrics import get_metrics_store, span, trace     # noqa: E402
+# titles / counts / sizes come from the shared catalog, not a scan per rerun
+from src.course_catalog import get_course_catalog         # noqa: E402
+
+catalog = get_course_catalog(DATA_ROOT)
 
 # GitHub helper ------------------------------------------------------------- #
 def github_upsert(repo_path: str, content: bytes, msg: str):
     """Create/update a file in GitHub repo via REST."""
     url = f"{GH_API}/repos/{GH_REPO}/contents/{repo_path}"
-    resp = requests.get(url, headers=HEADERS)
-    sha = resp.json().get("sha") if resp.status_code == 200 else None
-    payload = {
-        "message": msg,
-        "branch": "main",
-        "content": base64.b64encode(content).decode("utf-8"),
-        **({"sha": sha} if sha else {}),
-    }
-    r = requests.put(url, headers=HEADERS, data=json.dumps(payload))
-    r.raise_for_status()
+    with span("github.upsert", api_calls=2, bytes=len(content)):
+        resp = requests.get(url, headers=HEADERS)
+        sha = resp.json().get("sha") if resp.status_code == 200 else None
+        payload = {
+            "message": msg,
+            "branch": "main",
+            "content": base64.b64encode(content).decode("utf-8"),
+            **({"sha": sha} if sha else {}),
+        }
+        r = requests.put(url, headers=HEADERS, data=json.dumps(payload))
+        r.raise_for_status()
     return r.json()["commit"]["sha"]
 
-# reuse the pipeline embedding routine
-from src.precompute_embeddings import process_course   # noqa: E402
+# rebuilds run in a background worker (only new / changed PDFs are re-embedded)
+from src.jobs import JobQueue, ensure_worker            # noqa: E402
+from src.github_publisher import GitHubPublisher        # noqa: E402
+from src.pdf_index import PdfHashIndex                  # noqa: E402
+from src.index_cache import get_index_cache             # noqa: E402
+from src.course_snapshots import rollback               # noqa: E402
+from src.course_store import published                  # noqa: E402
+from src.warmup import start_warmup                     # noqa: E402
+
+REPO_ROOT = Path(__file__).parents[1]
+# batched publisher: one commit per course change, unchanged blobs skipped
+publisher = GitHubPublisher(GH_REPO, st.secrets["GH_TOKEN"], api=GH_API)
+jobs = JobQueue()
+WORKER_ENV = {"MISTRAL_API_KEY": st.secrets["MISTRAL_API_KEY"],
+              "GH_TOKEN": st.secrets["GH_TOKEN"], "GH_REPO": GH_REPO}
+
+
+def queue_rebuild(slug: str, **params) -> None:
+    jobs.submit(slug, max_workers=BUILD_WORKERS, store_dtype=STORE_DTYPE, **params)
+    ensure_worker(jobs, WORKER_ENV)
+
+
+def fmt_eta(seconds: float | None) -> str:
+    if seconds is None:
+        return "estimating …"
+    return f"{seconds / 60:.0f} min" if seconds >= 90 else f"{seconds:.0f} s"
+
+
+def preload_live(slug: str) -> None:
+    """Let chat load the new live snapshot in the background, then switch to it."""
+    catalog.refresh(slug)
+    rec = catalog.get(slug)
+    if rec is not None and rec.parquet_path is not None:
+        get_index_cache().prefetch(slug, rec.parquet_path)
+        start_warmup(st.secrets["MISTRAL_API_KEY"], [slug])   # suggested answers, new version
+    else:
+        get_index_cache().invalidate(slug)                     # retired: every PDF deleted
+
+
+def job_panel(slug: str) -> None:
+    """Progress of the course's latest rebuild job (polled while it is active)."""
+    job = jobs.active(slug) or next(iter(jobs.jobs(slug)), None)
+    if job is None:
+        return
+    if job["status"] in ("queued", "running"):
+        # worker died (or its job's heartbeat went stale): re-queue, restart, resume
+        ensure_worker(jobs, WORKER_ENV)
+    prog = job.get("progress") or {}
+    if job["status"] == "queued":
+        st.info("⏳ Rebuild queued …")
+    elif job["status"] == "running":
+        done, total = prog.get("done", 0), prog.get("total") or 1
+        st.progress(min(done / total, 1.0),
+                    text=f"🔄 {prog.get('phase', 'starting').upper()}: {done}/{total} "
+                         f"{prog.get('unit', '')} · ETA {fmt_eta(prog.get('eta_s'))}")
+        if st.button("Cancel rebuild", key=f"cancel_{job['id']}"):
+            jobs.cancel(job["id"])
+    elif job["status"] == "done":
+        r = job["result"]
+        st.success(f"Embedded {len(r['added']) + len(r['updated'])} PDF(s), "
+                   f"removed {len(r['removed'])}, kept {len(r['unchanged'])} unchanged "
+                   f"({r['pages']} pages at {r['pages_per_sec']:.1f} pages/s, "
+                   f"{r.get('reuse_rate', 0):.0%} of embeddings reused, "
+                   f"{r.get('duplicates', 0)} duplicate pages merged; "
+                   f"live version {r.get('version')}). "
+                   + ("Committed to GitHub ✅" if r["commit"] else "GitHub already up to date ✅"))
+    elif job["status"] == "failed":
+        st.error("Rebuild failed – finished PDFs are checkpointed, so a retry resumes.")
+        with st.expander("Traceback"):
+            st.code(job.get("traceback", ""))
+    else:
+        st.warning("Rebuild cancelled.")
+    for err in job["errors"]:
+        st.caption(f"⚠️ {err}")
+
+    seen = f"job_seen_{job['id']}"
+    if job["status"] not in ("queued", "running") and not st.session_state.get(seen):
+        st.session_state[seen] = True
+        preload_live(slug)                   # sessions keep the old version until loaded
+        st.rerun()                           # full rerun stops the polling
 
 # --------------------------------------------------------------------------- #
 # 1.  ENHANCED ADMIN AUTH
@@ -108,7 +188,7 @@ with st.sidebar:
 # 2. COURSE CARDS
 st.title("🛠️ Silicus TA – Course Manager")
 
-COURSES = discover_courses(DATA_ROOT)
+COURSES = catalog.records()
 
 st.subheader("Existing courses")
 if COURSES:
@@ -121,24 +201,18 @@ if COURSES:
         for j in range(3):
             if i+j < len(COURSES):
                 slug = sorted(COURSES.keys())[i+j]
-                pq_path = COURSES[slug]
+                rec = COURSES[slug]
                 
                 with cols[j]:
                     # Simple card with border
                     st.markdown("---")
                     
                     # Course title
-                    meta_path = pq_path.parent / "meta.json"
-                    meta = safe_load_json(meta_path)
-                    st.subheader(meta.get('title', slug.upper()))
+                    st.subheader(rec.title)
                     
                     # Course stats
-                    pdf_dir = pq_path.parent / "pdfs"
-                    n_pdfs = len(list(pdf_dir.glob("*.pdf")))
-                    folder_mb = folder_size(pq_path.parent)
-                    
-                    st.write(f"📄 {n_pdfs} PDFs • 💾 {folder_mb:.1f} MB")
-                    st.write(f"🔄 Updated {datetime.fromtimestamp(pq_path.stat().st_mtime).date()}")
+                    st.write(f"📄 {rec.pdfs} PDFs • 📑 {rec.pages} pages • 💾 {rec.mb:.1f} MB")
+                    st.write(f"🔄 Updated {datetime.fromtimestamp(rec.updated).date()}")
                     
                     # Manage button
                     if st.button("Manage", key=f"manage_{slug}", use_container_width=True):
@@ -149,6 +223,59 @@ if COURSES:
 else:
     st.info("No courses yet. Use **Create new course** below.")
 
+# --------------------------------------------------------------------------- #
+# 2b. PERFORMANCE (spans recorded by src.metrics)
+@st.cache_data(ttl=60, show_spinner=False)
+def recent_spans(days: int) -> pd.DataFrame:
+    """Spans of the last ``days``; the log is re-read at most once a minute."""
+    return get_metrics_store().read(since=time.time() - days * 86_400)
+
+
+with st.expander("📈 Performance", expanded=False):
+    window = st.selectbox("Window", ["Last 24 hours", "Last 7 days", "Last 30 days"])
+    days = {"Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30}[window]
+    # the expander body runs on every rerun, so nothing is read until asked for
+    show = st.toggle("Load metrics", key="perf_show")
+    spans = recent_spans(days) if show else None
+    if spans is None:
+        st.caption("Turn on to load the recorded spans (cached for a minute).")
+    elif spans.empty:
+        st.info("No spans recorded yet – ask a question in the chat or rebuild a course.")
+    else:
+        spans["course"] = spans["course"].fillna("–")
+        courses = sorted(spans["course"].unique())
+        picked = st.multiselect("Courses", courses, default=courses)
+        spans = spans[spans["course"].isin(picked)]
+
+        st.markdown("**Latency by stage (ms)**")
+        pct = (spans.groupby(["course", "stage"])["ms"]
+               .describe(percentiles=[0.5, 0.95, 0.99])[["count", "50%", "95%", "99%"]]
+               .rename(columns={"50%": "p50", "95%": "p95", "99%": "p99"}))
+        st.dataframe(pct.round(1), use_container_width=True)
+
+        by_hour = spans.set_index("time")
+        chats = by_hour[by_hour["stage"] == "chat"]
+        if len(chats):
+            st.markdown("**Questions per hour**")
+            st.line_chart(chats.groupby("course").resample("1h").size().unstack(0).fillna(0))
+        if "api_calls" in spans:
+            st.markdown("**API calls per hour**")
+            calls = by_hour.dropna(subset=["api_calls"])
+            st.bar_chart(calls.groupby("stage")["api_calls"].resample("1h").sum()
+                         .unstack(0).fillna(0))
+        if "cache_hit" in spans:
+            st.markdown("**Cache hit rate**")
+            hits = spans.dropna(subset=["cache_hit"]).astype({"cache_hit": float})
+            st.dataframe(hits.groupby(["course", "stage"])["cache_hit"]
+                         .agg(["count", "mean"]).rename(columns={"mean": "hit rate"})
+                         .style.format({"hit rate": "{:.0%}"}), use_container_width=True)
+        if "prompt_tokens" in spans:
+            gen = spans.dropna(subset=["prompt_tokens"])
+            st.caption(f"Generation: {gen['prompt_tokens'].mean():.0f} prompt / "
+                       f"{gen['completion_tokens'].mean():.0f} completion tokens on average "
+                       f"over {len(gen)} answers; "
+                       f"TTFT p95 {gen['ttft_ms'].quantile(0.95):.0f} ms.")
+
 # --------------------------------------------------------------------------- #
 # 3. CREATE COURSE
 with st.expander("➕  Create new course", expanded="manage_slug" not in st.session_state):
@@ -167,27 +294,13 @@ with st.expander("➕  Create new course", expanded="manage_slug" not in st.sess
             course_dir.mkdir(parents=True, exist_ok=True)
             for f in new_pdf_files:
                 (course_dir / f.name).write_bytes(f.read())
+            catalog.refresh(new_slug)
 
-            # run embeddings right away
-            process_course(course_dir.parent, api_key=st.secrets["MISTRAL_API_KEY"])
-
-            # write meta
-            meta_path = course_dir.parent / "meta.json"
-            meta_path.write_text(json.dumps({
-                "title": new_title or new_slug.upper(),
-                "updated": datetime.utcnow().isoformat() + "Z"
-            }, indent=2))
-
-            # commit everything
-            for p in course_dir.parent.rglob("*"):
-                if p.is_file():
-                    rel = p.relative_to(Path(__file__).parents[1])
-                    github_upsert(str(rel).replace("\\", "/"),
-                                  p.read_bytes(),
-                                  f"{new_slug}: add {p.name}")
-
-            st.success("Course created and committed! Refreshing …")
-            st.cache_resource.clear()
+            # OCR + embed + single GitHub commit run in the background worker
+            queue_rebuild(new_slug, title=new_title or new_slug.upper(),
+                          message=f"{new_slug}: add course")
+            st.session_state.manage_slug = new_slug
+            st.success("Course created – building in the background …")
             st.rerun()
 
 
@@ -208,14 +321,15 @@ if "manage_slug" in st.session_state:
             meta["title"] = new_title.strip() or slug.upper()
             meta["updated"] = datetime.utcnow().isoformat() + "Z"
             meta_path.write_text(json.dumps(meta, indent=2))
+            catalog.refresh(slug)
 
-            github_upsert(
-                str(meta_path.relative_to(Path(__file__).parents[1])),
-                meta_path.read_bytes(),
-                f"{slug}: rename course to '{meta['title']}'"
-            )
-            st.success("Title updated!")
-            st.cache_resource.clear()
+            with trace("admin.publish", course=slug):
+                github_upsert(
+                    str(meta_path.relative_to(Path(__file__).parents[1])),
+                    meta_path.read_bytes(),
+                    f"{slug}: rename course to '{meta['title']}'"
+                )
+            st.success("Title updated!")     # title is not part of any cached index
             st.rerun()
         
     st.markdown("---")
@@ -236,31 +350,25 @@ if "manage_slug" in st.session_state:
         if delete_confirmed:
             if st.button("Confirm Deletion", type="primary", key=f"delete_button_{slug}"):
                 try:
-                    # Remove files from GitHub first
-                    for p in course_dir.rglob("*"):
-                        if p.is_file():
-                            rel_path = str(p.relative_to(Path(__file__).parents[1])).replace("\\", "/")
-                            url = f"{GH_API}/repos/{GH_REPO}/contents/{rel_path}"
-                            resp = requests.get(url, headers=HEADERS)
-                            if resp.status_code == 200:
-                                sha = resp.json().get("sha")
-                                payload = {
-                                    "message": f"Delete {slug} course files",
-                                    "branch": "main",
-                                    "sha": sha
-                                }
-                                requests.delete(url, headers=HEADERS, data=json.dumps(payload))
+                    # Remove files from GitHub first (one commit for the whole course)
+                    with trace("admin.publish", course=slug):
+                        publisher.delete_directory(course_dir.relative_to(REPO_ROOT).as_posix(),
+                                                   f"Delete {slug} course files")
                     
                     # Then delete local directory
                     shutil.rmtree(course_dir)
+                    catalog.refresh(slug)
                     st.session_state.pop("manage_slug", None)
-                    st.cache_resource.clear()
+                    get_index_cache().invalidate(slug)
                     st.success(f"Course '{slug}' deleted successfully")
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error deleting course: {e}")
 
     st.header(f"Manage course: {slug}")
+    active = jobs.active(slug) is not None
+    st.fragment(job_panel, run_every=2 if active else None)(slug)
+
     upload_files = st.file_uploader("Add / replace PDFs",
                                     type="pdf",
                                     accept_multiple_files=True,
@@ -272,19 +380,33 @@ if "manage_slug" in st.session_state:
 
     # ---------- DEDUP & SAVE ------------------------------------------------ #
     if st.button("Save PDFs to workspace") and upload_files:
-        saved, skipped = 0, 0
+        pdf_index = PdfHashIndex(course_dir)
+        saved, skipped, renamed = 0, 0, []
         for file in upload_files:
             b = file.read()
-            if any(file_sha256(b) == file_sha256(p.read_bytes()) for p in pdf_dir.glob("*.pdf")):
+            sha = file_sha256(b)
+            existing = pdf_index.lookup(sha)
+            if existing is not None:
                 skipped += 1
+                if existing != file.name:
+                    renamed.append(f"{file.name} = {existing}")
                 continue
-            (pdf_dir / file.name).write_bytes(b)
+            pdf_index.add(file.name, b, sha)
             saved += 1
-        st.success(f"Saved {saved}; skipped {skipped} duplicates.")
+        catalog.refresh(slug)
+        # shown after the rerun below (anything rendered now would be wiped)
+        st.session_state.pdf_notices = [("success", f"Saved {saved}; skipped {skipped} duplicates.")]
+        if renamed:
+            st.session_state.pdf_notices.append(
+                ("info", "Renamed duplicates of existing slides: " + ", ".join(renamed)))
         st.rerun()
+    for kind, text in st.session_state.pop("pdf_notices", []):
+        getattr(st, kind)(text)
 
-    st.write(f"📁  Current folder size: **{folder_size(course_dir):.1f} MB** / {MAX_COURSE_MB} MB")
-    if folder_size(course_dir) > MAX_COURSE_MB:
+    rec = catalog.get(slug)
+    folder_mb = rec.mb if rec is not None else 0.0
+    st.write(f"📁  Current folder size: **{folder_mb:.1f} MB** / {MAX_COURSE_MB} MB")
+    if folder_mb > MAX_COURSE_MB:
         st.error("Folder exceeds limit. Delete slides or split the course before embedding.")
         st.stop()
     
@@ -309,34 +431,30 @@ if "manage_slug" in st.session_state:
 
         # 🗑️  delete file
         if col3.button("🗑️ Delete", key=f"del_{p.name}"):
-            p.unlink()
-            st.warning(f"Deleted {p.name}")
+            PdfHashIndex(course_dir).remove(p.name)     # file + its hash entry
+            catalog.refresh(slug)
+            st.session_state.pdf_notices = [("warning", f"Deleted {p.name}")]
             st.rerun()
 
     # ---------- EMBED & COMMIT --------------------------------------------- #
-    if st.button("Rebuild embeddings ➜ Commit to GitHub"):
-        with st.spinner("Running OCR + embeddings … this may take a minute"):
-            process_course(course_dir, api_key=st.secrets["MISTRAL_API_KEY"])
-
-        # write / update meta.json
-        meta_path = course_dir / "meta.json"
-        meta = {"title": st.session_state.get("new_course_title", slug.upper()),
-                "updated": datetime.utcnow().isoformat() + "Z"}
-        meta_path.write_text(json.dumps(meta, indent=2))
-
-        # commit all PDFs, Parquet, meta to GitHub
-        changed_files: List[Tuple[Path, bytes]] = []
-        for p in course_dir.rglob("*"):
-            if p.is_file():
-                rel = p.relative_to(Path(__file__).parents[1])
-                changed_files.append((rel, p.read_bytes()))
-
-        for rel, b in changed_files:
-            github_upsert(str(rel).replace("\\", "/"),
-                          b,
-                          f"{slug}: update {rel.name}")
-
-        st.success("Committed to GitHub ✅")
-        st.toast("✅ Course updated!", icon="🎉")
-        st.cache_resource.clear()   # refresh cached embeddings in chat
+    force_rebuild = st.checkbox("Force full rebuild (re-OCR every PDF)", key=f"force_{slug}")
+    if st.button("Rebuild embeddings ➜ Commit to GitHub", disabled=active):
+        # OCR + embeddings on new / changed PDFs, ANN index, meta.json and one GitHub
+        # commit all run in the worker; progress shows at the top of this panel
+        queue_rebuild(slug, force=force_rebuild, message=f"{slug}: update course")
+        st.toast("Rebuild queued")
         st.rerun()
+
+    # ---------- ROLLBACK --------------------------------------------------- #
+    rec = catalog.get(slug)
+    if rec is not None and rec.previous:
+        st.caption(f"Live version: {rec.snapshot or 'none (no PDFs)'} · previous: {rec.previous}")
+        if st.button("↩️ Roll back to previous version", disabled=active):
+            restored = rollback(course_dir)
+            with trace("admin.publish", course=slug):
+                publisher.sync_directory(course_dir, REPO_ROOT,
+                                         f"{slug}: roll back to {restored}",
+                                         include=lambda p: published(course_dir, p))
+            preload_live(slug)
+            st.toast(f"Now serving {restored}")
+            st.rerun()
@@ -0,0 +1,214 @@
+# src/ann_index.py
+"""IVF (+ optional product-quantisation) approximate index written in NumPy.
+
+The index is persisted next to ``<course>_pages.parquet`` as
+``<course>_ivf.npz``.  It only stores the coarse clustering (and PQ codes);
+exact re-ranking reuses the normalised matrix held by ``VectorIndex``.  The
+file records the embed model and parquet version it was built from, so an
+index left over from another store is never loaded.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.course_store import parquet_version
+from src.embedding_store import store_embed_model
+from src.retrieval import VectorIndex, _l2_normalize
+
+ANN_MIN_PAGES = 20_000        # below this brute force is already sub-millisecond
+PQ_MIN_PAGES = 200_000        # from here probed lists are pre-scored with PQ codes
+PQ_SUB_DIM = 8                # dimensions per PQ sub-quantiser (pq_m = dim / 8)
+DEFAULT_NPROBE = 8
+_ASSIGN_CHUNK = 8192
+
+
+def ann_path_for(parquet_path: Path) -> Path:
+    """``data/x/x_pages.parquet`` -> ``data/x/x_ivf.npz``."""
+    stem = parquet_path.name.removesuffix("_pages.parquet")
+    return parquet_path.with_name(f"{stem}_ivf.npz")
+
+
+def _kmeans(x: np.ndarray, k: int, n_iter: int, rng: np.random.Generator,
+            spherical: bool) -> np.ndarray:
+    """Plain Lloyd iterations; spherical mode keeps centroids unit-length."""
+    centroids = x[rng.choice(len(x), size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        if spherical:
+            assign = np.argmax(x @ centroids.T, axis=1)
+        else:
+            d = (x * x).sum(1)[:, None] - 2 * x @ centroids.T + (centroids * centroids).sum(1)
+            assign = np.argmin(d, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, x)
+        counts = np.bincount(assign, minlength=k)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        # re-seed empty clusters from random points so no list goes unused
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), size=int(empty.sum()))]
+        if spherical:
+            _l2_normalize(centroids)
+    return centroids
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(len(x), dtype=np.int32)
+    for s in range(0, len(x), _ASSIGN_CHUNK):
+        out[s:s + _ASSIGN_CHUNK] = np.argmax(x[s:s + _ASSIGN_CHUNK] @ centroids.T, axis=1)
+    return out
+
+
+class IVFIndex:
+    """Inverted-file index over a ``VectorIndex``.
+
+    ``nprobe`` is the recall/latency knob: how many of the ``n_lists`` clusters
+    are scanned per query.  With ``pq_m > 0`` candidates are first scored with
+    PQ lookup tables and only the best ``refine * k`` are re-ranked exactly.
+    """
+
+    def __init__(self, base: VectorIndex, centroids: np.ndarray, order: np.ndarray,
+                 offsets: np.ndarray, codebooks: np.ndarray | None = None,
+                 codes: np.ndarray | None = None):
+        self.base = base
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.codebooks = codebooks        # (m, ks, d/m) or None
+        self.codes = codes                # (n, m) uint8, in ``order`` layout
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    # ------------------------------------------------------------------ #
+    @classmethod
+    def build(cls, base: VectorIndex, n_lists: int | None = None, pq_m: int = 0,
+              n_iter: int = 15, sample_size: int = 100_000, seed: int = 0) -> "IVFIndex":
+        x = base.matrix
+        n = len(x)
+        rng = np.random.default_rng(seed)
+        if n_lists is None:
+            n_lists = int(np.clip(4 * np.sqrt(n), 1, 4096))
+        n_lists = min(n_lists, n)
+        sample = x if n <= sample_size else x[rng.choice(n, sample_size, replace=False)]
+
+        centroids = _kmeans(sample, n_lists, n_iter, rng, spherical=True)
+        assign = _assign(x, centroids)
+        order = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=n_lists), out=offsets[1:])
+
+        codebooks = codes = None
+        if pq_m:
+            if base.dim % pq_m:
+                raise ValueError(f"pq_m={pq_m} must divide embedding dim {base.dim}")
+            sub = base.dim // pq_m
+            ks = min(256, len(sample))
+            codebooks = np.empty((pq_m, ks, sub), dtype=np.float32)
+            codes = np.empty((n, pq_m), dtype=np.uint8)
+            xo = x[order]
+            for j in range(pq_m):
+                part = slice(j * sub, (j + 1) * sub)
+                codebooks[j] = _kmeans(sample[:, part], ks, n_iter, rng, spherical=False)
+                for s in range(0, n, _ASSIGN_CHUNK):
+                    blk = xo[s:s + _ASSIGN_CHUNK, part]
+                    d = -2 * blk @ codebooks[j].T + (codebooks[j] ** 2).sum(1)
+                    codes[s:s + _ASSIGN_CHUNK, j] = np.argmin(d, axis=1)
+        return cls(base, centroids, order, offsets, codebooks, codes)
+
+    def save(self, path: Path, embed_model: str = "", version: str = "") -> None:
+        arrays = dict(centroids=self.centroids, order=self.order, offsets=self.offsets,
+                      n_rows=np.int64(len(self.base)), dim=np.int64(self.base.dim),
+                      embed_model=np.str_(embed_model), parquet_version=np.str_(version))
+        if self.codebooks is not None:
+            arrays.update(codebooks=self.codebooks, codes=self.codes)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, base: VectorIndex, embed_model: str | None = None,
+             version: str | None = None) -> "IVFIndex | None":
+        """Load an index; return None if it no longer matches ``base``.
+
+        ``embed_model`` / ``version`` (the store's parquet version), when given,
+        must match what the index was saved with.
+        """
+        if not path.is_file():
+            return None
+        with np.load(path) as z:
+            if int(z["n_rows"]) != len(base) or int(z["dim"]) != base.dim:
+                return None
+            for key, want in (("embed_model", embed_model), ("parquet_version", version)):
+                if want is not None and (key not in z or str(z[key]) != want):
+                    return None
+            return cls(base, z["centroids"], z["order"], z["offsets"],
+                       z["codebooks"] if "codebooks" in z else None,
+                       z["codes"] if "codes" in z else None)
+
+    # ------------------------------------------------------------------ #
+    def _candidates(self, q: np.ndarray, nprobe: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return (positions in ``order`` layout, row ids) of the probed lists."""
+        nprobe = min(max(nprobe, 1), self.n_lists)
+        lists = np.argpartition(-(self.centroids @ q), nprobe - 1)[:nprobe]
+        pos = np.concatenate([np.arange(self.offsets[l], self.offsets[l + 1]) for l in lists])
+        return pos, self.order[pos]
+
+    def search(self, q_vec, k: int = 10, nprobe: int = DEFAULT_NPROBE,
+               refine: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        q = _l2_normalize(np.array(q_vec, dtype=np.float32, ndmin=2, copy=True))[0]
+        pos, rows = self._candidates(q, nprobe)
+        if self.codebooks is not None and len(rows) > refine * k:
+            m, _, sub = self.codebooks.shape
+            lut = np.einsum("mkd,md->mk", self.codebooks, q.reshape(m, sub))
+            approx = lut[np.arange(m), self.codes[pos]].sum(1)
+            keep = np.argpartition(-approx, refine * k - 1)[:refine * k]
+            rows = rows[keep]
+        scores = self.base.score_rows(rows, q)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return rows[top], scores[top]
+
+    def search_batch(self, q_mat, k: int = 10, nprobe: int = DEFAULT_NPROBE):
+        """Top-k per query as (n_queries, k) arrays.
+
+        Probed lists can hold fewer than ``k`` rows; such queries are padded
+        with row -1 and score -inf.
+        """
+        qs = np.atleast_2d(q_mat)
+        rows = np.full((len(qs), k), -1, dtype=np.int64)
+        scores = np.full((len(qs), k), -np.inf, dtype=np.float32)
+        for i, q in enumerate(qs):
+            r, s = self.search(q, k, nprobe)
+            rows[i, :len(r)], scores[i, :len(s)] = r, s
+        return rows, scores
+
+
+def build_ann_index(course_dir: Path, min_pages: int = ANN_MIN_PAGES,
+                    pq_min_pages: int = PQ_MIN_PAGES, **kwargs) -> Path | None:
+    """Build and persist the IVF index for a course store if it is large enough.
+
+    Small courses get no index (and any stale one is removed) so the Chat page
+    falls back to exact brute-force search.  From ``pq_min_pages`` on the index
+    also gets PQ codes (``pq_m = dim / PQ_SUB_DIM``) unless ``pq_m`` is given.
+    The mapped store must be written first: its embed model is recorded.
+    """
+    parquet_path = next(course_dir.glob("*_pages.parquet"), None)
+    if parquet_path is None:
+        return None
+    out = ann_path_for(parquet_path)
+    df = pd.read_parquet(parquet_path, columns=["embedding"])
+    if len(df) < min_pages:
+        out.unlink(missing_ok=True)
+        return None
+    base = VectorIndex.from_frame(df)
+    if "pq_m" not in kwargs and len(df) >= pq_min_pages and base.dim % PQ_SUB_DIM == 0:
+        kwargs["pq_m"] = base.dim // PQ_SUB_DIM
+    IVFIndex.build(base, **kwargs).save(out, store_embed_model(parquet_path),
+                                        parquet_version(parquet_path))
+    return out
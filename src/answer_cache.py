@@ -0,0 +1,147 @@
+# src/answer_cache.py
+"""Semantic answer cache: reuse a generated answer for a near-identical question.
+
+A hit requires (1) the same course store version, (2) exactly the same set of
+retrieved pages, (3) the same prior conversation (a digest of the rendered
+chat history, so a follow-up is never answered from another thread) and
+(4) cosine similarity between question embeddings of at least ``threshold``.
+Answers retrieved without a question embedding (the "lecture 3" / "slide 12"
+keyword paths) are keyed on the normalised question text instead.
+Sources are stored as JSON.  Callers key on the version of the index they
+actually retrieved from, so a rebuild invalidates the cache without any
+explicit call.  Entries of other versions are expired lazily, once they are
+older than ``STALE_VERSION_TTL_S``: a process still serving the previous
+snapshot keeps its answers instead of purging and re-purging with another
+process that already serves the new one.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.97
+STALE_VERSION_TTL_S = 24 * 3600     # other-version entries outlive a rebuild this long
+EXPIRE_EVERY_S = 600                # per course, at most one expiry sweep this often
+
+
+def page_set_key(pages: Iterable[tuple[str, int]]) -> str:
+    """Order-independent key for a retrieved set of (filename, page_number)."""
+    items = sorted(f"{f}#{int(p)}" for f, p in pages)
+    return hashlib.sha1("\n".join(items).encode()).hexdigest()
+
+
+def context_key(pages: Iterable[tuple[str, int]], history: str = "") -> str:
+    """``page_set_key`` plus a digest of the conversation the question follows."""
+    if not history:
+        return page_set_key(pages)
+    digest = hashlib.sha1(history.encode()).hexdigest()
+    return f"{page_set_key(pages)}:{digest}"
+
+
+def question_key(question: str) -> str:
+    """Case- and whitespace-insensitive form of a question, for text-keyed entries."""
+    return " ".join(question.lower().split())
+
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    n = np.linalg.norm(v)
+    return v / n if n else v
+
+
+class AnswerCache:
+    """SQLite-backed, process-safe answer cache shared by all courses."""
+
+    def __init__(self, db_path: Path, threshold: float = DEFAULT_THRESHOLD,
+                 max_entries_per_course: int = 2000):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries_per_course
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        cols = [r[1] for r in self._db.execute("PRAGMA table_info(answers)")]
+        if cols and "sources_json" not in cols:
+            self._db.execute("DROP TABLE answers")    # pickled sources, history-blind keys
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY, course TEXT, version TEXT, page_key TEXT,"
+            " question TEXT, vec BLOB, answer TEXT, sources_json TEXT, created REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_lookup "
+                         "ON answers (course, version, page_key)")
+        self._db.commit()
+        self._next_expiry: dict[str, float] = {}
+        self.hits = self.misses = 0
+
+    def _expire(self, course: str, version: str) -> None:
+        """Drop a course's old entries built against other store versions."""
+        now = time.time()
+        if now < self._next_expiry.get(course, 0.0):
+            return
+        self._next_expiry[course] = now + EXPIRE_EVERY_S
+        self._db.execute("DELETE FROM answers WHERE course = ? AND version != ? AND created < ?",
+                         (course, version, now - STALE_VERSION_TTL_S))
+
+    def lookup(self, course: str, version: str, q_vec, pages: Iterable[tuple[str, int]],
+               history: str = "", question: str = "") -> tuple[str, Any] | None:
+        """Return (answer, numbered_sources) of the closest cached question, if any.
+
+        Without ``q_vec`` only an entry stored for the same ``question`` text hits.
+        """
+        key = context_key(pages, history)
+        with self._lock:
+            if q_vec is None:
+                text = question_key(question)
+                rows = self._db.execute(
+                    "SELECT question, answer, sources_json FROM answers "
+                    "WHERE course = ? AND version = ? AND page_key = ? AND vec IS NULL",
+                    (course, version, key)).fetchall()
+                for stored, answer, sources in rows:
+                    if question_key(stored) == text:
+                        self.hits += 1
+                        return answer, json.loads(sources)
+                self.misses += 1
+                return None
+            q = _unit(q_vec)
+            rows = self._db.execute(
+                "SELECT vec, answer, sources_json FROM answers "
+                "WHERE course = ? AND version = ? AND page_key = ? AND vec IS NOT NULL",
+                (course, version, key)).fetchall()
+            if rows:
+                mat = np.stack([np.frombuffer(r[0], dtype=np.float32) for r in rows])
+                sims = mat @ q
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self.hits += 1
+                    return rows[best][1], json.loads(rows[best][2])
+            self.misses += 1
+            return None
+
+    def store(self, course: str, version: str, question: str, q_vec,
+              pages: Iterable[tuple[str, int]], answer: str, numbered_sources: Any,
+              history: str = "") -> None:
+        with self._lock:
+            self._expire(course, version)
+            self._db.execute(
+                "INSERT INTO answers (course, version, page_key, question, vec, answer,"
+                " sources_json, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (course, version, context_key(pages, history), question,
+                 None if q_vec is None else _unit(q_vec).tobytes(), answer, json.dumps(numbered_sources), time.time()))
+            # keep only the newest N entries per course
+            self._db.execute(
+                "DELETE FROM answers WHERE course = ? AND id NOT IN ("
+                " SELECT id FROM answers WHERE course = ? ORDER BY id DESC LIMIT ?)",
+                (course, course, self.max_entries))
+            self._db.commit()
+
+    def invalidate(self, course: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM answers WHERE course = ?", (course,))
+            self._db.commit()
+            self._next_expiry.pop(course, None)
@@ -0,0 +1,132 @@
+# src/answer_stream.py
+"""Streaming variant of ``generate_answer_with_links``.
+
+``AnswerStreamer.stream(...)`` returns an ``AnswerStream``: iterate it (e.g.
+with ``st.write_stream``) to receive tokens as Mistral produces them; once it
+is exhausted ``.answer`` holds the text with live citation links and
+``.numbered_sources`` the sources those ``[n]`` markers refer to.
+"""
+from __future__ import annotations
+
+import re
+import time
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import quote
+
+import pandas as pd
+
+from src.context_packer import count_tokens
+from src.mistral_client import SharedMistral, get_mistral
+
+CHAT_MODEL = "mistral-large-latest"
+_CITATION = re.compile(r"\[(\d+)\]")
+
+SYSTEM_PROMPT = (
+    "You are Silicus, a teaching assistant for the course {course}. Answer the "
+    "student's question using only the numbered lecture excerpts below. Cite every "
+    "claim with the excerpt number in square brackets, e.g. [2]. If the excerpts do "
+    "not contain the answer, say so."
+)
+
+
+def number_sources(top_pages: pd.DataFrame, course: str = "") -> list[dict]:
+    """One entry per retrieved page, numbered in retrieval order from 1."""
+    return [
+        {"n": i, "course": course, "filename": row.filename,
+         "page_number": int(row.page_number), "file_path": getattr(row, "file_path", "")}
+        for i, row in enumerate(top_pages.itertuples(index=False), 1)
+    ]
+
+
+def slide_link(src: dict) -> str:
+    """Default citation target: the Chat page's ``?slide=<course>|<file>|<page>`` handler.
+
+    Only the deck's file name travels in the link; the handler resolves it under
+    the named course, so a link opened from another session's course still works.
+    """
+    name = Path(src["filename"]).name
+    return "?slide=" + quote(f"{src['course']}|{name}|{src['page_number']}", safe="|")
+
+
+def link_citations(text: str, numbered_sources: list[dict],
+                   link_for: Callable[[dict], str] = slide_link) -> str:
+    """Turn ``[n]`` markers into markdown links; only cited sources are resolved."""
+    by_n = {s["n"]: s for s in numbered_sources}
+    links: dict[int, str] = {}
+
+    def _link(m: re.Match) -> str:
+        src = by_n.get(int(m.group(1)))
+        if src is None:
+            return m.group(0)
+        if src["n"] not in links:
+            links[src["n"]] = link_for(src)
+        return f"[[{src['n']}]]({links[src['n']]})"
+
+    return _CITATION.sub(_link, text)
+
+
+def build_messages(question: str, top_pages: pd.DataFrame, sources: list[dict],
+                   course: str, chat_history: str) -> list[dict]:
+    context = "\n\n".join(
+        f"[{s['n']}] {s['filename']} (page {s['page_number']})\n{content}"
+        for s, content in zip(sources, top_pages["page_content"])
+    )
+    user = f"Excerpts:\n{context}\n\n"
+    if chat_history:
+        user += f"Conversation so far:\n{chat_history}\n\n"
+    user += f"Question: {question}"
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT.format(course=course)},
+        {"role": "user", "content": user},
+    ]
+
+
+class AnswerStream:
+    """Iterable of answer tokens; sources and linked answer are set at the end.
+
+    ``tokens`` is a ``ChatSubscription`` (a context manager yielding text deltas).
+    """
+
+    def __init__(self, tokens, numbered_sources: list[dict],
+                 link_for: Callable[[dict], str] = slide_link, prompt_tokens: int = 0,
+                 started: float | None = None):
+        self._tokens = tokens
+        self.coalesced = getattr(tokens, "coalesced", False)   # shared another session's call
+        self.numbered_sources = numbered_sources
+        self._link_for = link_for
+        self.prompt_tokens = prompt_tokens
+        self.raw_answer = ""
+        self.answer: str | None = None          # available once exhausted
+        self._started = started if started is not None else time.perf_counter()
+        self.ttft_ms: float | None = None       # request start -> first token
+
+    def __iter__(self) -> Iterator[str]:
+        parts: list[str] = []
+        with self._tokens as tokens:
+            for delta in tokens:
+                if not parts:
+                    self.ttft_ms = (time.perf_counter() - self._started) * 1000
+                parts.append(delta)
+                yield delta
+        self.raw_answer = "".join(parts)
+        self.answer = link_citations(self.raw_answer, self.numbered_sources, self._link_for)
+
+
+class AnswerStreamer:
+    """Streaming counterpart of ``MistralRAGPipeline.generate_answer_with_links``."""
+
+    def __init__(self, api_key: str, model: str = CHAT_MODEL,
+                 client: SharedMistral | None = None):
+        self.client = client or get_mistral(api_key)
+        self.model = model
+
+    def stream(self, question: str, top_pages: pd.DataFrame, course: str,
+               chat_history: str = "", temperature: float = 0.2,
+               link_for: Callable[[dict], str] = slide_link) -> AnswerStream:
+        sources = number_sources(top_pages, course)
+        messages = build_messages(question, top_pages, sources, course, chat_history)
+        started = time.perf_counter()
+        tokens = self.client.chat_stream(self.model, messages, temperature=temperature)
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        return AnswerStream(tokens, sources, link_for, prompt_tokens, started)
@@ -0,0 +1,79 @@
+# src/chat_history.py
+"""Bounded conversation memory for the Chat page.
+
+Keeps the most recent turn verbatim plus a compact rolling summary of the
+older ones (one extractive line per turn), trimmed oldest-first to stay
+under ``ceiling`` tokens.  The summary is updated incrementally after each
+answer, so prompt size no longer grows with the length of past answers.
+It also rewrites follow-ups ("what about slide 12?") into a self-contained
+retrieval query using the previous question.
+"""
+from __future__ import annotations
+
+import re
+
+from src.context_packer import count_tokens
+from src.lexical_index import tokenize
+
+HISTORY_TOKEN_CEILING = 600
+SUMMARY_LINE_TOKENS = 60
+_LINK = re.compile(r"\[(\[\d+\])\]\([^)]*\)")          # [[n]](url) -> [n]
+# follow-up = opens with a connective or a pronoun, ends on a bare pronoun
+# ("can you explain that?") or points back ("the previous slide"); a pronoun
+# used as a determiner mid-question ("... for this course?") does not count
+_FOLLOW_UP = re.compile(
+    r"^\s*(and|but|so|also|then|what about|how about)\b"
+    r"|^\s*(it|its|this|that|these|those|they|them)\b"
+    r"|\b(it|this|that|these|those|they|them)\W*$"
+    r"|\bthe (above|previous|last one)\b", re.I)
+
+
+def _first_sentences(text: str, max_tokens: int) -> str:
+    out = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", " ".join(text.split())):
+        candidate = f"{out} {sentence}".strip()
+        if out and count_tokens(candidate) > max_tokens:
+            break
+        out = candidate
+    return out
+
+
+class ConversationMemory:
+    def __init__(self, ceiling: int = HISTORY_TOKEN_CEILING):
+        self.ceiling = ceiling
+        self.summary: list[str] = []           # oldest first
+        self.last_turn: tuple[str, str] | None = None
+
+    def _summarize(self, question: str, answer: str) -> str:
+        answer = _first_sentences(_LINK.sub(r"\1", answer), SUMMARY_LINE_TOKENS)
+        return f"- Student asked: {' '.join(question.split())} → {answer}"
+
+    def update(self, question: str, answer: str) -> None:
+        """Fold the previous verbatim turn into the summary, keep this one verbatim."""
+        if self.last_turn is not None:
+            self.summary.append(self._summarize(*self.last_turn))
+        self.last_turn = (question, _LINK.sub(r"\1", answer))
+        while self.summary and count_tokens(self.render()) > self.ceiling:
+            self.summary.pop(0)
+
+    def render(self) -> str:
+        """History block for the generation prompt."""
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary))
+        if self.last_turn is not None:
+            q, a = self.last_turn
+            budget = self.ceiling - count_tokens("\n".join(parts)) - count_tokens(q) - 10
+            if count_tokens(a) > budget:
+                a = _first_sentences(a, max(budget, SUMMARY_LINE_TOKENS))
+            parts.append(f"user: {q}\nassistant: {a}")
+        return "\n\n".join(parts)
+
+    def retrieval_query(self, question: str) -> str:
+        """Self-contained search query; follow-ups borrow the previous question."""
+        if self.last_turn is None:
+            return question
+        if len(tokenize(question)) <= 3 or _FOLLOW_UP.search(question):
+            # current question first, so its own "slide N" wins in reference parsing
+            return f"{question} {self.last_turn[0]}"
+        return question
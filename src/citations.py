@@ -0,0 +1,60 @@
+# src/citations.py
+"""Serve cited PDF pages by reference instead of base64-inlining whole decks.
+
+A cited page is extracted once into ``static/citations/<sha>_p<page>.pdf``
+(keyed by the deck's content hash, so a replaced deck never serves stale
+pages) and linked through Streamlit static file serving
+(``server.enableStaticServing`` in ``.streamlit/config.toml``).  Payload size
+and render time therefore depend on one page, not on the deck.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+from pypdf import PdfReader, PdfWriter
+
+from src.hashing import file_sha256
+
+STATIC_ROOT = Path(__file__).parents[1] / "static"
+CITATION_DIR = STATIC_ROOT / "citations"
+STATIC_URL = "app/static"                  # Streamlit serves static/ here
+
+_hash_memo: dict[tuple[str, int, int], str] = {}
+_lock = threading.Lock()
+
+
+def deck_hash(pdf_path: Path) -> str:
+    """sha256 of a deck, memoised on (path, size, mtime) for the process."""
+    st = pdf_path.stat()
+    key = (str(pdf_path), st.st_size, st.st_mtime_ns)
+    with _lock:
+        if key not in _hash_memo:
+            _hash_memo[key] = file_sha256(pdf_path)
+        return _hash_memo[key]
+
+
+def page_pdf(pdf_path: Path, page_number: int) -> Path | None:
+    """Single-page PDF for a 1-based page, extracted on first request."""
+    out = CITATION_DIR / f"{deck_hash(pdf_path)[:20]}_p{int(page_number)}.pdf"
+    if out.is_file():
+        return out
+    reader = PdfReader(pdf_path)
+    if not 1 <= int(page_number) <= len(reader.pages):
+        return None
+    writer = PdfWriter()
+    writer.add_page(reader.pages[int(page_number) - 1])
+    CITATION_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(f"{out.name}.{threading.get_ident()}.tmp")
+    with open(tmp, "wb") as fh:
+        writer.write(fh)
+    tmp.replace(out)
+    return out
+
+
+def page_url(pdf_path: Path, page_number: int) -> str | None:
+    """Relative URL of the cited page, or None if the deck/page is missing."""
+    if not pdf_path.is_file():
+        return None
+    page = page_pdf(pdf_path, page_number)
+    return f"{STATIC_URL}/{page.relative_to(STATIC_ROOT).as_posix()}" if page else None
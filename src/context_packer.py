@@ -0,0 +1,90 @@
+# src/context_packer.py
+"""Token-budgeted context packing for the generation prompt.
+
+Retrieved pages are split into passages, each passage is scored against the
+question (term overlap weighted by the page's retrieval score) and the best
+passages are chosen greedily until ``budget`` tokens are used.  Tokens are
+counted with the ``mistral-common`` tokenizer.  The packed frame keeps the
+page rows (filename / page_number / file_path), so citations stay exact.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import pandas as pd
+from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+
+from src.lexical_index import tokenize
+
+CONTEXT_TOKEN_BUDGET = 3000
+PASSAGE_TOKENS = 180
+_PARAGRAPH = re.compile(r"\n\s*\n|\n(?=#)")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    return MistralTokenizer.v3(is_tekken=True).instruct_tokenizer.tokenizer
+
+
+def count_tokens(text: str) -> int:
+    return len(_encoder().encode(text, bos=False, eos=False)) if text else 0
+
+
+def split_passages(text: str, max_tokens: int = PASSAGE_TOKENS) -> list[str]:
+    """Paragraph-aligned chunks of at most ~``max_tokens`` tokens."""
+    pieces: list[str] = []
+    for para in filter(None, (p.strip() for p in _PARAGRAPH.split(text or ""))):
+        if count_tokens(para) <= max_tokens:
+            pieces.append(para)
+        else:
+            pieces.extend(s for s in _SENTENCE.split(para) if s.strip())
+    passages, cur, cur_tok = [], [], 0
+    for piece in pieces:
+        tok = count_tokens(piece)
+        if cur and cur_tok + tok > max_tokens:
+            passages.append("\n".join(cur))
+            cur, cur_tok = [], 0
+        cur.append(piece)
+        cur_tok += tok
+    if cur:
+        passages.append("\n".join(cur))
+    return passages
+
+
+@dataclass
+class PackedContext:
+    pages: pd.DataFrame        # one row per page that kept at least one passage
+    context_tokens: int
+    dropped_tokens: int        # retrieved text left out to honour the budget
+
+
+def pack_context(question: str, top_pages: pd.DataFrame,
+                 budget: int = CONTEXT_TOKEN_BUDGET) -> PackedContext:
+    q_terms = set(tokenize(question))
+    scores = top_pages["similarity"].to_numpy() if "similarity" in top_pages else None
+    candidates = []                       # (score, page_pos, passage_pos, text, tokens)
+    for pos, text in enumerate(top_pages["page_content"]):
+        page_weight = 1.0 / (pos + 1) if scores is None else max(float(scores[pos]), 0.0) + 1e-3
+        for j, passage in enumerate(split_passages(text)):
+            terms = set(tokenize(passage))
+            overlap = len(q_terms & terms) / len(q_terms) if q_terms else 0.0
+            # first passage carries the slide title; favour it slightly
+            score = page_weight * (1.0 + overlap + (0.25 if j == 0 else 0.0))
+            candidates.append((score, pos, j, passage, count_tokens(passage)))
+
+    chosen, used, total = [], 0, sum(c[4] for c in candidates)
+    for cand in sorted(candidates, key=lambda c: -c[0]):
+        if used + cand[4] <= budget:
+            chosen.append(cand)
+            used += cand[4]
+
+    by_page: dict[int, list[tuple[int, str]]] = {}
+    for _, pos, j, passage, _ in chosen:
+        by_page.setdefault(pos, []).append((j, passage))
+    keep = sorted(by_page)                                   # retrieval order
+    packed = top_pages.iloc[keep].copy()
+    packed["page_content"] = ["\n…\n".join(p for _, p in sorted(by_page[pos])) for pos in keep]
+    return PackedContext(packed, used, total - used)
@@ -0,0 +1,295 @@
+# src/course_builder.py
+"""Bounded-concurrency OCR + embedding for course rebuilds.
+
+PDFs are OCR'd in parallel, page texts are packed into the largest embedding
+batches the API accepts, every request goes through a shared token bucket,
+and 429 / 5xx / transport errors are retried with jittered exponential
+backoff.  Uploaded PDFs are deleted from the Files API once OCR is done.
+``server_url`` lets the whole thing run against a local fake Mistral server.
+
+With ``checkpoint_dir`` set, every finished PDF (keyed by content sha256)
+and every embedding batch (keyed by its texts) is saved there, so a build
+interrupted by a crash resumes without repeating finished requests.
+``progress(phase, done, total)`` is called as PDFs and batches complete.
+
+Page texts are looked up in a ``PageEmbeddingCache`` (shared by every
+course) before batching; only unseen texts are sent, once each.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, TypeVar
+
+import httpx
+import numpy as np
+import pandas as pd
+from mistralai import Mistral
+
+from src.embedding_cache import EMBED_MODEL, PageEmbeddingCache, page_key
+from src.metrics import current_trace, span
+from src.mistral_client import get_mistral
+
+OCR_MODEL = "mistral-ocr-latest"
+EMBED_BATCH_TOKENS = 16_000      # per-request token budget for mistral-embed
+EMBED_BATCH_MAX = 128            # max inputs per request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` requests/s with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= n:
+                    self._tokens -= n
+                    return
+                wait = (n - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_of(exc: Exception) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        resp = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+        status = getattr(resp, "status_code", None)
+    return status
+
+
+def _retry_after(exc: Exception) -> float | None:
+    resp = getattr(exc, "raw_response", None) or getattr(exc, "response", None)
+    value = getattr(resp, "headers", {}).get("retry-after") if resp is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class BuildStats:
+    pages: int = 0
+    pdfs: int = 0
+    api_calls: int = 0
+    retries: int = 0
+    seconds: float = 0.0
+    reused: int = 0          # page texts served by the page-embedding cache
+    embedded: int = 0        # page texts sent to the API
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.seconds if self.seconds else 0.0
+
+    @property
+    def reuse_rate(self) -> float:
+        total = self.reused + self.embedded
+        return self.reused / total if total else 0.0
+
+
+def pack_batches(texts: list[str], max_tokens: int = EMBED_BATCH_TOKENS,
+                 max_items: int = EMBED_BATCH_MAX) -> list[list[int]]:
+    """Greedy packing of text indices into batches under both limits.
+
+    Token counts are estimated conservatively (~3 chars/token) so a batch
+    never overshoots the real budget; an oversize text gets a batch of its own.
+    """
+    batches, cur, cur_tok = [], [], 0
+    for i, t in enumerate(texts):
+        tok = len(t) // 3 + 1
+        if cur and (cur_tok + tok > max_tokens or len(cur) >= max_items):
+            batches.append(cur)
+            cur, cur_tok = [], 0
+        cur.append(i)
+        cur_tok += tok
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+class ConcurrentCourseBuilder:
+    """OCR + embed a set of PDFs into ``*_pages.parquet`` rows."""
+
+    def __init__(self, api_key: str, max_workers: int = 4, requests_per_second: float = 5.0,
+                 max_retries: int = 6, base_delay: float = 0.5, max_delay: float = 30.0,
+                 server_url: str | None = None, client: Mistral | None = None,
+                 checkpoint_dir: Path | None = None,
+                 progress: Callable[[str, int, int], None] | None = None,
+                 page_cache: PageEmbeddingCache | None = None):
+        # pooled connections shared with the chat side; rate limiting stays per build
+        self.client = client or get_mistral(api_key, server_url).sdk
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = BuildStats()
+        self._stats_lock = threading.Lock()
+        self._parent: dict | None = None       # trace of the caller, for worker-thread spans
+        self.checkpoint_dir = checkpoint_dir
+        self.progress = progress
+        self._done: dict[str, int] = {}
+        self.resumed = 0                       # requests skipped thanks to checkpoints
+        self.page_cache = page_cache
+
+    def _checkpoint(self, kind: str, key: str, suffix: str) -> Path | None:
+        if self.checkpoint_dir is None:
+            return None
+        d = self.checkpoint_dir / kind
+        d.mkdir(parents=True, exist_ok=True)
+        return d / f"{key}{suffix}"
+
+    def _advance(self, phase: str, total: int) -> None:
+        with self._stats_lock:
+            self._done[phase] = done = self._done.get(phase, 0) + 1
+        if self.progress is not None:
+            self.progress(phase, done, total)
+
+    # ------------------------------------------------------------------ #
+    def _call(self, fn: Callable[[], T], counts: dict | None = None) -> T:
+        """Rate-limited call with full-jitter backoff on 429 / 5xx / transport errors.
+
+        ``counts`` (a span's attributes) accumulates ``api_calls`` / ``retries``.
+        """
+        counts = counts if counts is not None else {}
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._stats_lock:
+                self.stats.api_calls += 1
+            counts["api_calls"] = counts.get("api_calls", 0) + 1
+            try:
+                return fn()
+            except Exception as exc:
+                status = _status_of(exc)
+                transient = status in RETRY_STATUSES or isinstance(exc, httpx.TransportError)
+                if not transient or attempt == self.max_retries:
+                    raise
+                delay = _retry_after(exc)
+                if delay is None:
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                with self._stats_lock:
+                    self.stats.retries += 1
+                counts["retries"] = counts.get("retries", 0) + 1
+                time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def ocr_pdf(self, pdf: Path) -> list[dict]:
+        """Return one row (without embedding) per OCR'd page of ``pdf``."""
+        data = pdf.read_bytes()
+        ckpt = self._checkpoint("ocr", hashlib.sha256(data).hexdigest(), ".json")
+        if ckpt is not None and ckpt.is_file():
+            pages = json.loads(ckpt.read_text())
+            with self._stats_lock:
+                self.resumed += 1
+        else:
+            with span("build.ocr", parent=self._parent, pdf=pdf.name) as s:
+                uploaded = self._call(lambda: self.client.files.upload(
+                    file={"file_name": pdf.name, "content": data}, purpose="ocr"), s)
+                try:
+                    signed = self._call(
+                        lambda: self.client.files.get_signed_url(file_id=uploaded.id), s)
+                    resp = self._call(lambda: self.client.ocr.process(
+                        model=OCR_MODEL,
+                        document={"type": "document_url", "document_url": signed.url}), s)
+                finally:
+                    try:
+                        self._call(lambda: self.client.files.delete(file_id=uploaded.id), s)
+                    except Exception:
+                        s["orphaned_upload"] = uploaded.id    # never fail a build over cleanup
+                s["pages"] = len(resp.pages)
+            pages = [[page.index + 1, page.markdown] for page in resp.pages]
+            if ckpt is not None:
+                tmp = ckpt.with_name(ckpt.name + ".tmp")
+                tmp.write_text(json.dumps(pages))
+                tmp.replace(ckpt)
+        return [
+            {"filename": pdf.name, "page_number": number,
+             "page_content": markdown, "file_path": str(pdf)}
+            for number, markdown in pages
+        ]
+
+    def _embed_one_batch(self, texts: list[str]) -> list[np.ndarray]:
+        key = hashlib.sha256("\x00".join([EMBED_MODEL, *texts]).encode()).hexdigest()
+        ckpt = self._checkpoint("embed", key, ".npy")
+        if ckpt is not None and ckpt.is_file():
+            with self._stats_lock:
+                self.resumed += 1
+            return list(np.load(ckpt))
+        with span("build.embed", parent=self._parent, inputs=len(texts)) as s:
+            resp = self._call(lambda: self.client.embeddings.create(
+                model=EMBED_MODEL, inputs=[t or " " for t in texts]), s)
+        vecs = [np.asarray(d.embedding, dtype=np.float32) for d in resp.data]
+        if ckpt is not None:
+            tmp = ckpt.with_name(ckpt.name + ".tmp.npy")
+            np.save(tmp, np.stack(vecs))
+            tmp.replace(ckpt)
+        return vecs
+
+    def embed_texts(self, texts: list[str], pool: ThreadPoolExecutor | None = None
+                    ) -> list[np.ndarray]:
+        """Embeddings for ``texts``: cached pages first, each unseen text sent once."""
+        out: list[np.ndarray | None] = (self.page_cache.get_many(texts)
+                                        if self.page_cache is not None else [None] * len(texts))
+        owners: dict[str, list[int]] = {}
+        for i, (t, v) in enumerate(zip(texts, out)):
+            if v is None:
+                owners.setdefault(page_key(t), []).append(i)
+        todo = [idx[0] for idx in owners.values()]
+        with self._stats_lock:
+            self.stats.reused += len(texts) - len(todo)
+            self.stats.embedded += len(todo)
+
+        batches = pack_batches([texts[i] for i in todo])
+        run = pool.map if pool is not None else map
+
+        def embed_batch(b: list[int]) -> list[np.ndarray]:
+            batch = [texts[todo[j]] for j in b]
+            vecs = self._embed_one_batch(batch)
+            if self.page_cache is not None:
+                self.page_cache.put_many(batch, vecs)     # visible to concurrent builds
+            self._advance("embed", len(batches))
+            return vecs
+
+        for b, vecs in zip(batches, run(embed_batch, batches)):
+            for j, v in zip(b, vecs):
+                for i in owners[page_key(texts[todo[j]])]:
+                    out[i] = v
+        return out
+
+    def build(self, pdfs: list[Path]) -> pd.DataFrame:
+        """OCR ``pdfs`` concurrently, then embed all pages in packed batches."""
+        t0 = time.perf_counter()
+        self._parent = current_trace()
+
+        def ocr(pdf: Path) -> list[dict]:
+            rows = self.ocr_pdf(pdf)
+            self._advance("ocr", len(pdfs))
+            return rows
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            rows = [r for page_rows in pool.map(ocr, pdfs) for r in page_rows]
+            vecs = self.embed_texts([r["page_content"] for r in rows], pool)
+        for r, v in zip(rows, vecs):
+            r["embedding"] = v
+        self.stats.pdfs += len(pdfs)
+        self.stats.pages += len(rows)
+        self.stats.seconds += time.perf_counter() - t0
+        return pd.DataFrame(rows, columns=["filename", "page_number", "page_content",
+                                           "file_path", "embedding"])
@@ -0,0 +1,167 @@
+# src/course_catalog.py
+"""Process-wide catalog of the courses under ``data/``.
+
+One cached ``CourseRecord`` per course (title, page / PDF counts, published
+size, live snapshot and index version) replaces the per-rerun ``glob`` / ``rglob`` / JSON
+reads of the Chat and Admin pages.  Records are revalidated at most every
+``max_age_s`` seconds with a constant number of ``stat`` calls per course
+(course dir, ``pdfs/`` dir, snapshot pointer, live parquet, meta.json) and
+only rebuilt when that
+fingerprint moves.  Writes that do not touch a directory entry (a PDF or
+``meta.json`` overwritten in place) are reported with ``refresh(slug)``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from json import JSONDecodeError
+from pathlib import Path
+
+import pyarrow.parquet as pq
+
+from src.course_store import (POINTER_NAME, live_parquet, parquet_version, published,
+                              read_pointer, store_version)
+from src.embedding_store import store_paths
+
+DATA_ROOT = Path(__file__).parents[1] / "data"
+MAX_AGE_S = 2.0
+
+
+@dataclass(frozen=True)
+class CourseRecord:
+    slug: str
+    title: str
+    parquet_path: Path | None        # live snapshot; None until the first build finishes
+    pages: int
+    pdfs: int
+    bytes: int                       # what is published: inputs, meta, live snapshot
+    index_version: str | None        # parquet size + mtime (see ``parquet_version``)
+    store_version: str | None        # live snapshot id or parquet stats (answer-cache key)
+    updated: float | None            # parquet mtime
+    snapshot: str | None = None      # live snapshot id (None for legacy stores)
+    previous: str | None = None      # snapshot a rollback would restore
+
+    @property
+    def mb(self) -> float:
+        return self.bytes / 1_048_576
+
+
+def _stat_key(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _fingerprint(course_dir: Path) -> tuple:
+    parquet_path = live_parquet(course_dir)
+    return (_stat_key(course_dir), _stat_key(course_dir / "pdfs"),
+            _stat_key(course_dir / POINTER_NAME),
+            _stat_key(parquet_path) if parquet_path is not None else None,
+            _stat_key(course_dir / "meta.json"))
+
+
+def _page_count(parquet_path: Path) -> int:
+    try:
+        info = json.loads(store_paths(parquet_path)["info"].read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        info = {}
+    if info.get("parquet_version") == parquet_version(parquet_path):
+        return int(info["rows"])
+    return pq.ParquetFile(parquet_path).metadata.num_rows          # footer only
+
+
+def scan_course(course_dir: Path) -> CourseRecord:
+    """Build one record from disk (the only place that walks a course dir)."""
+    slug = course_dir.name
+    try:
+        meta = json.loads((course_dir / "meta.json").read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        meta = {}
+    size = sum(f.stat().st_size for f in course_dir.rglob("*")
+               if f.is_file() and published(course_dir, f))
+    n_pdfs = sum(1 for _ in (course_dir / "pdfs").glob("*.pdf"))
+    parquet_path = live_parquet(course_dir)
+    pointer = read_pointer(course_dir)
+    if parquet_path is None:                    # unbuilt, or retired with a rollback target
+        return CourseRecord(slug, meta.get("title", slug.upper()), None, 0, n_pdfs, size,
+                            None, None, None, None, pointer.get("previous"))
+    return CourseRecord(slug, meta.get("title", slug.upper()), parquet_path,
+                        _page_count(parquet_path), n_pdfs, size, parquet_version(parquet_path),
+                        store_version(parquet_path), parquet_path.stat().st_mtime,
+                        pointer.get("live"), pointer.get("previous"))
+
+
+class CourseCatalog:
+    def __init__(self, root: Path = DATA_ROOT, max_age_s: float = MAX_AGE_S):
+        self.root = root
+        self.max_age_s = max_age_s
+        self._records: dict[str, tuple[tuple, CourseRecord]] = {}
+        self._root_key: tuple | None = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.scans = 0
+
+    def _course_dirs(self) -> list[Path]:
+        if not self.root.is_dir():
+            return []
+        return [Path(e.path) for e in os.scandir(self.root)
+                if e.is_dir() and not e.name.startswith(".")]
+
+    def _revalidate(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked < self.max_age_s:
+            return
+        root_key = _stat_key(self.root)
+        slugs = (list(self._records) if root_key == self._root_key and not force
+                 else [d.name for d in self._course_dirs()])
+        fresh: dict[str, tuple[tuple, CourseRecord]] = {}
+        for slug in slugs:
+            course_dir = self.root / slug
+            fp = _fingerprint(course_dir)
+            if fp[0] is None:
+                continue                                # course dir deleted
+            cached = self._records.get(slug)
+            if cached is not None and cached[0] == fp:
+                fresh[slug] = cached
+            else:
+                fresh[slug] = (fp, scan_course(course_dir))
+                self.scans += 1
+        self._records, self._root_key, self._checked = fresh, root_key, now
+
+    # ------------------------------------------------------------------ #
+    def records(self, built_only: bool = True) -> dict[str, CourseRecord]:
+        """{slug: record}, sorted by slug; ``built_only`` skips courses without a store."""
+        with self._lock:
+            self._revalidate()
+            return {s: r for s, (_, r) in sorted(self._records.items())
+                    if r.parquet_path is not None or not built_only}
+
+    def get(self, slug: str) -> CourseRecord | None:
+        return self.records(built_only=False).get(slug)
+
+    def refresh(self, slug: str | None = None) -> None:
+        """Rescan ``slug`` (or everything) on the next read, after an Admin write."""
+        with self._lock:
+            if slug is None:
+                self._records.clear()
+            else:
+                self._records.pop(slug, None)
+            self._root_key = None
+            self._checked = 0.0
+
+
+_CATALOGS: dict[Path, CourseCatalog] = {}
+_CATALOG_LOCK = threading.Lock()
+
+
+def get_course_catalog(root: Path = DATA_ROOT) -> CourseCatalog:
+    """The process-wide catalog shared by the Chat and Admin pages."""
+    with _CATALOG_LOCK:
+        if root not in _CATALOGS:
+            _CATALOGS[root] = CourseCatalog(root)
+        return _CATALOGS[root]
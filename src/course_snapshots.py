@@ -0,0 +1,175 @@
+# src/course_snapshots.py
+"""Versioned course snapshots: stage, validate, promote, roll back.
+
+A rebuild never writes into the store the Chat page is serving:
+
+    stage()     versions/.staging-<id>/ for the builder to write into
+    validate()  parquet, mmap store, BM25 and IVF agree on rows / dimension
+    promote()   rename to versions/<id>/, then atomically replace CURRENT.json
+    rollback()  swap ``live`` and ``previous`` in CURRENT.json
+    retire()    ``live`` -> null when the last PDF is gone (nothing to validate)
+
+The previous snapshot is kept for rollback and for sessions still holding
+it; older ones are pruned on promotion.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from src.ann_index import IVFIndex, ann_path_for
+from src.course_store import (MANIFEST_NAME, POINTER_NAME, VERSIONS_DIR, live_parquet,
+                              parquet_version, read_pointer, snapshot_dir)
+from src.embedding_store import MappedCourseStore, store_embed_model, store_paths
+from src.lexical_index import BM25Index, bm25_path_for
+
+STAGING_PREFIX = ".staging-"
+
+
+class SnapshotInvalid(ValueError):
+    pass
+
+
+def _write_pointer(course_dir: Path, pointer: dict) -> None:
+    tmp = course_dir / (POINTER_NAME + ".tmp")
+    tmp.write_text(json.dumps(pointer, indent=2))
+    tmp.replace(course_dir / POINTER_NAME)
+
+
+def stage(course_dir: Path) -> Path:
+    """Fresh, empty staging directory (leftovers of crashed builds are removed)."""
+    versions = course_dir / VERSIONS_DIR
+    versions.mkdir(parents=True, exist_ok=True)
+    for old in versions.glob(f"{STAGING_PREFIX}*"):
+        shutil.rmtree(old, ignore_errors=True)
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:6]}"
+    staging = versions / f"{STAGING_PREFIX}{version}"
+    staging.mkdir()
+    return staging
+
+
+def validate(staging: Path, course: str) -> dict:
+    """Check a staged snapshot before anyone can read it; raises ``SnapshotInvalid``."""
+    parquet_path = staging / f"{course}_pages.parquet"
+    if not parquet_path.is_file():
+        raise SnapshotInvalid(f"{parquet_path.name} missing")
+    columns = [c for c in ("embedding", "duplicates")
+               if c in pq.ParquetFile(parquet_path).schema_arrow.names]
+    df = pd.read_parquet(parquet_path, columns=columns)
+    rows = len(df)
+    if rows == 0:
+        raise SnapshotInvalid("store has no pages")
+    dims = {len(e) for e in df["embedding"]}
+    if len(dims) != 1:
+        raise SnapshotInvalid(f"mixed embedding dimensions {sorted(dims)}")
+    dim = dims.pop()
+
+    live = live_parquet(staging.parents[1])
+    if live is not None:
+        try:
+            live_dim = json.loads(store_paths(live)["info"].read_text()).get("dim")
+        except (FileNotFoundError, json.JSONDecodeError):
+            live_dim = None
+        if live_dim and live_dim != dim:
+            raise SnapshotInvalid(f"embedding dimension {dim} != live {live_dim}")
+
+    store = MappedCourseStore.open(parquet_path)
+    if store is None:
+        raise SnapshotInvalid("mmap store missing or stale")
+    if len(store.index) != rows or store.index.dim != dim or len(store.meta) != rows:
+        raise SnapshotInvalid(f"mmap store {store.index.matrix.shape} != parquet ({rows}, {dim})")
+    if BM25Index.load(bm25_path_for(parquet_path), rows) is None:
+        raise SnapshotInvalid("BM25 index missing or built for another store")
+    ann = ann_path_for(parquet_path)
+    if ann.is_file() and IVFIndex.load(ann, store.index,
+                                       embed_model=store_embed_model(parquet_path),
+                                       version=parquet_version(parquet_path)) is None:
+        raise SnapshotInvalid("IVF index does not match the store")
+
+    try:
+        manifest = json.loads((staging / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        raise SnapshotInvalid(f"{MANIFEST_NAME} missing") from None
+    pages = rows + (sum(len(d) for d in df["duplicates"] if d is not None)
+                    if "duplicates" in df else 0)
+    expected = sum(f.get("rows") or 0 for f in manifest.get("files", {}).values())
+    if pages != expected:
+        raise SnapshotInvalid(f"{pages} pages in store, manifest lists {expected}")
+    return {"rows": rows, "dim": dim, "pages": pages}
+
+
+def _adopt_legacy(course_dir: Path) -> str | None:
+    """Hard-link a pre-snapshot store into ``versions/`` so it can be rolled back to."""
+    parquet_path = course_dir / f"{course_dir.name}_pages.parquet"
+    if not parquet_path.is_file():
+        return None
+    version = f"legacy-{int(parquet_path.stat().st_mtime)}"
+    target = snapshot_dir(course_dir, version)
+    target.mkdir(parents=True, exist_ok=True)
+    for src in (parquet_path, *store_paths(parquet_path).values(), bm25_path_for(parquet_path),
+                ann_path_for(parquet_path), course_dir / MANIFEST_NAME):
+        if src.is_file() and not (target / src.name).exists():
+            os.link(src, target / src.name)
+    return version
+
+
+def _remove_legacy(course_dir: Path) -> None:
+    for p in course_dir.iterdir():
+        if p.is_file() and (p.name.startswith(f"{course_dir.name}_") or p.name == MANIFEST_NAME):
+            p.unlink()
+
+
+def promote(course_dir: Path, staging: Path) -> str:
+    """Make the staged snapshot live; returns its version id."""
+    version = staging.name.removeprefix(STAGING_PREFIX)
+    staging.rename(snapshot_dir(course_dir, version))
+    old = read_pointer(course_dir)
+    previous = old.get("live") or _adopt_legacy(course_dir) or old.get("previous")
+    _write_pointer(course_dir, {"live": version, "previous": previous, "promoted": time.time()})
+    if old.get("live"):
+        # readers resolved the legacy paths before the first promotion; by now
+        # every catalog has moved on to the pointer
+        _remove_legacy(course_dir)
+    _prune(course_dir, (version, previous))
+    return version
+
+
+def retire(course_dir: Path) -> None:
+    """Stop serving the course (its last PDF was deleted); rollback can restore it.
+
+    An empty store is not a valid snapshot, so instead the pointer keeps only
+    ``previous`` and the course reads as unbuilt until PDFs are added again.
+    """
+    old = read_pointer(course_dir)
+    previous = old.get("live") or _adopt_legacy(course_dir) or old.get("previous")
+    _write_pointer(course_dir, {"live": None, "previous": previous, "promoted": time.time()})
+    _remove_legacy(course_dir)              # adopted above, so nothing is lost
+    _prune(course_dir, (previous,))
+
+
+def _prune(course_dir: Path, keep: tuple) -> None:
+    versions = course_dir / VERSIONS_DIR
+    if not versions.is_dir():
+        return
+    for d in versions.iterdir():
+        if d.name not in keep and not d.name.startswith(STAGING_PREFIX):
+            shutil.rmtree(d, ignore_errors=True)
+
+
+def rollback(course_dir: Path) -> str:
+    """Serve the previous snapshot again (the current one becomes ``previous``)."""
+    pointer = read_pointer(course_dir)
+    previous = pointer.get("previous")
+    if not previous or not snapshot_dir(course_dir, previous).is_dir():
+        raise SnapshotInvalid("no previous version to roll back to")
+    _write_pointer(course_dir, {"live": previous, "previous": pointer["live"],
+                                "promoted": time.time()})
+    return previous
@@ -0,0 +1,90 @@
+# src/course_store.py
+"""Small helpers describing an on-disk course store (data/<course>/).
+
+A built course keeps its store in versioned snapshots::
+
+    data/<course>/pdfs/                          inputs
+    data/<course>/versions/<id>/<course>_pages.parquet  (+ mmap store, BM25, IVF)
+    data/<course>/CURRENT.json                   {"live": <id>, "previous": <id>}
+
+``CURRENT.json`` is the only thing a promotion rewrites (see
+``src.course_snapshots``).  Courses built before snapshots have their
+store directly in ``data/<course>/`` and no pointer; they keep working.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from json import JSONDecodeError
+from pathlib import Path
+
+POINTER_NAME = "CURRENT.json"
+VERSIONS_DIR = "versions"
+MANIFEST_NAME = "manifest.json"      # per-PDF hashes, stored with each snapshot
+LEGACY_PDF_INDEX = "pdf_index.json"  # upload-dedupe cache, now under data/.cache
+
+
+def read_pointer(course_dir: Path) -> dict:
+    """``{"live", "previous", ...}`` of the course, or {} before its first snapshot."""
+    try:
+        return json.loads((course_dir / POINTER_NAME).read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        return {}
+
+
+def snapshot_dir(course_dir: Path, version: str) -> Path:
+    return course_dir / VERSIONS_DIR / version
+
+
+def live_dir(course_dir: Path) -> Path:
+    """Directory holding the live store (the course dir itself for legacy stores)."""
+    live = read_pointer(course_dir).get("live")
+    return snapshot_dir(course_dir, live) if live else course_dir
+
+
+def live_parquet(course_dir: Path) -> Path | None:
+    """The parquet the Chat page should serve, or None if the course is unbuilt."""
+    path = live_dir(course_dir) / f"{course_dir.name}_pages.parquet"
+    return path if path.is_file() else None
+
+
+def published(course_dir: Path, path: Path) -> bool:
+    """Whether ``path`` belongs in the repo: inputs, meta and the live snapshot only.
+
+    Older snapshots, a leftover ``pdf_index.json`` and, once a pointer exists,
+    leftover legacy store files at the course root stay local.
+    """
+    rel = path.relative_to(course_dir).parts
+    if rel == (LEGACY_PDF_INDEX,):
+        return False
+    pointer = read_pointer(course_dir)
+    if rel[0] == VERSIONS_DIR:
+        return len(rel) > 2 and rel[1] == pointer.get("live")
+    if len(rel) == 1 and pointer.get("live"):
+        return not (rel[0].startswith(f"{course_dir.name}_") or rel[0] == MANIFEST_NAME)
+    return True
+
+
+def course_dir_for(parquet_path: Path) -> Path:
+    """``data/<course>`` for a live, snapshot or legacy parquet path."""
+    parent = parquet_path.parent
+    return parent.parent.parent if parent.parent.name == VERSIONS_DIR else parent
+
+
+def store_version(parquet_path: Path) -> str:
+    """Answer-cache key of a built store: its snapshot id, no file reads.
+
+    Snapshots are immutable once promoted, so the id changes exactly when a
+    rebuild is promoted; PDFs uploaded but not yet built leave it alone.
+    Legacy stores without snapshots fall back to the parquet's own stats.
+    """
+    parent = parquet_path.parent
+    if parent.parent.name == VERSIONS_DIR:
+        return parent.name
+    return hashlib.sha1(parquet_version(parquet_path).encode()).hexdigest()[:16]
+
+
+def parquet_version(parquet_path: Path) -> str:
+    """Version of the embedding store alone (size + mtime of the parquet)."""
+    st = parquet_path.stat()
+    return f"{st.st_size}-{st.st_mtime_ns}"
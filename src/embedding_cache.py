@@ -0,0 +1,188 @@
+# src/embedding_cache.py
+"""Embedding caches.
+
+``QueryEmbeddingCache`` sits in front of query embedding.  It has two
+tiers: an in-process LRU bounded by bytes, and an optional SQLite file that
+survives restarts.  Keys are (embedding model, normalised prompt text).
+
+``PageEmbeddingCache`` is the content-addressed store of page embeddings
+consulted by course builds.  Keys are (embedding model, normalised page
+text) and the file is shared by every course and rebuild, so repeated
+boilerplate and readings are embedded once.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+EMBED_MODEL = "mistral-embed"
+PAGE_CACHE_PATH = Path(__file__).parents[1] / "data" / ".cache" / "page_embeddings.sqlite"
+_WS = re.compile(r"\s+")
+_MD_IMAGE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+
+
+def normalize_query(text: str) -> str:
+    """Case/whitespace/trailing-punctuation folding so trivial variants share a key."""
+    return _WS.sub(" ", text).strip().lower().rstrip("?!. ")
+
+
+def cache_key(text: str, model: str = EMBED_MODEL) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_query(text)}".encode()).hexdigest()
+
+
+def normalize_page(text: str) -> str:
+    """OCR markdown with image refs, case and whitespace folded away."""
+    return _WS.sub(" ", _MD_IMAGE.sub(" ", text or "")).strip().lower()
+
+
+def page_key(text: str, model: str = EMBED_MODEL) -> str:
+    return hashlib.sha256(f"{model}\x00{normalize_page(text)}".encode()).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU (size-evicted) with an optional on-disk tier."""
+
+    def __init__(self, max_bytes: int = 64 * 1_048_576, disk_path: Path | None = None,
+                 model: str = EMBED_MODEL):
+        self.max_bytes = max_bytes
+        self.model = model
+        self._mem: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.disk_hits = self.misses = 0
+
+        self._db = None
+        if disk_path is not None:
+            disk_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS qemb "
+                             "(key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+            self._db.commit()
+
+    # ------------------------------------------------------------------ #
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= old.nbytes
+        self._mem[key] = vec
+        self._mem_bytes += vec.nbytes
+        while self._mem_bytes > self.max_bytes and len(self._mem) > 1:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= evicted.nbytes
+
+    def get(self, text: str, model: str | None = None) -> np.ndarray | None:
+        key = cache_key(text, model or self.model)
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return vec
+            if self._db is not None:
+                row = self._db.execute("SELECT vec FROM qemb WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vec = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                    return vec
+            self.misses += 1
+            return None
+
+    def put(self, text: str, vec, model: str | None = None) -> np.ndarray:
+        key = cache_key(text, model or self.model)
+        vec = np.asarray(vec, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vec)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO qemb VALUES (?, ?)", (key, vec.tobytes()))
+                self._db.commit()
+        return vec
+
+    def embed(self, texts: Sequence[str], embed_fn: Callable[[list[str]], Sequence],
+              model: str | None = None) -> list[np.ndarray]:
+        """Serve cached vectors and send only the misses to ``embed_fn`` in one batch.
+
+        ``model`` (default: the cache's) keys the entries; ``embed_fn`` must use it.
+        """
+        out: list[np.ndarray | None] = [self.get(t, model) for t in texts]
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing:
+            fresh = embed_fn([texts[i] for i in missing])
+            for i, vec in zip(missing, fresh):
+                out[i] = self.put(texts[i], vec, model)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._mem),
+                "mem_mb": self._mem_bytes / 1_048_576,
+            }
+
+
+class PageEmbeddingCache:
+    """SQLite map page-text hash -> embedding, shared across courses and processes."""
+
+    def __init__(self, path: Path = PAGE_CACHE_PATH, model: str = EMBED_MODEL):
+        self.model = model
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("CREATE TABLE IF NOT EXISTS pemb "
+                         "(key TEXT PRIMARY KEY, vec BLOB NOT NULL)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_many(self, texts: Sequence[str]) -> list[np.ndarray | None]:
+        keys = [page_key(t, self.model) for t in texts]
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 500):              # SQLite variable limit
+                chunk = unique[i:i + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vec FROM pemb WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall()
+                found.update((k, np.frombuffer(v, dtype=np.float32)) for k, v in rows)
+            out = [found.get(k) for k in keys]
+            hit = sum(v is not None for v in out)
+            self.hits += hit
+            self.misses += len(out) - hit
+        return out
+
+    def put_many(self, texts: Sequence[str], vecs: Sequence) -> None:
+        rows = [(page_key(t, self.model), np.asarray(v, dtype=np.float32).tobytes())
+                for t, v in zip(texts, vecs)]
+        with self._lock:
+            self._db.executemany("INSERT OR REPLACE INTO pemb VALUES (?, ?)", rows)
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "reuse_rate": self.hits / lookups if lookups else 0.0}
+
+
+_PAGE_CACHES: dict[Path, PageEmbeddingCache] = {}
+_PAGE_CACHES_LOCK = threading.Lock()
+
+
+def get_page_embedding_cache(path: Path = PAGE_CACHE_PATH) -> PageEmbeddingCache:
+    """The process-wide page cache (one SQLite connection per file)."""
+    with _PAGE_CACHES_LOCK:
+        if path not in _PAGE_CACHES:
+            _PAGE_CACHES[path] = PageEmbeddingCache(path)
+        return _PAGE_CACHES[path]
@@ -0,0 +1,158 @@
+# src/embedding_store.py
+"""Compact, memory-mapped companion of ``<course>_pages.parquet``.
+
+Files written beside the parquet::
+
+    <course>_emb.npy           (n, d) L2-normalised float32 | float16 | int8
+    <course>_emb_scales.npy    (n,) float32 per-row scales (int8 only)
+    <course>_text.bin          UTF-8 page texts, concatenated
+    <course>_text_offsets.npy  (n + 1,) int64 byte offsets into text.bin
+    <course>_meta.parquet      filename / page_number / file_path (/ duplicates)
+    <course>_store.json        {"rows", "dim", "dtype", "parquet_version", "embed_model"}
+
+Embeddings and texts are opened with ``mmap``, so worker processes share the
+same OS pages and only the top-k texts that are displayed are ever decoded.
+Queries must be embedded with the store's ``embed_model``.
+"""
+from __future__ import annotations
+
+import json
+from json import JSONDecodeError
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.course_store import parquet_version
+from src.embedding_cache import EMBED_MODEL
+from src.retrieval import VectorIndex, _l2_normalize
+
+STORE_DTYPES = ("float32", "float16", "int8")
+META_COLUMNS = ["filename", "page_number", "file_path"]
+_SCORE_CHUNK = 65_536
+
+
+def store_paths(parquet_path: Path) -> dict[str, Path]:
+    stem = parquet_path.name.removesuffix("_pages.parquet")
+    d = parquet_path.parent
+    return {
+        "emb": d / f"{stem}_emb.npy",
+        "scales": d / f"{stem}_emb_scales.npy",
+        "text": d / f"{stem}_text.bin",
+        "offsets": d / f"{stem}_text_offsets.npy",
+        "meta": d / f"{stem}_meta.parquet",
+        "info": d / f"{stem}_store.json",
+    }
+
+
+def _read_info(parquet_path: Path) -> dict:
+    try:
+        return json.loads(store_paths(parquet_path)["info"].read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        return {}
+
+
+def store_is_current(parquet_path: Path) -> bool:
+    return _read_info(parquet_path).get("parquet_version") == parquet_version(parquet_path)
+
+
+def store_embed_model(parquet_path: Path) -> str:
+    """Model the store's page vectors came from (stores predating the field: the default)."""
+    return _read_info(parquet_path).get("embed_model", EMBED_MODEL)
+
+
+def stored_dtype(parquet_path: Path) -> str | None:
+    """dtype the mapped store was written in, or None if there is no store."""
+    return _read_info(parquet_path).get("dtype")
+
+
+def write_store(parquet_path: Path, dtype: str = "float32",
+                embed_model: str = EMBED_MODEL) -> None:
+    """(Re)write the mapped store from the parquet; ``store.json`` goes last."""
+    if dtype not in STORE_DTYPES:
+        raise ValueError(f"dtype must be one of {STORE_DTYPES}, got {dtype!r}")
+    paths = store_paths(parquet_path)
+    version = parquet_version(parquet_path)
+    df = pd.read_parquet(parquet_path)
+    paths["info"].unlink(missing_ok=True)          # readers ignore a half-written store
+
+    mat = (_l2_normalize(np.stack(df["embedding"].to_numpy()).astype(np.float32))
+           if len(df) else np.zeros((0, 0), dtype=np.float32))
+    if dtype == "int8":
+        scales = np.abs(mat).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        np.save(paths["scales"], scales.astype(np.float32))
+        mat = np.round(mat / scales[:, None]).astype(np.int8)
+    else:
+        paths["scales"].unlink(missing_ok=True)
+        mat = mat.astype(dtype)
+    np.save(paths["emb"], mat)
+
+    encoded = [t.encode("utf-8") for t in df["page_content"].fillna("")]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    paths["text"].write_bytes(b"".join(encoded))
+    np.save(paths["offsets"], offsets)
+    df[META_COLUMNS + [c for c in ("duplicates",) if c in df]].to_parquet(
+        paths["meta"], index=False)
+
+    paths["info"].write_text(json.dumps({
+        "rows": len(df), "dim": int(mat.shape[1]) if len(df) else 0,
+        "dtype": dtype, "parquet_version": version, "embed_model": embed_model}, indent=2))
+
+
+class MappedVectorIndex(VectorIndex):
+    """``VectorIndex`` over a memory-mapped, possibly quantised matrix."""
+
+    def __init__(self, matrix: np.ndarray, scales: np.ndarray | None = None):
+        self.matrix = matrix                      # already normalised on write
+        self.scales = scales
+
+    @property
+    def nbytes(self) -> int:
+        return 0                                  # page cache, shared across processes
+
+    def _rows_f32(self, rows) -> np.ndarray:
+        block = np.asarray(self.matrix[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows][:, None]
+        return block
+
+    def _scores(self, q: np.ndarray) -> np.ndarray:
+        out = np.empty((q.shape[0], len(self)), dtype=np.float32)
+        for s in range(0, len(self), _SCORE_CHUNK):
+            rows = slice(s, s + _SCORE_CHUNK)
+            out[:, rows] = q @ self._rows_f32(rows).T
+        return out
+
+    def score_rows(self, rows: np.ndarray, q: np.ndarray) -> np.ndarray:
+        return self._rows_f32(rows) @ q
+
+
+class MappedCourseStore:
+    """Lazily loaded course store: metadata eagerly, texts per requested row."""
+
+    def __init__(self, parquet_path: Path):
+        paths = store_paths(parquet_path)
+        self.info = _read_info(parquet_path)
+        scales = np.load(paths["scales"], mmap_mode="r") if self.info["dtype"] == "int8" else None
+        self.index = MappedVectorIndex(np.load(paths["emb"], mmap_mode="r"), scales)
+        self.meta = pd.read_parquet(paths["meta"])
+        self._offsets = np.load(paths["offsets"], mmap_mode="r")
+        self._text = (np.memmap(paths["text"], dtype=np.uint8, mode="r")
+                      if paths["text"].stat().st_size else np.zeros(0, dtype=np.uint8))
+
+    @classmethod
+    def open(cls, parquet_path: Path) -> "MappedCourseStore | None":
+        """Open the store if it exists and matches the current parquet."""
+        return cls(parquet_path) if store_is_current(parquet_path) else None
+
+    def text(self, row: int) -> str:
+        a, b = int(self._offsets[row]), int(self._offsets[row + 1])
+        return self._text[a:b].tobytes().decode("utf-8")
+
+    def pages(self, rows) -> pd.DataFrame:
+        """Frame in the parquet schema (minus embeddings) for just ``rows``."""
+        out = self.meta.iloc[rows].copy()
+        out["page_content"] = [self.text(int(r)) for r in rows]
+        return out
@@ -0,0 +1,111 @@
+# src/github_publisher.py
+"""Publish a course directory to GitHub as a single commit (Git Data API).
+
+Local files are compared against the remote tree by git blob SHA, so only
+changed blobs are uploaded; additions, updates and deletions then land in one
+tree + one commit + one ref update.  ``api`` can point at a local stand-in.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+from pathlib import Path
+from typing import Callable
+
+import requests
+
+from src.metrics import span
+
+GH_API = "https://api.github.com"
+
+
+def git_blob_sha(content: bytes) -> str:
+    """SHA-1 git assigns to a blob with this content."""
+    return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+
+
+class GitHubPublisher:
+    def __init__(self, repo: str, token: str, branch: str = "main", api: str = GH_API,
+                 session: requests.Session | None = None):
+        self.repo = repo
+        self.branch = branch
+        self.api = api.rstrip("/")
+        self.session = session or requests.Session()
+        self.session.headers.update({"Authorization": f"token {token}",
+                                     "Accept": "application/vnd.github+json"})
+        self.api_calls = 0
+
+    # ------------------------------------------------------------------ #
+    def _req(self, method: str, path: str, **kwargs) -> dict:
+        self.api_calls += 1
+        r = self.session.request(method, f"{self.api}/repos/{self.repo}{path}", **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+    def _head(self) -> tuple[str, str]:
+        """Return (commit sha, tree sha) of the branch tip."""
+        commit = self._req("GET", f"/git/ref/heads/{self.branch}")["object"]["sha"]
+        tree = self._req("GET", f"/git/commits/{commit}")["tree"]["sha"]
+        return commit, tree
+
+    def remote_blobs(self, tree_sha: str) -> dict[str, str]:
+        """{path: blob sha} for every file in the given tree."""
+        tree = self._req("GET", f"/git/trees/{tree_sha}", params={"recursive": "1"})
+        if tree.get("truncated"):
+            raise RuntimeError("GitHub truncated the recursive tree listing")
+        return {e["path"]: e["sha"] for e in tree["tree"] if e["type"] == "blob"}
+
+    def commit_changes(self, files: dict[str, bytes], message: str,
+                       prefix: str | None = None) -> str | None:
+        """Make the repo match ``files`` in one commit.
+
+        With ``prefix``, remote files under it that are absent from ``files``
+        are deleted.  Returns the new commit sha, or None if nothing changed.
+        """
+        with span("github.diff", files=len(files)) as s:
+            calls = self.api_calls
+            head, base_tree = self._head()
+            remote = self.remote_blobs(base_tree)
+            s["api_calls"] = self.api_calls - calls
+        scope = prefix.rstrip("/") + "/" if prefix is not None else None
+
+        entries = []
+        with span("github.upload") as s:
+            calls, sent = self.api_calls, 0
+            for path, content in sorted(files.items()):
+                if remote.get(path) == git_blob_sha(content):
+                    continue                                      # unchanged
+                blob = self._req("POST", "/git/blobs", json={
+                    "content": base64.b64encode(content).decode("ascii"), "encoding": "base64"})
+                entries.append({"path": path, "mode": "100644", "type": "blob",
+                                "sha": blob["sha"]})
+                sent += len(content)
+            s.update(blobs=len(entries), bytes=sent, api_calls=self.api_calls - calls)
+        if scope is not None:
+            for path in sorted(p for p in remote if p.startswith(scope) and p not in files):
+                entries.append({"path": path, "mode": "100644", "type": "blob", "sha": None})
+        if not entries:
+            return None
+
+        with span("github.commit", entries=len(entries), api_calls=3):
+            tree = self._req("POST", "/git/trees", json={"base_tree": base_tree, "tree": entries})
+            commit = self._req("POST", "/git/commits", json={
+                "message": message, "tree": tree["sha"], "parents": [head]})
+            self._req("PATCH", f"/git/refs/heads/{self.branch}", json={"sha": commit["sha"]})
+        return commit["sha"]
+
+    def sync_directory(self, local_dir: Path, repo_root: Path, message: str,
+                       include: Callable[[Path], bool] | None = None) -> str | None:
+        """Mirror ``local_dir`` (all files, recursively) into the repo in one commit.
+
+        Files rejected by ``include`` are left out, so they are deleted remotely.
+        """
+        prefix = local_dir.relative_to(repo_root).as_posix()
+        files = {p.relative_to(repo_root).as_posix(): p.read_bytes()
+                 for p in sorted(local_dir.rglob("*"))
+                 if p.is_file() and (include is None or include(p))}
+        return self.commit_changes(files, message, prefix=prefix)
+
+    def delete_directory(self, repo_prefix: str, message: str) -> str | None:
+        """Remove every file under ``repo_prefix`` in one commit."""
+        return self.commit_changes({}, message, prefix=repo_prefix)
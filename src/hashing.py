@@ -0,0 +1,17 @@
+# src/hashing.py
+"""Content hashes shared by the builder, the PDF index and citation caching.
+
+A leaf module (stdlib only), so importing it never drags in the build stack.
+"""
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+
+def file_sha256(path: Path, chunk: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while block := fh.read(chunk):
+            h.update(block)
+    return h.hexdigest()
@@ -0,0 +1,143 @@
+# src/hybrid_search.py
+"""Dense + BM25 retrieval with reciprocal-rank fusion and a hedged fallback.
+
+* ``dense``   – embedding + cosine (``VectorIndex`` / ``IVFIndex``)
+* ``lexical`` – BM25 only, no embedding call
+* ``hybrid``  – both lists fused with RRF
+
+Queries that name a slide or lecture ("slide 12", "lecture 3") take a
+lexical fast path restricted to the matching pages.  In dense/hybrid mode
+the embedding call gets ``deadline_s``; if it is late the answer is served
+from BM25 while the embedding finishes in the background (and still lands
+in the query-embedding cache for next time).
+"""
+from __future__ import annotations
+
+import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from src.retrieval import _l2_normalize
+
+RRF_K = 60
+MODES = ("hybrid", "dense", "lexical")
+_SLIDE = re.compile(r"\b(?:slide|page|p\.)\s*#?\s*(\d+)\b", re.I)
+_LECTURE = re.compile(r"\b(?:lecture|lec|deck)\s*#?\s*_?(\d+)\b", re.I)
+_EMBED_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed")
+
+
+@dataclass
+class RetrievalResult:
+    rows: np.ndarray
+    scores: np.ndarray          # cosine when q_vec is known, else BM25
+    q_vec: np.ndarray | None
+    mode: str                   # mode actually used ("lexical-fast", "lexical-fallback", …)
+
+
+def _file_number(filename: str) -> int | None:
+    m = re.search(r"(\d+)", filename)
+    return int(m.group(1)) if m else None
+
+
+class PageRefs:
+    """Per-row lecture / slide numbers, computed once per loaded course index."""
+
+    def __init__(self, meta: pd.DataFrame):
+        names = meta["filename"].astype(str)
+        lectures = [_file_number(n) if "lec" in n.lower() else None for n in names]
+        self.lecture = np.array([-1 if n is None else n for n in lectures], dtype=np.int64)
+        self.page = meta["page_number"].to_numpy(dtype=np.int64)
+        dup_rows, dup_pages = [], []            # pages a deduped row also stands for
+        if "duplicates" in meta:
+            for row, dups in enumerate(meta["duplicates"]):
+                for ref in (dups if dups is not None else []):
+                    dup_rows.append(row)
+                    dup_pages.append(int(ref.rsplit("#", 1)[1]))
+        self.dup_rows = np.array(dup_rows, dtype=np.int64)
+        self.dup_pages = np.array(dup_pages, dtype=np.int64)
+
+    def match(self, lecture: int | None, slide: int | None) -> np.ndarray:
+        mask = np.ones(len(self.page), dtype=bool)
+        if lecture is not None:
+            mask &= self.lecture == lecture
+        if slide is not None:
+            on_page = self.page == slide
+            on_page[self.dup_rows[self.dup_pages == slide]] = True
+            mask &= on_page
+        return np.flatnonzero(mask)
+
+
+def reference_rows(query: str, refs: PageRefs) -> np.ndarray | None:
+    """Rows matching explicit "slide N" / "lecture N" references, if any."""
+    slide, lecture = _SLIDE.search(query), _LECTURE.search(query)
+    if not slide and not lecture:
+        return None
+    rows = refs.match(int(lecture.group(1)) if lecture else None,
+                      int(slide.group(1)) if slide else None)
+    return rows if len(rows) else None
+
+
+def rrf(rankings: list[np.ndarray], k: int) -> np.ndarray:
+    fused: dict[int, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            fused[int(row)] = fused.get(int(row), 0.0) + 1.0 / (RRF_K + rank + 1)
+    return np.array(sorted(fused, key=fused.get, reverse=True)[:k], dtype=np.int64)
+
+
+class HybridRetriever:
+    def __init__(self, course_index, embed_fn: Callable[[list[str]], list],
+                 deadline_s: float | None = 2.0):
+        self.ci = course_index
+        self.embed_fn = embed_fn
+        self.deadline_s = deadline_s
+
+    def _dense(self, q_vec, k: int, nprobe: int):
+        if self.ci.ann is not None:
+            return self.ci.ann.search(q_vec, k=k, nprobe=nprobe)
+        return self.ci.index.search(q_vec, k=k)
+
+    def _lexical(self, query: str, k: int, rows: np.ndarray | None = None):
+        bm25 = self.ci.bm25
+        if rows is None:
+            return bm25.search(query, k)
+        s = bm25.scores(query, rows)
+        order = np.argsort(-s, kind="stable")[:k]      # ties keep page order
+        return rows[order], s[order]
+
+    def _cosine(self, rows: np.ndarray, q_vec) -> np.ndarray:
+        q = _l2_normalize(np.array(q_vec, dtype=np.float32, ndmin=2, copy=True))[0]
+        return self.ci.index.score_rows(rows, q)
+
+    def retrieve(self, query: str, k: int = 10, mode: str = "hybrid",
+                 nprobe: int = 8) -> RetrievalResult:
+        has_bm25 = self.ci.bm25 is not None
+        if has_bm25:
+            ref = reference_rows(query, self.ci.refs)
+            if ref is not None:
+                rows, s = self._lexical(query, k, ref)
+                return RetrievalResult(rows, s, None, "lexical-fast")
+            if mode == "lexical":
+                rows, s = self._lexical(query, k)
+                return RetrievalResult(rows, s, None, "lexical")
+        else:
+            mode = "dense"
+
+        future = _EMBED_POOL.submit(lambda: self.embed_fn([query])[0])
+        try:
+            q_vec = future.result(timeout=self.deadline_s if has_bm25 else None)
+        except FutureTimeout:
+            rows, s = self._lexical(query, k)
+            return RetrievalResult(rows, s, None, "lexical-fallback")
+
+        if mode == "dense":
+            rows, s = self._dense(q_vec, k, nprobe)
+            return RetrievalResult(rows, s, q_vec, "dense")
+        dense_rows, _ = self._dense(q_vec, 5 * k, nprobe)
+        lex_rows, _ = self._lexical(query, 5 * k)
+        rows = rrf([dense_rows, lex_rows], k)
+        return RetrievalResult(rows, self._cosine(rows, q_vec), q_vec, "hybrid")
@@ -0,0 +1,253 @@
+# src/incremental_build.py
+"""Incremental course rebuilds driven by a per-PDF content-hash manifest.
+
+``update_course`` only OCRs + embeds PDFs that are new or whose sha256
+changed, drops rows of deleted PDFs and merges everything with the live
+``<course>_pages.parquet`` into a new snapshot (``src.course_snapshots``),
+which is validated and then promoted.  Each snapshot carries the manifest it
+was built from as ``manifest.json``::
+
+    {"files": {"Lecture_1.pdf": {"sha256": "...", "size": 123,
+                                 "mtime_ns": 456, "rows": 25}}}
+
+Pages whose normalised text (``normalize_page``) repeats within one PDF
+are stored once; the row kept (lowest page number) lists the others in its
+``duplicates`` column as ``"<filename>#<page>"``, and merges expand them
+back first.  Identical pages of different PDFs stay separate rows so every
+citation and "slide N of lecture M" lookup names the deck it came from.
+"""
+from __future__ import annotations
+
+import json
+import shutil
+import tempfile
+import time
+from json import JSONDecodeError
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from src.ann_index import build_ann_index
+from src.course_builder import ConcurrentCourseBuilder
+from src.course_snapshots import promote, retire, stage, validate
+from src.course_store import MANIFEST_NAME, live_dir, live_parquet, read_pointer
+from src.embedding_cache import EMBED_MODEL, get_page_embedding_cache, page_key
+from src.embedding_store import store_embed_model, store_is_current, write_store
+from src.hashing import file_sha256
+from src.lexical_index import bm25_path_for, build_bm25_index
+from src.metrics import span, trace
+from src.precompute_embeddings import process_course
+
+
+def load_manifest(course_dir: Path) -> dict:
+    """Manifest of the live snapshot (or of a legacy store)."""
+    path = live_dir(course_dir) / MANIFEST_NAME
+    if not path.is_file():
+        return {"files": {}}
+    try:
+        return json.loads(path.read_text())
+    except JSONDecodeError:
+        return {"files": {}}
+
+
+def save_manifest(store_dir: Path, manifest: dict) -> None:
+    tmp = store_dir / (MANIFEST_NAME + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    tmp.replace(store_dir / MANIFEST_NAME)
+
+
+def _fingerprint(pdf: Path, known: dict | None) -> dict:
+    """Hash a PDF unless size + mtime prove it is the file already recorded."""
+    st = pdf.stat()
+    if known and known.get("size") == st.st_size and known.get("mtime_ns") == st.st_mtime_ns:
+        return known
+    return {"sha256": file_sha256(pdf), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def write_parquet_atomic(df: pd.DataFrame, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    tmp.replace(path)
+
+
+def dedupe_pages(df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the first of each group of near-identical pages; see module docstring."""
+    df = (expand_duplicates(df).sort_values(["filename", "page_number"], kind="stable")
+          .reset_index(drop=True))
+    keys = df["filename"] + "/" + df["page_content"].fillna("").map(page_key)
+    refs = df["filename"] + "#" + df["page_number"].astype(str)
+    groups = refs.groupby(keys.to_numpy(), sort=False).agg(list)
+    first = ~keys.duplicated()
+    kept = df[first].copy()
+    kept["duplicates"] = [groups[k][1:] for k in keys[first]]
+    return kept.reset_index(drop=True)
+
+
+def expand_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+    """Inverse of ``dedupe_pages``: one row per PDF page again."""
+    if "duplicates" not in df.columns:
+        return df
+    extra = []
+    for row in df.itertuples(index=False):
+        for ref in (row.duplicates if row.duplicates is not None else []):
+            filename, page = ref.rsplit("#", 1)
+            extra.append({**row._asdict(), "filename": filename, "page_number": int(page),
+                          "file_path": str(Path(row.file_path).with_name(filename))})
+    out = pd.concat([df, pd.DataFrame(extra, columns=df.columns)], ignore_index=True)
+    return out.drop(columns="duplicates")
+
+
+def _embed_pdfs(course_dir: Path, pdfs: list[Path], api_key: str) -> pd.DataFrame:
+    """Run ``process_course`` on a staging copy holding only ``pdfs``."""
+    with tempfile.TemporaryDirectory() as tmp:
+        staging = Path(tmp) / course_dir.name
+        (staging / "pdfs").mkdir(parents=True)
+        for pdf in pdfs:
+            shutil.copy2(pdf, staging / "pdfs" / pdf.name)
+        process_course(staging, api_key=api_key)
+        out = next(staging.glob("*_pages.parquet"))
+        df = pd.read_parquet(out)
+    # rows must point at the live PDFs, not the staging copies
+    df["file_path"] = [str(course_dir / "pdfs" / f) for f in df["filename"]]
+    return df
+
+
+def update_course(course_dir: Path, api_key: str, force: bool = False,
+                  max_workers: int | None = None, server_url: str | None = None,
+                  store_dtype: str = "float32", checkpoint_dir: Path | None = None,
+                  progress: Callable[[str, int, int], None] | None = None) -> dict:
+    """Bring ``<course>_pages.parquet`` in line with ``course_dir/pdfs``.
+
+    Returns a summary ``{"added", "updated", "removed", "unchanged"}`` of
+    filenames plus ``pages`` / ``pages_per_sec`` throughput of the embedding
+    step, the share of page embeddings served by the shared page cache
+    (``reuse_rate``) and the number of near-identical pages folded into
+    another row (``duplicates``).  ``force=True`` re-processes every PDF.
+    With ``max_workers`` set, changed PDFs go through the rate-limited
+    ``ConcurrentCourseBuilder`` instead of a sequential ``process_course`` run.  The memory-mapped
+    companion store (``src.embedding_store``) is written in ``store_dtype``
+    next to the BM25 (``src.lexical_index``) and IVF (``src.ann_index``)
+    indexes; ``summary["version"]`` is the snapshot left live (None once the
+    last PDF is deleted and the course is retired).  Each step is
+    recorded as a ``build.*`` span (``src.metrics``).
+    ``checkpoint_dir`` / ``progress`` are handed to the concurrent builder
+    (resumable OCR and embedding; ``progress(phase, done, total)``).
+    """
+    with trace("build", course=course_dir.name, force=force) as s:
+        summary = _update_course(course_dir, api_key, force, max_workers, server_url,
+                                 store_dtype, checkpoint_dir, progress)
+        s.update(pages=summary["pages"], pdfs=len(summary["added"]) + len(summary["updated"]),
+                 removed=len(summary["removed"]))
+    return summary
+
+
+def _update_course(course_dir: Path, api_key: str, force: bool, max_workers: int | None,
+                   server_url: str | None, store_dtype: str, checkpoint_dir: Path | None,
+                   progress: Callable[[str, int, int], None] | None) -> dict:
+    live = live_parquet(course_dir)
+    if live is not None and store_embed_model(live) != EMBED_MODEL:
+        force = True                    # never mix page vectors of two models in one store
+    manifest = load_manifest(course_dir)
+    known: dict = manifest.get("files", {})
+    existing = expand_duplicates(pd.read_parquet(live)) if live is not None else None
+    have_rows = set(existing["filename"]) if existing is not None else set()
+
+    current: dict[str, dict] = {}
+    added, updated, unchanged = [], [], []
+    for pdf in sorted((course_dir / "pdfs").glob("*.pdf")):
+        prev = known.get(pdf.name)
+        fp = _fingerprint(pdf, prev)
+        current[pdf.name] = fp
+        # the manifest hash decides; a PDF that OCR'd to zero rows has none in
+        # the store but is still unchanged and must not be re-OCR'd every run
+        if force:
+            (updated if prev is not None or pdf.name in have_rows else added).append(pdf.name)
+        elif prev is None:
+            # store predates the manifest: trust its rows, just record the hash
+            (unchanged if pdf.name in have_rows else added).append(pdf.name)
+        elif prev.get("sha256") != fp["sha256"]:
+            updated.append(pdf.name)
+        else:
+            unchanged.append(pdf.name)
+    removed = sorted((have_rows | set(known)) - set(current))
+
+    todo = added + updated
+    summary = {"added": added, "updated": updated, "removed": removed,
+               "unchanged": unchanged, "pages": 0, "pages_per_sec": 0.0,
+               "reuse_rate": 0.0, "duplicates": 0, "version": read_pointer(course_dir).get("live")}
+    complete = (live is not None and store_is_current(live)
+                and bm25_path_for(live).is_file())
+    if not todo and not removed and complete:
+        manifest["files"] = {n: {**fp, "rows": known.get(n, {}).get("rows")}
+                             for n, fp in current.items()}
+        save_manifest(live.parent, manifest)
+        return summary
+
+    frames = []
+    if existing is not None:
+        frames.append(existing[~existing["filename"].isin(set(todo) | set(removed))])
+    if todo:
+        pdfs = [course_dir / "pdfs" / n for n in todo]
+        t0 = time.perf_counter()
+        with span("build.ocr_embed", pdfs=len(pdfs), workers=max_workers) as s:
+            if max_workers:
+                # per-request API calls / retries land on build.ocr / build.embed spans
+                builder = ConcurrentCourseBuilder(
+                    api_key, max_workers=max_workers, server_url=server_url,
+                    checkpoint_dir=checkpoint_dir, progress=progress,
+                    page_cache=get_page_embedding_cache())
+                fresh = builder.build(pdfs)
+                summary["reuse_rate"] = s["reuse_rate"] = builder.stats.reuse_rate
+                s["reused"] = builder.stats.reused
+            else:
+                fresh = _embed_pdfs(course_dir, pdfs, api_key)
+            s["pages"] = len(fresh)
+        elapsed = time.perf_counter() - t0
+        summary["pages"] = len(fresh)
+        summary["pages_per_sec"] = len(fresh) / elapsed if elapsed else 0.0
+        frames.append(fresh)
+    if not frames:
+        return summary
+    merged = (pd.concat(frames, ignore_index=True)
+              .sort_values(["filename", "page_number"], kind="stable")
+              .reset_index(drop=True))
+    if merged.empty:
+        # no pages left (last PDF deleted): stop serving the old content
+        if live is not None:
+            with span("build.retire"):
+                retire(course_dir)
+        summary["version"] = None
+        return summary
+    counts = merged["filename"].value_counts().to_dict()
+    unique = dedupe_pages(merged)
+    summary["duplicates"] = len(merged) - len(unique)
+    manifest["files"] = {n: {**fp, "rows": int(counts.get(n, 0))} for n, fp in current.items()}
+
+    # everything below is written into staging; students keep the live snapshot
+    staging = stage(course_dir)
+    try:
+        parquet_path = staging / f"{course_dir.name}_pages.parquet"
+        with span("build.write_parquet", rows=len(unique), duplicates=summary["duplicates"]):
+            write_parquet_atomic(unique, parquet_path)
+        save_manifest(staging, manifest)
+        if progress is not None:
+            progress("index", 0, 3)
+        with span("build.write_store", dtype=store_dtype, rows=len(unique)):
+            write_store(parquet_path, store_dtype)
+        if progress is not None:
+            progress("index", 1, 3)
+        with span("build.bm25", rows=len(unique)):
+            build_bm25_index(parquet_path)
+        if progress is not None:
+            progress("index", 2, 3)
+        with span("build.ann", rows=len(unique)):
+            build_ann_index(staging)
+        with span("build.validate") as s:
+            s.update(validate(staging, course_dir.name))
+        with span("build.promote"):
+            summary["version"] = promote(course_dir, staging)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return summary
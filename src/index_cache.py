@@ -0,0 +1,198 @@
+# src/index_cache.py
+"""Process-wide, version-aware cache of loaded course indexes.
+
+Entries are keyed on (course, parquet version), so a rebuilt store is picked
+up without anyone clearing caches: while the new snapshot loads on a
+background thread, requests keep getting the version already resident, and
+the entry is swapped once loading finishes.  Only a course with nothing
+resident loads in the foreground.  Resident size is kept under a byte budget
+by evicting the least-recently-used course, and Admin actions invalidate
+only the course they touched.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+
+import pandas as pd
+
+from src.ann_index import IVFIndex, ann_path_for
+from src.course_store import parquet_version, store_version
+from src.embedding_cache import EMBED_MODEL
+from src.embedding_store import MappedCourseStore, store_embed_model
+from src.hybrid_search import PageRefs
+from src.lexical_index import BM25Index, bm25_path_for
+from src.metrics import span
+from src.retrieval import VectorIndex
+
+DEFAULT_BUDGET_MB = 1024
+
+
+@dataclass
+class CourseIndex:
+    course: str
+    version: str
+    index: VectorIndex
+    ann: IVFIndex | None
+    nbytes: int
+    df: pd.DataFrame | None = None              # full frame (parquet fallback)
+    store: MappedCourseStore | None = None      # mmap store, texts loaded lazily
+    bm25: BM25Index | None = None
+    store_version: str = ""                     # answer-cache key of this snapshot
+
+    @property
+    def meta(self) -> pd.DataFrame:
+        """filename / page_number (/ duplicates) of every row, without texts or embeddings."""
+        if self.store is not None:
+            return self.store.meta
+        return self.df[[c for c in ("filename", "page_number", "duplicates") if c in self.df]]
+
+    @property
+    def embed_model(self) -> str:
+        """Model to embed queries with, so they match the page vectors."""
+        return self.store.info.get("embed_model", EMBED_MODEL) if self.store is not None \
+            else EMBED_MODEL
+
+    @cached_property
+    def refs(self) -> PageRefs:
+        """Lecture / slide numbers per row for "slide N of lecture M" queries."""
+        return PageRefs(self.meta)
+
+    def pages(self, rows) -> pd.DataFrame:
+        """Page rows (filename, page_number, page_content, …) for ``rows``."""
+        if self.store is not None:
+            return self.store.pages(rows)
+        return self.df.iloc[rows].copy()
+
+
+def load_course_index(course: str, parquet_path: Path) -> CourseIndex:
+    version = parquet_version(parquet_path)
+    store = MappedCourseStore.open(parquet_path)
+    if store is not None:
+        index, df = store.index, None
+        nbytes = int(store.meta.memory_usage(deep=True).sum())
+    else:
+        df = pd.read_parquet(parquet_path)
+        index = VectorIndex.from_frame(df)
+        # deep memory_usage does not see the buffers behind the embedding arrays
+        nbytes = (int(df.memory_usage(deep=True).sum()) + index.nbytes
+                  + sum(e.nbytes for e in df["embedding"]))
+    ann = IVFIndex.load(ann_path_for(parquet_path), index,
+                        embed_model=store_embed_model(parquet_path), version=version)
+    if ann is not None:
+        nbytes += ann.order.nbytes + ann.centroids.nbytes
+    bm25 = BM25Index.load(bm25_path_for(parquet_path), len(index))
+    if bm25 is not None:
+        w = bm25.weights
+        nbytes += w.data.nbytes + w.indices.nbytes + w.indptr.nbytes
+    return CourseIndex(course, version, index, ann, nbytes, df=df, store=store, bm25=bm25,
+                       store_version=store_version(parquet_path))
+
+
+class CourseIndexCache:
+    def __init__(self, budget_mb: float = DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1_048_576)
+        self._entries: OrderedDict[str, CourseIndex] = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: dict[str, threading.Lock] = {}
+        self._preloading: dict[str, str] = {}        # course -> version being loaded
+        self.hits = self.loads = self.evictions = self.stale_hits = 0
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(e.nbytes for e in self._entries.values())
+
+    def get(self, course: str, parquet_path: Path, wait: bool = False) -> CourseIndex:
+        """Return the course's index; a rebuilt store is swapped in once preloaded.
+
+        ``wait=True`` always returns ``parquet_path``'s version, loading it if needed.
+        """
+        version = parquet_version(parquet_path)
+        with self._lock:
+            entry = self._entries.get(course)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(course)
+                self.hits += 1
+                return entry
+            if entry is not None and not wait:
+                self._entries.move_to_end(course)
+                self.stale_hits += 1
+        if entry is not None and not wait:
+            self.prefetch(course, parquet_path)
+            return entry
+        return self._load(course, parquet_path, version)
+
+    def prefetch(self, course: str, parquet_path: Path) -> None:
+        """Load ``parquet_path`` on a background thread unless already resident."""
+        version = parquet_version(parquet_path)
+        with self._lock:
+            entry = self._entries.get(course)
+            if (entry is not None and entry.version == version) \
+                    or self._preloading.get(course) == version:
+                return
+            self._preloading[course] = version
+        threading.Thread(target=self._preload, args=(course, parquet_path, version),
+                         name=f"preload-{course}", daemon=True).start()
+
+    def _preload(self, course: str, parquet_path: Path, version: str) -> None:
+        try:
+            self._load(course, parquet_path, version, background=True)
+        except Exception:
+            pass                    # recorded by the span; the next request retries
+        finally:
+            with self._lock:
+                if self._preloading.get(course) == version:
+                    del self._preloading[course]
+
+    def _load(self, course: str, parquet_path: Path, version: str,
+              background: bool = False) -> CourseIndex:
+        with self._lock:
+            course_lock = self._loading.setdefault(course, threading.Lock())
+        # one loader per course; other sessions wait instead of loading twice
+        with course_lock:
+            with self._lock:
+                entry = self._entries.get(course)
+                if entry is not None and entry.version == version:
+                    self.hits += 1
+                    return entry
+            with span("index.load", course=course, background=background):
+                entry = load_course_index(course, parquet_path)
+            with self._lock:
+                self._entries[course] = entry
+                self._entries.move_to_end(course)
+                self.loads += 1
+                self._evict()
+            return entry
+
+    def _evict(self) -> None:
+        # never evict the entry just loaded, even if it alone exceeds the budget
+        while self.resident_bytes > self.budget_bytes and len(self._entries) > 1:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, course: str) -> None:
+        with self._lock:
+            self._entries.pop(course, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"courses": list(self._entries), "resident_mb": self.resident_bytes / 1_048_576,
+                    "budget_mb": self.budget_bytes / 1_048_576, "hits": self.hits,
+                    "loads": self.loads, "evictions": self.evictions,
+                    "stale_hits": self.stale_hits, "preloading": list(self._preloading)}
+
+
+_CACHE: CourseIndexCache | None = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_index_cache(budget_mb: float = DEFAULT_BUDGET_MB) -> CourseIndexCache:
+    """The process-wide cache shared by the Chat and Admin pages."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = CourseIndexCache(budget_mb)
+        return _CACHE
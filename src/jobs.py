@@ -0,0 +1,293 @@
+# src/jobs.py
+"""File-backed job queue and background worker for course rebuilds.
+
+The Admin page only enqueues: each job is ``data/.cache/jobs/<id>.json``
+(``queued`` -> ``running`` -> ``done`` | ``failed`` | ``cancelled``) and a
+single worker process (``python -m src.jobs``, started on demand by
+``ensure_worker``) runs them one at a time:
+
+    update_course (stage -> validate -> promote) -> meta.json -> GitHub sync
+
+OCR results and embedding batches are checkpointed under
+``jobs/checkpoints/<course>/``, so a job whose worker died is re-queued (on
+the next worker start, or by ``ensure_worker`` once its heartbeat is
+``STALE_HEARTBEATS`` intervals old) and resumes where it stopped.  Status
+changes that race between the Admin page and the worker (claim vs cancel)
+go through a ``queue.lock`` file lock.  Progress
+(``phase``, ``done``/``total``, ETA) and errors are written back to the
+job file for the Admin page to poll.  Secrets reach the worker through its
+environment, never through job files.
+"""
+from __future__ import annotations
+
+import fcntl
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from json import JSONDecodeError
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parents[1]
+DATA_ROOT = REPO_ROOT / "data"
+JOBS_DIR = DATA_ROOT / ".cache" / "jobs"
+POLL_S = 1.0
+HEARTBEAT_S = 5.0
+STALE_HEARTBEATS = 6          # running jobs silent this many intervals are orphans
+IDLE_EXIT_S = 600.0
+KEEP_FINISHED = 50
+ACTIVE = ("queued", "running")
+PHASE_UNITS = {"ocr": "PDFs", "embed": "batches", "index": "steps", "publish": "steps"}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _write_json_atomic(path: Path, obj: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(obj, indent=2))
+    tmp.replace(path)
+
+
+class JobQueue:
+    def __init__(self, root: Path = JOBS_DIR):
+        self.root = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()          # report() nests update()
+
+    def _path(self, job_id: str) -> Path:
+        return self.root / f"{job_id}.json"
+
+    def checkpoint_dir(self, course: str) -> Path:
+        return self.root / "checkpoints" / course
+
+    @contextmanager
+    def _transition(self):
+        """Cross-process lock for read-check-write status changes."""
+        with open(self.root / "queue.lock", "w") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            yield                               # closing the file releases the lock
+
+    # ------------------------------------------------------------------ #
+    def get(self, job_id: str) -> dict | None:
+        try:
+            return json.loads(self._path(job_id).read_text())
+        except (FileNotFoundError, JSONDecodeError):
+            return None
+
+    def jobs(self, course: str | None = None) -> list[dict]:
+        """Jobs, newest first (ids sort by submission time)."""
+        out = []
+        for p in sorted(self.root.glob("*.json"), reverse=True):
+            job = self.get(p.stem)
+            if job is not None and (course is None or job["course"] == course):
+                out.append(job)
+        return out
+
+    def active(self, course: str) -> dict | None:
+        return next((j for j in self.jobs(course) if j["status"] in ACTIVE), None)
+
+    def submit(self, course: str, **params) -> dict:
+        """Queue a rebuild of ``course``; an already active job is returned instead."""
+        existing = self.active(course)
+        if existing is not None:
+            return existing
+        job = {"id": f"{time.time_ns()}-{uuid.uuid4().hex[:6]}", "course": course,
+               "params": params, "status": "queued", "attempts": 0,
+               "submitted": time.time(), "progress": {}, "errors": [], "result": None}
+        _write_json_atomic(self._path(job["id"]), job)
+        self.prune()
+        return job
+
+    def update(self, job: dict, **fields) -> dict:
+        with self._lock:
+            job.update(fields, heartbeat=time.time())
+            _write_json_atomic(self._path(job["id"]), job)
+        return job
+
+    def report(self, job: dict, phase: str, done: int, total: int) -> None:
+        """Record phase progress; ETA extrapolates the phase's rate so far."""
+        with self._lock:    # the heartbeat thread serialises ``job`` concurrently
+            prog = job.get("progress") or {}
+            now = time.time()
+            if prog.get("phase") != phase:
+                prog = {"phase": phase, "phase_started": now}
+            elapsed = now - prog["phase_started"]
+            prog = {**prog, "done": done, "total": total,
+                    "unit": PHASE_UNITS.get(phase, "steps"),
+                    "eta_s": elapsed / done * (total - done) if done else None}
+            self.update(job, progress=prog)
+
+    def cancel(self, job_id: str) -> None:
+        with self._transition():
+            job = self.get(job_id)
+            if job is None:
+                return
+            if job["status"] == "queued":
+                self.update(job, status="cancelled", finished=time.time())
+            elif job["status"] == "running":
+                (self.root / f"{job_id}.cancel").touch()
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return (self.root / f"{job_id}.cancel").exists()
+
+    def claim(self) -> dict | None:
+        """Oldest queued job, marked running; a job cancelled meanwhile is skipped."""
+        with self._transition():
+            for job in reversed(self.jobs()):
+                if job["status"] == "queued":
+                    return self.update(job, status="running", started=time.time(),
+                                       attempts=job["attempts"] + 1, pid=os.getpid())
+        return None
+
+    def requeue_orphans(self, stale_after: float | None = None) -> list[str]:
+        """Jobs left ``running`` by a dead worker go back to the queue.
+
+        With ``stale_after`` only jobs whose heartbeat is older than that many
+        seconds count as orphaned.  Returns the ids re-queued.
+        """
+        now, requeued = time.time(), []
+        with self._transition():
+            for job in self.jobs():
+                if job["status"] != "running":
+                    continue
+                if stale_after is not None and now - job.get("heartbeat", 0.0) < stale_after:
+                    continue
+                job["errors"].append(f"{datetime.now():%H:%M:%S} worker stopped; resuming")
+                self.update(job, status="queued")
+                requeued.append(job["id"])
+        return requeued
+
+    def prune(self) -> None:
+        finished = [j for j in self.jobs() if j["status"] not in ACTIVE]
+        for job in finished[KEEP_FINISHED:]:
+            self._path(job["id"]).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------ #
+    def worker_pid(self) -> int | None:
+        """Pid of the live worker, if any."""
+        try:
+            pid = int((self.root / "worker.pid").read_text())
+            os.kill(pid, 0)
+            return pid
+        except (FileNotFoundError, ValueError, ProcessLookupError, PermissionError):
+            return None
+
+
+def ensure_worker(queue: JobQueue, env: dict[str, str]) -> int:
+    """Start the worker process unless one is alive; returns its pid.
+
+    Running jobs whose heartbeat went stale (their worker died without the
+    next worker start noticing) are re-queued first.
+    """
+    queue.requeue_orphans(stale_after=STALE_HEARTBEATS * HEARTBEAT_S)
+    pid = queue.worker_pid()
+    if pid is not None:
+        return pid
+    with open(queue.root / "worker.log", "ab") as log:
+        proc = subprocess.Popen([sys.executable, "-m", "src.jobs"], cwd=REPO_ROOT,
+                                env={**os.environ, **env}, stdout=log,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+    return proc.pid
+
+
+# ---------------------------------------------------------------------- #
+# worker side
+def run_job(queue: JobQueue, job: dict) -> dict:
+    """Rebuild + publish one course; returns the job result."""
+    from src.course_store import published
+    from src.github_publisher import GitHubPublisher
+    from src.incremental_build import update_course
+
+    params, course = job["params"], job["course"]
+    course_dir = DATA_ROOT / course
+    checkpoints = queue.checkpoint_dir(course)
+    if params.get("force") and job["attempts"] == 1:
+        shutil.rmtree(checkpoints, ignore_errors=True)     # a forced rebuild re-OCRs for real
+
+    def progress(phase: str, done: int, total: int) -> None:
+        if queue.cancel_requested(job["id"]):
+            raise JobCancelled()
+        queue.report(job, phase, done, total)
+
+    summary = update_course(course_dir, api_key=os.environ["MISTRAL_API_KEY"],
+                            force=params.get("force", False),
+                            max_workers=params.get("max_workers", 4),
+                            store_dtype=params.get("store_dtype", "float32"),
+                            checkpoint_dir=checkpoints, progress=progress)
+
+    meta_path = course_dir / "meta.json"
+    try:
+        meta = json.loads(meta_path.read_text())
+    except (FileNotFoundError, JSONDecodeError):
+        meta = {}
+    meta["title"] = params.get("title") or meta.get("title") or course.upper()
+    meta["updated"] = datetime.utcnow().isoformat() + "Z"
+    meta_path.write_text(json.dumps(meta, indent=2))
+
+    commit = None
+    if os.environ.get("GH_TOKEN") and os.environ.get("GH_REPO"):
+        progress("publish", 0, 1)
+        publisher = GitHubPublisher(os.environ["GH_REPO"], os.environ["GH_TOKEN"])
+        # only the live snapshot is published; the previous one stays local
+        commit = publisher.sync_directory(course_dir, REPO_ROOT,
+                                          params.get("message", f"{course}: update course"),
+                                          include=lambda p: published(course_dir, p))
+    shutil.rmtree(checkpoints, ignore_errors=True)
+    return {**summary, "commit": commit}
+
+
+def _heartbeat(queue: JobQueue, job: dict, stop: threading.Event) -> None:
+    while not stop.wait(HEARTBEAT_S):
+        queue.update(job)
+
+
+def work(queue: JobQueue) -> None:
+    job = queue.claim()
+    if job is None:
+        return
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(queue, job, stop), daemon=True).start()
+    try:
+        result = run_job(queue, job)
+        queue.update(job, status="done", result=result, finished=time.time())
+    except JobCancelled:
+        queue.update(job, status="cancelled", finished=time.time())
+    except Exception as exc:
+        job["errors"].append(f"{datetime.now():%H:%M:%S} {type(exc).__name__}: {exc}")
+        queue.update(job, status="failed", finished=time.time(),
+                     traceback=traceback.format_exc(limit=8))
+    finally:
+        stop.set()
+        (queue.root / f"{job['id']}.cancel").unlink(missing_ok=True)
+
+
+def main() -> None:
+    queue = JobQueue()
+    lock = open(queue.root / "worker.lock", "w")
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return                                  # another worker owns the queue
+    (queue.root / "worker.pid").write_text(str(os.getpid()))
+    queue.requeue_orphans()
+    idle_since = time.monotonic()
+    while time.monotonic() - idle_since < IDLE_EXIT_S:
+        if any(j["status"] == "queued" for j in queue.jobs()):
+            work(queue)
+            idle_since = time.monotonic()
+        else:
+            time.sleep(POLL_S)
+    (queue.root / "worker.pid").unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
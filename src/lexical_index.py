@@ -0,0 +1,107 @@
+# src/lexical_index.py
+"""Local BM25 index over ``page_content``, stored as ``<course>_bm25.npz``.
+
+BM25 term weights are precomputed per (page, term) into a sparse matrix, so
+a query is a column slice + row sum with no network round-trip.
+"""
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by do does for from how i in is it of on or the this to "
+    "what when where which who why with about explain".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def bm25_path_for(parquet_path: Path) -> Path:
+    stem = parquet_path.name.removesuffix("_pages.parquet")
+    return parquet_path.with_name(f"{stem}_bm25.npz")
+
+
+class BM25Index:
+    def __init__(self, weights: sparse.csc_matrix, vocab: dict[str, int]):
+        self.weights = weights            # (n_pages, n_terms) BM25 contributions
+        self.vocab = vocab
+
+    def __len__(self) -> int:
+        return self.weights.shape[0]
+
+    @classmethod
+    def build(cls, texts, k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        vocab: dict[str, int] = {}
+        rows, cols, tfs = [], [], []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for i, text in enumerate(texts):
+            toks = tokenize(text or "")
+            lengths[i] = len(toks)
+            ids, counts = np.unique([vocab.setdefault(t, len(vocab)) for t in toks],
+                                    return_counts=True)
+            rows.extend([i] * len(ids))
+            cols.extend(ids.tolist())
+            tfs.extend(counts.tolist())
+        n = len(texts)
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        tf = np.asarray(tfs, dtype=np.float32)
+        df = np.bincount(cols, minlength=len(vocab)).astype(np.float32)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        avgdl = lengths.mean() if n and lengths.mean() > 0 else 1.0
+        norm = k1 * (1 - b + b * lengths[rows] / avgdl)
+        w = idf[cols] * tf * (k1 + 1) / (tf + norm)
+        mat = sparse.csc_matrix((w, (rows, cols)), shape=(n, len(vocab)), dtype=np.float32)
+        return cls(mat, vocab)
+
+    def save(self, path: Path) -> None:
+        m = self.weights
+        terms = np.array(sorted(self.vocab, key=self.vocab.get))
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, data=m.data, indices=m.indices, indptr=m.indptr,
+                     shape=np.array(m.shape), terms=terms)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, n_rows: int) -> "BM25Index | None":
+        """Load the index; None if missing or built for a different store."""
+        if not path.is_file():
+            return None
+        with np.load(path) as z:
+            shape = tuple(z["shape"])
+            if shape[0] != n_rows:
+                return None
+            mat = sparse.csc_matrix((z["data"], z["indices"], z["indptr"]), shape=shape)
+            vocab = {t: i for i, t in enumerate(z["terms"].tolist())}
+        return cls(mat, vocab)
+
+    def scores(self, query: str, rows: np.ndarray | None = None) -> np.ndarray:
+        """BM25 score of every page (or of ``rows`` only) for ``query``."""
+        ids = sorted({self.vocab[t] for t in tokenize(query) if t in self.vocab})
+        mat = self.weights if rows is None else self.weights[rows]
+        if not ids:
+            return np.zeros(mat.shape[0], dtype=np.float32)
+        return np.asarray(mat[:, ids].sum(axis=1)).ravel()
+
+    def search(self, query: str, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        s = self.scores(query)
+        k = min(k, len(s))
+        top = np.argpartition(-s, k - 1)[:k] if 0 < k < len(s) else np.arange(len(s))
+        top = top[np.argsort(-s[top], kind="stable")]
+        return top, s[top]
+
+
+def build_bm25_index(parquet_path: Path) -> Path:
+    """Build and persist the BM25 index for a course store."""
+    texts = pd.read_parquet(parquet_path, columns=["page_content"])["page_content"].fillna("")
+    out = bm25_path_for(parquet_path)
+    BM25Index.build(texts.tolist()).save(out)
+    return out
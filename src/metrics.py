@@ -0,0 +1,136 @@
+# src/metrics.py
+"""Lightweight timing spans written to a local append-only metrics log.
+
+    with trace("chat", course="econ57"):
+        with span("chat.retrieve", mode="hybrid") as s:
+            ...
+            s["cache_hit"] = True
+
+Each span appends one JSON line ``{ts, trace, stage, course, ms, ok, ...}``
+to ``data/.cache/metrics/spans-<n>.jsonl``.  Spans opened inside ``trace``
+share its id and course; code running on worker threads passes
+``parent=current_trace()`` explicitly.  Retention is bounded: the active
+segment rolls over at ``segment_bytes`` and only ``keep_segments`` segments
+are kept.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+import pandas as pd
+
+METRICS_DIR = Path(__file__).parents[1] / "data" / ".cache" / "metrics"
+SEGMENT_BYTES = 4 * 1_048_576
+KEEP_SEGMENTS = 8
+
+_TRACE: ContextVar[dict | None] = ContextVar("metrics_trace", default=None)
+
+
+class MetricsStore:
+    """Rolling JSONL segments; safe for concurrent appends within a process."""
+
+    def __init__(self, root: Path = METRICS_DIR, segment_bytes: int = SEGMENT_BYTES,
+                 keep_segments: int = KEEP_SEGMENTS):
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self.keep_segments = keep_segments
+        self._lock = threading.Lock()
+
+    def _segments(self) -> list[Path]:
+        return sorted(self.root.glob("spans-*.jsonl"), key=lambda p: int(p.stem.split("-")[1]))
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, default=str, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.root.mkdir(parents=True, exist_ok=True)
+            segments = self._segments()
+            active = segments[-1] if segments else self.root / "spans-0.jsonl"
+            if active.is_file() and active.stat().st_size >= self.segment_bytes:
+                active = self.root / f"spans-{int(active.stem.split('-')[1]) + 1}.jsonl"
+                segments.append(active)
+                for old in segments[:-self.keep_segments]:
+                    old.unlink(missing_ok=True)
+            with open(active, "a", encoding="utf-8") as fh:
+                fh.write(line)
+
+    def read(self, since: float | None = None) -> pd.DataFrame:
+        """All retained spans (optionally newer than epoch ``since``) as a frame."""
+        records = []
+        for seg in self._segments():
+            with open(seg, encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue                      # torn line from a crashed writer
+                    if since is None or rec.get("ts", 0) >= since:
+                        records.append(rec)
+        df = pd.DataFrame.from_records(records)
+        if len(df):
+            df["time"] = pd.to_datetime(df["ts"], unit="s")
+        return df
+
+
+_STORE: MetricsStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    """The process-wide store shared by the Chat and Admin pages and the builders."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = MetricsStore()
+        return _STORE
+
+
+def set_metrics_store(store: MetricsStore) -> None:
+    """Send this process's spans to ``store`` (benchmarks, tests)."""
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
+
+
+def current_trace() -> dict | None:
+    return _TRACE.get()
+
+
+def record(stage: str, ms: float, course: str | None = None, parent: dict | None = None,
+           ok: bool = True, **attrs) -> None:
+    """Append a span that was timed elsewhere."""
+    parent = parent or _TRACE.get() or {}
+    get_metrics_store().append({
+        "ts": time.time(), "trace": parent.get("id"), "stage": stage,
+        "course": course or parent.get("course"), "ms": round(ms, 3), "ok": ok, **attrs})
+
+
+@contextmanager
+def span(stage: str, course: str | None = None, parent: dict | None = None, **attrs):
+    """Time the block; the yielded dict collects extra attributes (tokens, hits, …)."""
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        yield attrs
+    except BaseException as exc:
+        ok = False
+        attrs["error"] = type(exc).__name__
+        raise
+    finally:
+        record(stage, (time.perf_counter() - t0) * 1000, course, parent, ok, **attrs)
+
+
+@contextmanager
+def trace(stage: str, course: str | None = None, **attrs):
+    """A top-level span whose id and course are inherited by nested spans."""
+    token = _TRACE.set({"id": uuid.uuid4().hex[:12], "course": course})
+    try:
+        with span(stage, **attrs) as s:
+            yield s
+    finally:
+        _TRACE.reset(token)
@@ -0,0 +1,175 @@
+# src/mistral_client.py
+"""Process-wide Mistral client shared by every Streamlit session.
+
+* one keep-alive ``httpx.Client`` connection pool per (api key, server URL)
+* at most ``max_concurrent`` upstream requests in flight (excess callers wait)
+* single-flight: concurrent identical embedding or chat requests share one
+  upstream call.  Embedding results are fanned out through a ``Future``;
+  chat streams are consumed once on a background thread into a replay
+  buffer that every subscriber iterates at its own pace.
+
+Entries exist only while a request is in flight; repeats after that are the
+query-embedding and answer caches' job.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+import httpx
+import numpy as np
+from mistralai import Mistral
+
+from src.embedding_cache import EMBED_MODEL   # one constant for query and page vectors
+
+MAX_CONCURRENT = 16
+MAX_CONNECTIONS = 32
+TIMEOUT_S = 120.0
+
+
+def _key(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class _Broadcast:
+    """Append-only token buffer that any number of readers can replay and follow."""
+
+    def __init__(self):
+        self.tokens: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self._cond = threading.Condition()
+
+    def push(self, token: str) -> None:
+        with self._cond:
+            self.tokens.append(token)
+            self._cond.notify_all()
+
+    def close(self, error: BaseException | None = None) -> None:
+        with self._cond:
+            self.done, self.error = True, error
+            self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[str]:
+        i = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: i < len(self.tokens) or self.done)
+                batch, done, error = self.tokens[i:], self.done, self.error
+            i += len(batch)
+            yield from batch
+            if done and i >= len(self.tokens):
+                if error is not None:
+                    raise error
+                return
+
+
+class ChatSubscription:
+    """Context-managed iterator of text deltas for one subscriber."""
+
+    def __init__(self, broadcast: _Broadcast, coalesced: bool):
+        self._broadcast = broadcast
+        self.coalesced = coalesced          # True if another session started the call
+
+    def __enter__(self) -> "ChatSubscription":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass                                # the upstream stream finishes for the others
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._broadcast)
+
+
+class SharedMistral:
+    def __init__(self, api_key: str, server_url: str | None = None,
+                 max_concurrent: int = MAX_CONCURRENT, max_connections: int = MAX_CONNECTIONS):
+        self.http = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+            timeout=TIMEOUT_S,
+        )
+        self.sdk = Mistral(api_key=api_key, server_url=server_url, client=self.http)
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._embeds: dict[str, Future] = {}
+        self._chats: dict[str, _Broadcast] = {}
+        self._pump = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="chat")
+        self.upstream_calls = self.coalesced = 0
+
+    # ------------------------------------------------------------------ #
+    def embed(self, texts: list[str], model: str = EMBED_MODEL) -> list[np.ndarray]:
+        """Embeddings for ``texts``; identical in-flight requests share one call."""
+        key = _key(model, list(texts))
+        with self._lock:
+            fut = self._embeds.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._embeds[key] = Future()
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return fut.result()
+        try:
+            with self._slots:
+                resp = self.sdk.embeddings.create(model=model, inputs=list(texts))
+            fut.set_result([np.asarray(d.embedding, dtype=np.float32) for d in resp.data])
+        except BaseException as exc:
+            fut.set_exception(exc)
+        finally:
+            with self._lock:
+                self._embeds.pop(key, None)
+        return fut.result()
+
+    def chat_stream(self, model: str, messages: list[dict],
+                    temperature: float = 0.2) -> ChatSubscription:
+        """Streamed chat completion; identical in-flight requests share one stream."""
+        key = _key(model, messages, temperature)
+        with self._lock:
+            broadcast = self._chats.get(key)
+            if broadcast is not None:
+                self.coalesced += 1
+                return ChatSubscription(broadcast, coalesced=True)
+            broadcast = self._chats[key] = _Broadcast()
+            self.upstream_calls += 1
+        self._pump.submit(self._pump_chat, key, broadcast, model, messages, temperature)
+        return ChatSubscription(broadcast, coalesced=False)
+
+    def _pump_chat(self, key: str, broadcast: _Broadcast, model: str, messages: list[dict],
+                   temperature: float) -> None:
+        error = None
+        try:
+            with self._slots, self.sdk.chat.stream(
+                    model=model, messages=messages, temperature=temperature) as events:
+                for event in events:
+                    delta = event.data.choices[0].delta.content
+                    if isinstance(delta, str) and delta:
+                        broadcast.push(delta)
+        except BaseException as exc:
+            error = exc
+        finally:
+            with self._lock:
+                self._chats.pop(key, None)
+            broadcast.close(error)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"upstream_calls": self.upstream_calls, "coalesced": self.coalesced,
+                    "in_flight": len(self._embeds) + len(self._chats)}
+
+
+_CLIENTS: dict[tuple[str, str | None], SharedMistral] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_mistral(api_key: str, server_url: str | None = None) -> SharedMistral:
+    """The process-wide shared client for this key / endpoint."""
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get((api_key, server_url))
+        if client is None:
+            client = _CLIENTS[(api_key, server_url)] = SharedMistral(api_key, server_url)
+        return client
@@ -0,0 +1,86 @@
+# src/pdf_index.py
+"""Persisted sha256 -> filename index of a course's PDFs for upload de-duplication.
+
+Stored as ``data/.cache/pdf_index/<course>.json``, outside the course tree,
+so it is neither published nor counted toward the course size; an index left
+at the old ``data/<course>/pdf_index.json`` location is moved there on open.
+On open it is reconciled with the ``pdfs/`` folder using size + mtime, so
+only files changed behind its back are re-hashed; everything else is a
+dictionary lookup.
+"""
+from __future__ import annotations
+
+import json
+from json import JSONDecodeError
+from pathlib import Path
+
+from src.course_store import LEGACY_PDF_INDEX
+from src.hashing import file_sha256
+
+
+def index_path_for(course_dir: Path) -> Path:
+    """``data/econ57`` -> ``data/.cache/pdf_index/econ57.json``."""
+    return course_dir.parent / ".cache" / "pdf_index" / f"{course_dir.name}.json"
+
+
+class PdfHashIndex:
+    def __init__(self, course_dir: Path):
+        self.course_dir = course_dir
+        self.pdf_dir = course_dir / "pdfs"
+        self.path = index_path_for(course_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        legacy = course_dir / LEGACY_PDF_INDEX
+        if legacy.is_file():
+            if self.path.is_file():
+                legacy.unlink()
+            else:
+                legacy.replace(self.path)
+        self.files: dict[str, dict] = {}          # filename -> {sha256, size, mtime_ns}
+        self._by_hash: dict[str, str] = {}        # sha256 -> filename
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            self.files = json.loads(self.path.read_text()).get("files", {})
+        except (FileNotFoundError, JSONDecodeError):
+            self.files = {}
+        dirty = False
+        on_disk = {p.name: p for p in self.pdf_dir.glob("*.pdf")}
+        for name in list(self.files):
+            if name not in on_disk:
+                del self.files[name]
+                dirty = True
+        for name, p in on_disk.items():
+            st = p.stat()
+            rec = self.files.get(name)
+            if rec and rec["size"] == st.st_size and rec["mtime_ns"] == st.st_mtime_ns:
+                continue
+            self.files[name] = {"sha256": file_sha256(p), "size": st.st_size,
+                                "mtime_ns": st.st_mtime_ns}
+            dirty = True
+        self._by_hash = {rec["sha256"]: name for name, rec in self.files.items()}
+        if dirty:
+            self._save()
+
+    def _save(self) -> None:
+        self._by_hash = {rec["sha256"]: name for name, rec in self.files.items()}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"files": self.files}, indent=2, sort_keys=True))
+        tmp.replace(self.path)
+
+    def lookup(self, sha256: str) -> str | None:
+        """Filename already holding this content, if any."""
+        return self._by_hash.get(sha256)
+
+    def add(self, filename: str, data: bytes, sha256: str) -> None:
+        """Write ``data`` to ``pdfs/filename`` and record it."""
+        p = self.pdf_dir / filename
+        p.write_bytes(data)
+        st = p.stat()
+        self.files[filename] = {"sha256": sha256, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        self._save()
+
+    def remove(self, filename: str) -> None:
+        (self.pdf_dir / filename).unlink(missing_ok=True)
+        if self.files.pop(filename, None) is not None:
+            self._save()
@@ -0,0 +1,78 @@
+# src/retrieval.py
+"""Vectorised cosine retrieval over a course's page embeddings."""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def _l2_normalize(mat: np.ndarray) -> np.ndarray:
+    """Row-normalise in place; zero rows stay zero instead of becoming NaN."""
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat /= norms
+    return mat
+
+
+class VectorIndex:
+    """Contiguous, L2-normalised float32 matrix of one course's pages.
+
+    Built once per course; a query is a single mat-vec product followed by an
+    ``argpartition`` top-k, so cost no longer carries per-row Python overhead.
+    """
+
+    def __init__(self, embeddings: np.ndarray):
+        mat = np.array(embeddings, dtype=np.float32, order="C", copy=True)
+        if mat.ndim != 2:
+            raise ValueError(f"expected a 2-D embedding matrix, got shape {mat.shape}")
+        self.matrix = _l2_normalize(mat)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, column: str = "embedding") -> "VectorIndex":
+        """Stack the per-row embedding lists of a ``*_pages.parquet`` frame."""
+        if len(df) == 0:
+            return cls(np.zeros((0, 0), dtype=np.float32))
+        return cls(np.stack(df[column].to_numpy()))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def _scores(self, q: np.ndarray) -> np.ndarray:
+        """Cosine scores of normalised queries (nq, d) against every row."""
+        return q @ self.matrix.T
+
+    def score_rows(self, rows: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Cosine scores of one normalised query against selected rows."""
+        return self.matrix[rows] @ q
+
+    def search(self, q_vec, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, cosine similarities) of the k best pages."""
+        idx, sims = self.search_batch(np.asarray(q_vec, dtype=np.float32)[None, :], k)
+        return idx[0], sims[0]
+
+    def search_batch(self, q_mat, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k for several queries at once; both outputs are (n_queries, k)."""
+        q = _l2_normalize(np.array(q_mat, dtype=np.float32, ndmin=2, copy=True))
+        n = len(self)
+        k = min(k, n)
+        if k == 0:
+            empty = np.zeros((q.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        scores = self._scores(q)                                  # (nq, n)
+        if k < n:
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(n), (q.shape[0], n))
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        idx = np.take_along_axis(part, order, axis=1)
+        return idx, np.take_along_axis(part_scores, order, axis=1)
@@ -0,0 +1,175 @@
+# src/warmup.py
+"""Pre-warm course indexes and the suggested-question answers.
+
+For every built course (or the ones given) the live index is loaded into
+the process-wide ``CourseIndexCache`` and each ``SUGGESTED_QUESTIONS``
+entry goes through the Chat page's first-question path:
+
+    query embedding -> hybrid retrieval -> pack_context -> full answer
+
+("lecture 3" / "slide 12" questions take the keyword fast path instead, with
+no embedding; their answers are cached under the question text.)
+
+Query embeddings land in the shared query-embedding cache and answers in
+the answer cache under the course's store version, so the first student to
+click a suggestion after a deploy, restart or rebuild gets a cached answer.
+``start_warmup`` runs this on a daemon thread once per store version (the
+home and Chat pages call it; a course whose warm-up failed is retried with
+exponential backoff, not on every rerun); ``python -m src.warmup`` does the
+same from a shell, where the SQLite caches and the OS page cache of the
+mmap stores carry over to the app.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+from src.ann_index import DEFAULT_NPROBE
+from src.answer_cache import AnswerCache
+from src.answer_stream import AnswerStreamer
+from src.context_packer import CONTEXT_TOKEN_BUDGET, pack_context
+from src.course_catalog import DATA_ROOT, CourseRecord, get_course_catalog
+from src.embedding_cache import QueryEmbeddingCache
+from src.hybrid_search import HybridRetriever
+from src.index_cache import get_index_cache
+from src.metrics import span, trace
+from src.mistral_client import get_mistral
+
+SUGGESTED_QUESTIONS = (
+    "What are the key learning outcomes for this course?",
+    "Explain the concept of MLE from lecture 3",
+    "What's the professor's policy on late assignments?",
+    "When is the final exam and what does it cover?",
+    "How does regression relate to maximum likelihood?",
+)
+QUERY_CACHE_PATH = DATA_ROOT / ".cache" / "query_embeddings.sqlite"
+ANSWER_CACHE_PATH = DATA_ROOT / ".cache" / "answers.sqlite"
+TOP_K = 10
+RETRY_BASE_S = 60.0
+RETRY_MAX_S = 3600.0
+
+_WARMED: dict[str, str] = {}          # course -> store version warmed in this process
+_WARMING: set[str] = set()
+_FAILED: dict[str, tuple[str, int, float]] = {}   # course -> (version, failures, retry at)
+_LOCK = threading.Lock()
+
+
+class Warmer:
+    """The Chat page's per-question calls, run ahead of the first student."""
+
+    def __init__(self, api_key: str, answers: bool = True):
+        self.client = get_mistral(api_key)
+        self.streamer = AnswerStreamer(api_key, client=self.client)
+        self.query_cache = QueryEmbeddingCache(disk_path=QUERY_CACHE_PATH)
+        self.answer_cache = AnswerCache(ANSWER_CACHE_PATH)
+        self.answers = answers
+
+    def warm_question(self, rec: CourseRecord, course_index, question: str) -> bool:
+        """Cache the embedding and answer of one question; True if it was already cached."""
+        def embed(texts):
+            model = course_index.embed_model
+            return self.query_cache.embed(
+                texts, lambda t: self.client.embed(t, model=model), model)
+
+        hit = HybridRetriever(course_index, embed_fn=embed, deadline_s=None).retrieve(
+            question, k=TOP_K, mode="hybrid", nprobe=DEFAULT_NPROBE)
+        if not self.answers:
+            return False
+        top_pages = course_index.pages(hit.rows)
+        top_pages["similarity"] = hit.scores
+        page_set = list(zip(top_pages["filename"], top_pages["page_number"]))
+        version = course_index.store_version
+        if self.answer_cache.lookup(rec.slug, version, hit.q_vec, page_set,
+                                   question=question) is not None:
+            return True
+        packed = pack_context(question, top_pages, budget=CONTEXT_TOKEN_BUDGET)
+        stream = self.streamer.stream(question, packed.pages, course=rec.slug)
+        for _ in stream:
+            pass
+        self.answer_cache.store(rec.slug, version, question, hit.q_vec, page_set,
+                                stream.answer, stream.numbered_sources)
+        return False
+
+    def warm_course(self, rec: CourseRecord, questions=SUGGESTED_QUESTIONS) -> dict:
+        with trace("warmup", course=rec.slug, version=rec.store_version) as t:
+            with span("warmup.index"):
+                course_index = get_index_cache().get(rec.slug, rec.parquet_path, wait=True)
+            cached = 0
+            for q in questions:
+                with span("warmup.question") as s:
+                    s["cache_hit"] = self.warm_question(rec, course_index, q)
+                cached += s["cache_hit"]
+            t.update(questions=len(questions), already_cached=cached)
+        return {"course": rec.slug, "questions": len(questions), "already_cached": cached}
+
+
+def _warm(api_key: str, records: list[CourseRecord], answers: bool) -> None:
+    warmer = Warmer(api_key, answers=answers)
+    for rec in records:
+        try:
+            warmer.warm_course(rec)
+            with _LOCK:
+                _WARMED[rec.slug] = rec.store_version
+                _FAILED.pop(rec.slug, None)
+        except Exception:
+            # recorded on the warmup span; this version is retried after a backoff
+            with _LOCK:
+                version, failures, _ = _FAILED.get(rec.slug, (None, 0, 0.0))
+                failures = failures + 1 if version == rec.store_version else 1
+                delay = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (failures - 1))
+                _FAILED[rec.slug] = (rec.store_version, failures, time.monotonic() + delay)
+        finally:
+            with _LOCK:
+                _WARMING.discard(rec.slug)
+
+
+def start_warmup(api_key: str, courses: list[str] | None = None,
+                 answers: bool = True) -> threading.Thread | None:
+    """Warm courses (default: all) in the background; each store version only once."""
+    records = get_course_catalog().records()
+    now = time.monotonic()
+
+    def backing_off(r: CourseRecord) -> bool:
+        failed = _FAILED.get(r.slug)
+        return failed is not None and failed[0] == r.store_version and now < failed[2]
+
+    with _LOCK:
+        todo = [r for slug, r in records.items()
+                if (courses is None or slug in courses) and slug not in _WARMING
+                and _WARMED.get(slug) != r.store_version and not backing_off(r)]
+        _WARMING.update(r.slug for r in todo)
+    if not todo:
+        return None
+    thread = threading.Thread(target=_warm, args=(api_key, todo, answers),
+                              name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="Pre-warm course indexes and suggested answers.")
+    ap.add_argument("courses", nargs="*", help="course slugs (default: every built course)")
+    ap.add_argument("--no-answers", action="store_true",
+                    help="only load indexes and cache query embeddings")
+    args = ap.parse_args(argv)
+
+    records = get_course_catalog().records()
+    unknown = sorted(set(args.courses) - set(records))
+    if unknown:
+        print(f"unknown or unbuilt course(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    warmer = Warmer(os.environ["MISTRAL_API_KEY"], answers=not args.no_answers)
+    for slug, rec in records.items():
+        if args.courses and slug not in args.courses:
+            continue
+        res = warmer.warm_course(rec)
+        print(f"{slug}: {res['questions']} questions warmed "
+              f"({res['already_cached']} already cached)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
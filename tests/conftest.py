@@ -0,0 +1,12 @@
+import pytest
+
+import src.metrics
+from src.metrics import MetricsStore
+
+
+@pytest.fixture(autouse=True)
+def metrics_store(tmp_path, monkeypatch):
+    """Spans go to a per-test log, never the live ``data/.cache/metrics``."""
+    store = MetricsStore(tmp_path / "metrics")
+    monkeypatch.setattr(src.metrics, "_STORE", store)
+    return store
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_store import write_synthetic_parquet
+from src.ann_index import IVFIndex, ann_path_for, build_ann_index
+from src.course_store import parquet_version
+from src.embedding_cache import EMBED_MODEL
+from src.embedding_store import write_store
+from src.retrieval import VectorIndex
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    course_dir = tmp_path_factory.mktemp("synth")
+    parquet_path = course_dir / "synth_pages.parquet"
+    write_synthetic_parquet(parquet_path, 5000, dim=32)
+    write_store(parquet_path)
+    base = VectorIndex.from_frame(pd.read_parquet(parquet_path, columns=["embedding"]))
+    rng = np.random.default_rng(3)
+    queries = base.matrix[rng.choice(len(base), 50)] \
+        + 0.3 * rng.standard_normal((50, base.dim)).astype(np.float32)
+    return course_dir, parquet_path, base, queries
+
+
+def recall_at_10(ivf, base, queries, nprobe):
+    exact, _ = base.search_batch(queries, 10)
+    approx, _ = ivf.search_batch(queries, 10, nprobe)
+    return np.mean([len(set(e) & set(a)) / 10 for e, a in zip(exact, approx)])
+
+
+@pytest.mark.parametrize("pq_m, floor", [(0, 0.9), (4, 0.85)])
+def test_recall_at_10_against_exact_search(store, pq_m, floor):
+    _, _, base, queries = store
+    ivf = IVFIndex.build(base, pq_m=pq_m)
+    low = recall_at_10(ivf, base, queries, nprobe=4)
+    high = recall_at_10(ivf, base, queries, nprobe=16)
+    assert high >= floor and high >= low
+    if not pq_m:                                          # probing every list is exact
+        assert recall_at_10(ivf, base, queries, nprobe=ivf.n_lists) == 1.0
+
+
+def test_search_batch_pads_short_candidate_lists(store):
+    _, _, base, queries = store
+    ivf = IVFIndex.build(base, n_lists=len(base) // 2)     # ~2 rows per list
+    rows, scores = ivf.search_batch(queries[:3], k=10, nprobe=1)
+    assert rows.shape == scores.shape == (3, 10)
+    assert (rows == -1).any() and np.isneginf(scores[rows == -1]).all()
+    assert (rows[:, 0] >= 0).all()
+
+
+def test_saved_index_only_loads_for_its_store(store):
+    course_dir, parquet_path, base, _ = store
+    out = build_ann_index(course_dir, min_pages=0)
+    assert out == ann_path_for(parquet_path)
+    version = parquet_version(parquet_path)
+    assert IVFIndex.load(out, base, embed_model=EMBED_MODEL, version=version) is not None
+    assert IVFIndex.load(out, base, embed_model="other-embed", version=version) is None
+    assert IVFIndex.load(out, base, embed_model=EMBED_MODEL, version="stale") is None
+
+
+def test_large_stores_get_pq_codes(store):
+    course_dir, parquet_path, base, _ = store
+    build_ann_index(course_dir, min_pages=0, pq_min_pages=len(base))
+    ivf = IVFIndex.load(ann_path_for(parquet_path), base)
+    assert ivf.codebooks is not None and ivf.codes.shape == (len(base), base.dim // 8)
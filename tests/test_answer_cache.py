@@ -0,0 +1,36 @@
+import numpy as np
+
+import src.answer_cache as ac
+from src.answer_cache import AnswerCache
+
+PAGES = [("Lecture_1.pdf", 3)]
+VEC = np.ones(4, dtype=np.float32)
+
+
+def test_hit_needs_same_version_pages_and_history(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    cache.store("econ", "v1", "q", VEC, PAGES, "answer", [{"n": 1}])
+    assert cache.lookup("econ", "v1", VEC, PAGES) == ("answer", [{"n": 1}])
+    assert cache.lookup("econ", "v2", VEC, PAGES) is None
+    assert cache.lookup("econ", "v1", VEC, [("Lecture_1.pdf", 4)]) is None
+    assert cache.lookup("econ", "v1", VEC, PAGES, history="user: hi") is None
+
+
+def test_processes_on_different_versions_do_not_purge_each_other(tmp_path):
+    old = AnswerCache(tmp_path / "answers.sqlite")
+    new = AnswerCache(tmp_path / "answers.sqlite")
+    old.store("econ", "v1", "q", VEC, PAGES, "old answer", [])
+    new.store("econ", "v2", "q", VEC, PAGES, "new answer", [])
+    old.store("econ", "v1", "q2", -VEC, PAGES, "other", [])
+    assert old.lookup("econ", "v1", VEC, PAGES)[0] == "old answer"
+    assert new.lookup("econ", "v2", VEC, PAGES)[0] == "new answer"
+
+
+def test_other_versions_expire_after_the_ttl(tmp_path, monkeypatch):
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    cache.store("econ", "v1", "q", VEC, PAGES, "old answer", [])
+    later = ac.time.time() + ac.STALE_VERSION_TTL_S + 1
+    monkeypatch.setattr(ac.time, "time", lambda: later)
+    cache.store("econ", "v2", "q", VEC, PAGES, "new answer", [])
+    assert cache.lookup("econ", "v1", VEC, PAGES) is None
+    assert cache.lookup("econ", "v2", VEC, PAGES)[0] == "new answer"
@@ -0,0 +1,43 @@
+import pytest
+
+from src.chat_history import ConversationMemory
+
+PREVIOUS = "Explain maximum likelihood estimation"
+
+
+@pytest.fixture
+def memory():
+    m = ConversationMemory()
+    m.update(PREVIOUS, "MLE picks the parameters that make the data most likely.")
+    return m
+
+
+@pytest.mark.parametrize("question", [
+    "What about slide 12?",
+    "how about for a normal distribution?",
+    "And the variance estimator?",
+    "So why is it biased?",
+    "It is consistent though, right?",
+    "This works for logistic regression too?",
+    "Can you explain that?",
+    "Give me an example of it.",
+    "How does the previous slide define likelihood?",
+    "More detail",
+])
+def test_follow_ups_borrow_the_previous_question(memory, question):
+    assert memory.retrieval_query(question) == f"{question} {PREVIOUS}"
+
+
+@pytest.mark.parametrize("question", [
+    "What are the key learning outcomes for this course?",
+    "When is the final exam and what does it cover in lecture 9?",
+    "Is that material covered on the midterm or only the final exam?",
+    "Why do we divide by n minus one in the sample variance?",
+    "How do these assumptions change for time series regressions?",
+])
+def test_standalone_questions_are_left_alone(memory, question):
+    assert memory.retrieval_query(question) == question
+
+
+def test_first_question_is_never_a_follow_up():
+    assert ConversationMemory().retrieval_query("What about slide 12?") == "What about slide 12?"
@@ -0,0 +1,54 @@
+import pandas as pd
+
+from src.context_packer import count_tokens, pack_context, split_passages
+
+PAGES = pd.DataFrame({
+    "filename": ["Lecture_3.pdf", "Lecture_4.pdf", "Lecture_5.pdf"],
+    "page_number": [2, 7, 1],
+    "page_content": [
+        "# Maximum likelihood\n\nThe MLE maximises the likelihood of the sample.\n\n"
+        "Unrelated housekeeping: office hours move to Friday.",
+        "# Regression\n\nOLS minimises squared residuals.",
+        "# Syllabus\n\nThe final exam is in week ten.",
+    ],
+    "similarity": [0.9, 0.6, 0.3],
+})
+
+
+def total_tokens(pages):
+    return sum(count_tokens(p) for text in pages["page_content"] for p in split_passages(text))
+
+
+def test_everything_fits_in_a_large_budget():
+    packed = pack_context("What is the MLE?", PAGES, budget=10_000)
+    assert packed.dropped_tokens == 0
+    assert packed.context_tokens == total_tokens(PAGES)
+    assert packed.pages["filename"].tolist() == PAGES["filename"].tolist()
+
+
+def test_tight_budget_is_honoured_and_dropped_tokens_add_up():
+    best = count_tokens(split_passages(PAGES["page_content"][0])[0])
+    packed = pack_context("What does the MLE maximise?", PAGES, budget=best)
+    assert packed.pages["filename"].tolist() == ["Lecture_3.pdf"]
+    assert packed.context_tokens == best
+    assert packed.dropped_tokens == total_tokens(PAGES) - best
+
+
+def test_passage_over_the_remaining_budget_is_skipped_not_truncated():
+    best = count_tokens(split_passages(PAGES["page_content"][0])[0])
+    packed = pack_context("What does the MLE maximise?", PAGES, budget=best - 1)
+    assert packed.pages["filename"].tolist() == ["Lecture_4.pdf", "Lecture_5.pdf"]
+    assert packed.context_tokens <= best - 1
+    assert packed.context_tokens + packed.dropped_tokens == total_tokens(PAGES)
+
+
+def test_kept_pages_stay_in_retrieval_order():
+    packed = pack_context("final exam and OLS", PAGES, budget=40)
+    order = [PAGES["filename"].tolist().index(f) for f in packed.pages["filename"]]
+    assert order == sorted(order)
+
+
+def test_zero_budget_keeps_nothing():
+    packed = pack_context("anything", PAGES, budget=0)
+    assert packed.pages.empty and packed.context_tokens == 0
+    assert packed.dropped_tokens == total_tokens(PAGES)
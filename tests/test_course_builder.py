@@ -0,0 +1,128 @@
+import time
+
+import pytest
+from mistralai import Mistral
+
+import src.course_builder as cb
+from benchmarks.fake_mistral import FakeMistral, Latency
+from src.course_builder import ConcurrentCourseBuilder, TokenBucket
+
+NO_LATENCY = Latency(embed_s=0.0, first_token_s=0.0, token_s=0.0, answer_tokens=1)
+
+
+@pytest.fixture
+def fake():
+    with FakeMistral(NO_LATENCY, dim=8) as server:
+        yield server
+
+
+def make_builder(fake, **kw) -> ConcurrentCourseBuilder:
+    kw = {"max_workers": 1, "requests_per_second": 1000.0, "base_delay": 0.01, **kw}
+    return ConcurrentCourseBuilder("x", client=Mistral(api_key="x", server_url=fake.url), **kw)
+
+
+def make_pdfs(tmp_path, *names):
+    d = tmp_path / "pdfs"
+    d.mkdir(exist_ok=True)
+    for name in names:
+        (d / name).write_bytes(f"%PDF {name}".encode())
+    return [d / name for name in names]
+
+
+def test_build_ocrs_embeds_and_deletes_uploads(fake, tmp_path):
+    df = make_builder(fake).build(make_pdfs(tmp_path, "Lecture_1.pdf", "Lecture_2.pdf"))
+    assert list(df["page_content"]) == ["Lecture_1.pdf p1", "Lecture_1.pdf p2",
+                                        "Lecture_2.pdf p1", "Lecture_2.pdf p2"]
+    assert all(len(e) == 8 for e in df["embedding"])
+    assert fake.files == {}
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_transient_errors_are_retried(fake, status):
+    builder = make_builder(fake)
+    fake.fail_next("embeddings", status, status)
+    vecs = builder.embed_texts(["a", "b"])
+    assert len(vecs) == 2
+    assert fake.requests["embeddings"] == 3
+    assert builder.stats.retries == 2 and builder.stats.api_calls == 3
+
+
+def test_retries_back_off_exponentially(fake, monkeypatch):
+    bounds = []
+    monkeypatch.setattr(cb.random, "uniform", lambda lo, hi: bounds.append(hi) or 0.0)
+    builder = make_builder(fake, base_delay=0.1, max_delay=0.3)
+    fake.fail_next("embeddings", 503, 503, 503)
+    builder.embed_texts(["a"])
+    assert bounds == pytest.approx([0.1, 0.2, 0.3])      # full jitter, capped at max_delay
+
+
+def test_retry_after_header_is_honoured(fake):
+    fake.retry_after = 0.3
+    builder = make_builder(fake, base_delay=0.0)
+    fake.fail_next("embeddings", 429)
+    t0 = time.monotonic()
+    builder.embed_texts(["a"])
+    assert time.monotonic() - t0 >= 0.3
+
+
+def test_gives_up_after_max_retries(fake):
+    builder = make_builder(fake, max_retries=2)
+    fake.fail_next("embeddings", 503, 503, 503)
+    with pytest.raises(Exception):
+        builder.embed_texts(["a"])
+    assert fake.requests["embeddings"] == 3
+
+
+def test_client_errors_are_not_retried(fake):
+    builder = make_builder(fake)
+    fake.fail_next("embeddings", 400)
+    with pytest.raises(Exception):
+        builder.embed_texts(["a"])
+    assert fake.requests["embeddings"] == 1 and builder.stats.retries == 0
+
+
+def test_upload_is_deleted_when_ocr_fails(fake, tmp_path):
+    fake.fail_next("ocr", 400)
+    with pytest.raises(Exception):
+        make_builder(fake).build(make_pdfs(tmp_path, "Lecture_1.pdf"))
+    assert fake.files == {}
+
+
+def test_token_bucket_paces_requests(fake, tmp_path):
+    builder = make_builder(fake)
+    builder.bucket = TokenBucket(rate=20.0, capacity=1.0)
+    builder.build(make_pdfs(tmp_path, "a.pdf", "b.pdf"))
+    times = [t for _, t in fake.calls]
+    assert len(times) == 2 * 4 + 1          # upload, url, ocr, delete per PDF + 1 embed
+    # 9 requests at 20/s with no burst: 8 gaps of 50 ms (arrival times jitter a bit)
+    assert times[-1] - times[0] >= 0.36
+
+
+def test_token_bucket_allows_burst_then_rate():
+    bucket = TokenBucket(rate=50.0, capacity=5.0)
+    t0 = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - t0 < 0.05
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - t0 >= 0.09
+
+
+def test_checkpoints_resume_an_interrupted_build(fake, tmp_path):
+    pdfs = make_pdfs(tmp_path, "Lecture_1.pdf", "Lecture_2.pdf")
+    ckpt = tmp_path / "ckpt"
+    fake.fail_next("ocr", 200, 400)           # second PDF fails: the build crashes
+    with pytest.raises(Exception):
+        make_builder(fake, checkpoint_dir=ckpt).build(pdfs)
+    assert fake.requests["ocr"] == 2 and fake.requests["embeddings"] == 0
+
+    resumed = make_builder(fake, checkpoint_dir=ckpt)
+    df = resumed.build(pdfs)
+    assert fake.requests["ocr"] == 3          # only Lecture_2 OCR'd again
+    assert resumed.resumed == 1 and len(df) == 4
+
+    again = make_builder(fake, checkpoint_dir=ckpt)
+    assert again.build(pdfs)["page_content"].tolist() == df["page_content"].tolist()
+    assert fake.requests["ocr"] == 3 and fake.requests["embeddings"] == 1
+    assert again.resumed == 3                 # both PDFs and the embedding batch
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.course_catalog import scan_course
+from src.course_snapshots import SnapshotInvalid, promote, retire, rollback, stage, validate
+from src.course_store import (MANIFEST_NAME, live_parquet, published, read_pointer,
+                              snapshot_dir)
+from src.embedding_store import MappedCourseStore, write_store
+from src.lexical_index import build_bm25_index
+
+
+def staged_snapshot(course_dir, pages: int):
+    staging = stage(course_dir)
+    df = pd.DataFrame({
+        "filename": ["Lecture_1.pdf"] * pages,
+        "page_number": list(range(1, pages + 1)),
+        "page_content": [f"page {i}" for i in range(pages)],
+        "file_path": [str(course_dir / "pdfs" / "Lecture_1.pdf")] * pages,
+        "embedding": [np.eye(4, dtype=np.float32)[i % 4] for i in range(pages)],
+    })
+    parquet_path = staging / f"{course_dir.name}_pages.parquet"
+    df.to_parquet(parquet_path, index=False)
+    (staging / MANIFEST_NAME).write_text(json.dumps(
+        {"files": {"Lecture_1.pdf": {"sha256": "x", "rows": pages}}} if pages else {"files": {}}))
+    write_store(parquet_path)
+    build_bm25_index(parquet_path)
+    return staging
+
+
+@pytest.fixture
+def course_dir(tmp_path):
+    d = tmp_path / "econ57"
+    (d / "pdfs").mkdir(parents=True)
+    return d
+
+
+def test_empty_store_is_written_but_never_valid(course_dir):
+    staging = staged_snapshot(course_dir, pages=0)
+    store = MappedCourseStore.open(staging / "econ57_pages.parquet")
+    assert store is not None and len(store.meta) == 0
+    with pytest.raises(SnapshotInvalid, match="no pages"):
+        validate(staging, "econ57")
+
+
+def test_retire_stops_serving_and_rollback_restores(course_dir):
+    first = staged_snapshot(course_dir, pages=3)
+    validate(first, "econ57")
+    version = promote(course_dir, first)
+
+    retire(course_dir)
+    assert live_parquet(course_dir) is None
+    assert read_pointer(course_dir) == {**read_pointer(course_dir),
+                                        "live": None, "previous": version}
+    assert not any(published(course_dir, p) for p in snapshot_dir(course_dir, version).iterdir())
+    rec = scan_course(course_dir)
+    assert rec.parquet_path is None and rec.previous == version
+
+    assert rollback(course_dir) == version
+    assert live_parquet(course_dir) == snapshot_dir(course_dir, version) / "econ57_pages.parquet"
+
+
+def test_promote_after_retire_keeps_the_retired_snapshot(course_dir):
+    first = promote(course_dir, staged_snapshot(course_dir, pages=2))
+    retire(course_dir)
+    second = promote(course_dir, staged_snapshot(course_dir, pages=4))
+    assert read_pointer(course_dir)["previous"] == first
+    assert snapshot_dir(course_dir, first).is_dir() and second != first
+
+
+def test_store_version_follows_promotions_not_uploads(course_dir):
+    first = staged_snapshot(course_dir, pages=3)
+    promote(course_dir, first)
+    version = scan_course(course_dir).store_version
+    (course_dir / "pdfs" / "Lecture_2.pdf").write_bytes(b"%PDF new upload")
+    assert scan_course(course_dir).store_version == version
+    second = promote(course_dir, staged_snapshot(course_dir, pages=4))
+    assert scan_course(course_dir).store_version == second != version
@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.embedding_cache import QueryEmbeddingCache
+
+VEC_BYTES = 4 * 4                                    # four float32s
+
+
+def counting_embed(calls):
+    def embed(texts):
+        calls.extend(texts)
+        return [np.full(4, len(t), np.float32) for t in texts]
+    return embed
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    cache = QueryEmbeddingCache(max_bytes=2 * VEC_BYTES)
+    cache.put("a", np.zeros(4))
+    cache.put("b", np.zeros(4))
+    assert cache.get("a") is not None                # "a" is now most recent
+    cache.put("c", np.zeros(4))                      # evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["entries"] == 2
+
+
+def test_trivial_variants_share_an_entry_and_misses_are_batched():
+    cache, calls = QueryEmbeddingCache(), []
+    cache.embed(["What is MLE?"], counting_embed(calls))
+    out = cache.embed(["what is  mle", "What is OLS?", "And IV?"], counting_embed(calls))
+    assert calls == ["What is MLE?", "What is OLS?", "And IV?"]
+    assert [v[0] for v in out] == [12, 12, 7]
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path, calls = tmp_path / "q.sqlite", []
+    QueryEmbeddingCache(disk_path=path).embed(["What is MLE?"], counting_embed(calls))
+
+    restarted = QueryEmbeddingCache(disk_path=path)
+    vec = restarted.embed(["what is mle"], counting_embed(calls))[0]
+    assert calls == ["What is MLE?"] and vec[0] == 12
+    assert restarted.disk_hits == 1 and restarted.misses == 0
+    restarted.get("what is mle")                     # promoted to the memory tier
+    assert restarted.hits == 1
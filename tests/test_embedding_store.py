@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_store import synthetic_course
+from src.embedding_cache import EMBED_MODEL, QueryEmbeddingCache
+from src.embedding_store import store_embed_model, store_paths, stored_dtype, write_store
+from src.index_cache import load_course_index
+
+
+def write_course(tmp_path, **kw):
+    parquet_path = tmp_path / "econ57_pages.parquet"
+    pd.DataFrame({
+        "filename": ["Lecture_1.pdf"] * 2, "page_number": [1, 2],
+        "page_content": ["supply", "demand"], "file_path": ["x", "x"],
+        "embedding": [np.array([1, 0], np.float32), np.array([0, 1], np.float32)],
+    }).to_parquet(parquet_path, index=False)
+    write_store(parquet_path, **kw)
+    return parquet_path
+
+
+def test_store_records_its_embedding_model(tmp_path):
+    parquet_path = write_course(tmp_path, embed_model="mistral-embed-2")
+    assert store_embed_model(parquet_path) == "mistral-embed-2"
+    assert load_course_index("econ57", parquet_path).embed_model == "mistral-embed-2"
+
+
+def test_stores_without_the_field_use_the_default_model(tmp_path):
+    parquet_path = write_course(tmp_path)
+    info_path = store_paths(parquet_path)["info"]
+    info = json.loads(info_path.read_text())
+    del info["embed_model"]
+    info_path.write_text(json.dumps(info))
+    assert store_embed_model(parquet_path) == EMBED_MODEL
+
+
+def test_query_cache_keeps_models_apart():
+    cache, calls = QueryEmbeddingCache(), []
+
+    def embed_with(model):
+        def embed(texts):
+            calls.append(model)
+            return [np.full(2, len(calls), np.float32) for _ in texts]
+        return embed
+
+    a = cache.embed(["what is MLE"], embed_with("a"), model="a")[0]
+    b = cache.embed(["what is MLE"], embed_with("b"), model="b")[0]
+    assert calls == ["a", "b"] and not np.array_equal(a, b)
+    assert np.array_equal(cache.embed(["what is MLE"], embed_with("a"), model="a")[0], a)
+    assert calls == ["a", "b"]
+
+
+def test_synthetic_course_rewrites_store_in_the_requested_dtype(tmp_path):
+    parquet_path = synthetic_course(tmp_path, 64, dim=8)
+    assert stored_dtype(parquet_path) == "float32"
+    assert stored_dtype(synthetic_course(tmp_path, 64, dim=8, store_dtype="float16")) == "float16"
@@ -0,0 +1,211 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.github_publisher import GitHubPublisher, git_blob_sha
+
+
+class FakeGitHub:
+    """In-memory Git Data API for one repo and branch; use as a context manager."""
+
+    def __init__(self, files: dict[str, bytes] | None = None, branch: str = "main"):
+        self.blobs: dict[str, bytes] = {}
+        self.trees: dict[str, dict[str, str]] = {}
+        self.commits: dict[str, dict] = {}
+        self.requests: list[tuple[str, str]] = []
+        tree = self._tree({path: self._blob(data) for path, data in (files or {}).items()})
+        self.refs = {branch: self._commit(tree, [], "initial")}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "FakeGitHub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _blob(self, data: bytes) -> str:
+        sha = git_blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def _tree(self, paths: dict[str, str]) -> str:
+        sha = hashlib.sha1(json.dumps(sorted(paths.items())).encode()).hexdigest()
+        self.trees[sha] = dict(paths)
+        return sha
+
+    def _commit(self, tree: str, parents: list[str], message: str) -> str:
+        sha = hashlib.sha1(json.dumps([tree, parents, message, len(self.commits)]).encode()
+                           ).hexdigest()
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        return sha
+
+    def files(self, branch: str = "main") -> dict[str, bytes]:
+        tree = self.trees[self.commits[self.refs[branch]]["tree"]]
+        return {path: self.blobs[sha] for path, sha in tree.items()}
+
+    def count(self, method: str, pattern: str) -> int:
+        return sum(1 for m, p in self.requests if m == method and re.search(pattern, p))
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, obj: dict, status: int = 200) -> None:
+                body = json.dumps(obj).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _route(self, method: str):
+                path = self.path.split("?", 1)[0]
+                fake.requests.append((method, path))
+                body = (json.loads(self.rfile.read(int(self.headers["content-length"])))
+                        if self.headers.get("content-length") else None)
+                m = re.fullmatch(r"/repos/[^/]+/[^/]+/git/(.+)", path)
+                route = m.group(1) if m else ""
+                if method == "GET" and route.startswith("ref/heads/"):
+                    return self._json({"object": {"sha": fake.refs[route[len("ref/heads/"):]]}})
+                if method == "GET" and route.startswith("commits/"):
+                    sha = route[len("commits/"):]
+                    return self._json({"sha": sha, "tree": {"sha": fake.commits[sha]["tree"]}})
+                if method == "GET" and route.startswith("trees/"):
+                    sha = route[len("trees/"):]
+                    paths = fake.trees[sha]
+                    dirs = {p.rsplit("/", 1)[0] for p in paths if "/" in p}
+                    entries = ([{"path": d, "type": "tree", "sha": "0" * 40} for d in dirs]
+                               + [{"path": p, "type": "blob", "sha": s} for p, s in paths.items()])
+                    return self._json({"sha": sha, "tree": entries, "truncated": False})
+                if method == "POST" and route == "blobs":
+                    return self._json({"sha": fake._blob(base64.b64decode(body["content"]))}, 201)
+                if method == "POST" and route == "trees":
+                    paths = dict(fake.trees[body["base_tree"]])
+                    for e in body["tree"]:
+                        if e["sha"] is None:
+                            paths.pop(e["path"], None)
+                        else:
+                            paths[e["path"]] = e["sha"]
+                    return self._json({"sha": fake._tree(paths)}, 201)
+                if method == "POST" and route == "commits":
+                    return self._json({"sha": fake._commit(body["tree"], body["parents"],
+                                                           body["message"])}, 201)
+                if method == "PATCH" and route.startswith("refs/heads/"):
+                    fake.refs[route[len("refs/heads/"):]] = body["sha"]
+                    return self._json({"object": {"sha": body["sha"]}})
+                self._json({"message": "Not Found"}, 404)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PATCH(self):
+                self._route("PATCH")
+
+        return Handler
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = tmp_path / "repo"
+    course = root / "data" / "econ57"
+    (course / "pdfs").mkdir(parents=True)
+    (course / "pdfs" / "Lecture_1.pdf").write_bytes(b"%PDF one")
+    (course / "pdfs" / "Lecture_2.pdf").write_bytes(b"%PDF two")
+    (course / "meta.json").write_text('{"title": "ECON 57"}')
+    return root, course
+
+
+@pytest.fixture
+def github():
+    remote = {"README.md": b"hello", "data/cs101/meta.json": b"{}"}
+    with FakeGitHub(remote) as server:
+        yield server
+
+
+def publisher(github) -> GitHubPublisher:
+    return GitHubPublisher("owner/repo", "token", api=github.url)
+
+
+def test_sync_is_one_tree_and_one_commit(github, repo):
+    root, course = repo
+    sha = publisher(github).sync_directory(course, root, "publish econ57")
+    assert github.refs["main"] == sha
+    assert github.count("POST", "/git/blobs$") == 3
+    assert github.count("POST", "/git/trees$") == 1
+    assert github.count("POST", "/git/commits$") == 1
+    assert github.count("PATCH", "/git/refs/heads/main$") == 1
+    files = github.files()
+    assert files["data/econ57/pdfs/Lecture_1.pdf"] == b"%PDF one"
+    assert files["README.md"] == b"hello" and files["data/cs101/meta.json"] == b"{}"
+
+
+def test_unchanged_sync_is_a_no_op(github, repo):
+    root, course = repo
+    publisher(github).sync_directory(course, root, "publish")
+    github.requests.clear()
+    assert publisher(github).sync_directory(course, root, "again") is None
+    assert github.count("POST", "") == 0 and github.count("PATCH", "") == 0
+
+
+def test_only_changed_blobs_are_uploaded(github, repo):
+    root, course = repo
+    publisher(github).sync_directory(course, root, "publish")
+    (course / "meta.json").write_text('{"title": "ECON 57 (Fall)"}')
+    (course / "pdfs" / "Lecture_3.pdf").write_bytes(b"%PDF three")
+    github.requests.clear()
+    publisher(github).sync_directory(course, root, "update")
+    assert github.count("POST", "/git/blobs$") == 2
+    assert github.count("POST", "/git/trees$") == 1
+    assert github.count("POST", "/git/commits$") == 1
+    assert github.files()["data/econ57/meta.json"] == b'{"title": "ECON 57 (Fall)"}'
+
+
+def test_deletions_stay_under_the_prefix(github, repo):
+    root, course = repo
+    publisher(github).sync_directory(course, root, "publish")
+    (course / "pdfs" / "Lecture_2.pdf").unlink()
+    github.requests.clear()
+    publisher(github).sync_directory(course, root, "remove lecture 2")
+    assert github.count("POST", "/git/blobs$") == 0
+    assert github.count("POST", "/git/commits$") == 1
+    files = github.files()
+    assert "data/econ57/pdfs/Lecture_2.pdf" not in files
+    assert "data/econ57/pdfs/Lecture_1.pdf" in files
+    assert "README.md" in files and "data/cs101/meta.json" in files
+
+
+def test_excluded_files_are_deleted_remotely(github, repo):
+    root, course = repo
+    publisher(github).sync_directory(course, root, "publish")
+    publisher(github).sync_directory(course, root, "meta only",
+                                     include=lambda p: p.name == "meta.json")
+    assert sorted(p for p in github.files() if p.startswith("data/econ57/")) == [
+        "data/econ57/meta.json"]
+
+
+def test_delete_directory(github, repo):
+    root, course = repo
+    publisher(github).sync_directory(course, root, "publish")
+    github.requests.clear()
+    publisher(github).delete_directory("data/econ57", "drop econ57")
+    assert github.count("POST", "/git/commits$") == 1
+    assert sorted(github.files()) == ["README.md", "data/cs101/meta.json"]
@@ -0,0 +1,159 @@
+import json
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+try:
+    import src.precompute_embeddings  # noqa: F401
+except ImportError:
+    # only the sequential path (max_workers=None) needs it; these tests never take it
+    stub = types.ModuleType("src.precompute_embeddings")
+    stub.process_course = lambda *a, **kw: pytest.fail("sequential builder used")
+    sys.modules["src.precompute_embeddings"] = stub
+
+import src.incremental_build as ib
+from benchmarks.fake_mistral import FakeMistral, Latency
+from src.course_store import live_parquet, read_pointer
+from src.embedding_cache import PageEmbeddingCache
+
+NO_LATENCY = Latency(embed_s=0.0, first_token_s=0.0, token_s=0.0, answer_tokens=1)
+
+
+@pytest.fixture
+def fake():
+    with FakeMistral(NO_LATENCY, dim=8) as server:
+        yield server
+
+
+@pytest.fixture
+def course_dir(tmp_path, monkeypatch):
+    cache = PageEmbeddingCache(tmp_path / "page_cache.sqlite")
+    monkeypatch.setattr(ib, "get_page_embedding_cache", lambda: cache)
+    d = tmp_path / "econ57"
+    (d / "pdfs").mkdir(parents=True)
+    return d
+
+
+def write_pdf(course_dir, name, body="v1"):
+    path = course_dir / "pdfs" / name
+    path.write_bytes(f"%PDF {name} {body}".encode())
+    # distinct mtimes, so the size + mtime shortcut never hides a content change
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def update(fake, course_dir, **kw):
+    return ib.update_course(course_dir, "x", max_workers=2, server_url=fake.url, **kw)
+
+
+def live_rows(course_dir):
+    df = ib.expand_duplicates(pd.read_parquet(live_parquet(course_dir)))
+    return sorted(zip(df["filename"], df["page_number"]))
+
+
+def test_classifies_added_updated_unchanged_removed(fake, course_dir):
+    write_pdf(course_dir, "Lecture_1.pdf")
+    write_pdf(course_dir, "Lecture_2.pdf")
+    first = update(fake, course_dir)
+    assert first["added"] == ["Lecture_1.pdf", "Lecture_2.pdf"] and first["pages"] == 4
+
+    fake.requests["ocr"] = 0
+    again = update(fake, course_dir)
+    assert again["unchanged"] == ["Lecture_1.pdf", "Lecture_2.pdf"]
+    assert again["added"] == again["updated"] == again["removed"] == []
+    assert fake.requests["ocr"] == 0 and again["version"] == first["version"]
+
+    fake.ocr_pages = 3
+    write_pdf(course_dir, "Lecture_1.pdf", body="v2")
+    write_pdf(course_dir, "Lecture_3.pdf")
+    (course_dir / "pdfs" / "Lecture_2.pdf").unlink()
+    changed = update(fake, course_dir)
+    assert (changed["added"], changed["updated"], changed["removed"], changed["unchanged"]) \
+        == (["Lecture_3.pdf"], ["Lecture_1.pdf"], ["Lecture_2.pdf"], [])
+    assert fake.requests["ocr"] == 2
+    assert live_rows(course_dir) == [("Lecture_1.pdf", p) for p in (1, 2, 3)] \
+        + [("Lecture_3.pdf", p) for p in (1, 2, 3)]
+
+
+def test_legacy_store_without_manifest_is_adopted_not_reocrd(fake, course_dir):
+    write_pdf(course_dir, "Lecture_1.pdf")
+    write_pdf(course_dir, "Lecture_2.pdf")
+    pd.DataFrame({
+        "filename": ["Lecture_1.pdf"] * 2, "page_number": [1, 2],
+        "page_content": ["legacy p1", "legacy p2"],
+        "file_path": [str(course_dir / "pdfs" / "Lecture_1.pdf")] * 2,
+        "embedding": list(np.eye(8, dtype=np.float32)[:2]),
+    }).to_parquet(course_dir / "econ57_pages.parquet", index=False)
+
+    summary = update(fake, course_dir)
+    assert summary["unchanged"] == ["Lecture_1.pdf"] and summary["added"] == ["Lecture_2.pdf"]
+    assert fake.requests["ocr"] == 1
+    assert live_rows(course_dir) == [("Lecture_1.pdf", 1), ("Lecture_1.pdf", 2),
+                                     ("Lecture_2.pdf", 1), ("Lecture_2.pdf", 2)]
+
+
+def test_pdf_without_pages_is_not_reocrd(fake, course_dir):
+    write_pdf(course_dir, "Lecture_1.pdf")
+    update(fake, course_dir)
+    fake.ocr_pages = 0
+    write_pdf(course_dir, "blank.pdf")
+    assert update(fake, course_dir)["added"] == ["blank.pdf"]
+
+    fake.requests["ocr"] = 0
+    again = update(fake, course_dir)
+    assert again["unchanged"] == ["Lecture_1.pdf", "blank.pdf"] and again["added"] == []
+    assert fake.requests["ocr"] == 0
+
+
+def test_embed_model_change_forces_full_rebuild(fake, course_dir):
+    write_pdf(course_dir, "Lecture_1.pdf")
+    write_pdf(course_dir, "Lecture_2.pdf")
+    update(fake, course_dir)
+    info_path = live_parquet(course_dir).with_name("econ57_store.json")
+    info = json.loads(info_path.read_text())
+    info_path.write_text(json.dumps({**info, "embed_model": "older-embed"}))
+
+    fake.requests["ocr"] = 0
+    summary = update(fake, course_dir)
+    assert summary["updated"] == ["Lecture_1.pdf", "Lecture_2.pdf"]
+    assert fake.requests["ocr"] == 2
+
+
+def test_deleting_the_last_pdf_retires_the_course(fake, course_dir):
+    write_pdf(course_dir, "Lecture_1.pdf")
+    first = update(fake, course_dir)
+    (course_dir / "pdfs" / "Lecture_1.pdf").unlink()
+
+    summary = update(fake, course_dir)
+    assert summary["removed"] == ["Lecture_1.pdf"] and summary["version"] is None
+    assert live_parquet(course_dir) is None
+    assert read_pointer(course_dir)["previous"] == first["version"]
+
+
+def test_dedupe_pages_round_trips_through_expand_duplicates():
+    df = pd.DataFrame({
+        "filename": ["Lecture_1.pdf"] * 3 + ["Lecture_2.pdf"] * 2,
+        "page_number": [1, 2, 3, 1, 2],
+        "page_content": ["Thanks!", "MLE", "thanks! ![logo](img.png)", "Thanks!", "OLS"],
+        "file_path": ["pdfs/Lecture_1.pdf"] * 3 + ["pdfs/Lecture_2.pdf"] * 2,
+        "embedding": list(np.eye(5, 4, dtype=np.float32)),
+    })
+    unique = ib.dedupe_pages(df)
+    # only repeats within one PDF fold; Lecture_2's "Thanks!" keeps its own row
+    assert list(zip(unique["filename"], unique["page_number"])) == [
+        ("Lecture_1.pdf", 1), ("Lecture_1.pdf", 2), ("Lecture_2.pdf", 1), ("Lecture_2.pdf", 2)]
+    assert unique["duplicates"].tolist() == [["Lecture_1.pdf#3"], [], [], []]
+
+    back = ib.expand_duplicates(unique).sort_values(["filename", "page_number"])
+    assert list(zip(back["filename"], back["page_number"])) \
+        == list(zip(df["filename"], df["page_number"]))
+    restored = back.set_index(["filename", "page_number"]).loc[("Lecture_1.pdf", 3)]
+    assert restored.page_content == "Thanks!" and restored.file_path == "pdfs/Lecture_1.pdf"
+    assert "duplicates" not in back
+    # deduping an already deduped frame is a no-op
+    again = ib.dedupe_pages(unique)
+    assert again["duplicates"].tolist() == unique["duplicates"].tolist()
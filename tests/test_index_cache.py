@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from src.embedding_store import write_store
+from src.index_cache import CourseIndexCache
+
+
+def write_course(root, slug, pages=4):
+    course_dir = root / slug
+    course_dir.mkdir()
+    parquet_path = course_dir / f"{slug}_pages.parquet"
+    pd.DataFrame({
+        "filename": ["Lecture_1.pdf"] * pages, "page_number": range(1, pages + 1),
+        "page_content": [f"{slug} page {i}" for i in range(pages)],
+        "file_path": ["x"] * pages,
+        "embedding": list(np.eye(pages, 4, dtype=np.float32)),
+    }).to_parquet(parquet_path, index=False)
+    write_store(parquet_path)
+    return parquet_path
+
+
+def test_least_recently_used_course_is_evicted_over_budget(tmp_path):
+    paths = {slug: write_course(tmp_path, slug) for slug in ("a", "b", "c")}
+    cache = CourseIndexCache()
+    size = cache.get("a", paths["a"]).nbytes
+    cache.budget_bytes = 2 * size
+
+    cache.get("b", paths["b"])
+    cache.get("a", paths["a"])                       # "b" is now least recent
+    cache.get("c", paths["c"])
+    stats = cache.stats()
+    assert stats["courses"] == ["a", "c"] and stats["evictions"] == 1
+    assert cache.resident_bytes <= cache.budget_bytes
+    assert stats["loads"] == 3 and stats["hits"] == 1
+
+
+def test_course_larger_than_the_budget_stays_resident(tmp_path):
+    cache = CourseIndexCache(budget_mb=0)
+    a, b = write_course(tmp_path, "a"), write_course(tmp_path, "b")
+    cache.get("a", a)
+    entry = cache.get("b", b)
+    assert cache.stats()["courses"] == ["b"]
+    assert cache.get("b", b) is entry
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import src.jobs as jobs
+from src.jobs import JobQueue, ensure_worker
+
+
+def test_claim_and_cancel_never_both_win(tmp_path):
+    for i in range(30):
+        worker, admin = JobQueue(tmp_path), JobQueue(tmp_path)
+        job = admin.submit(f"course{i}")
+        start, claimed = threading.Barrier(2), []
+
+        def claim():
+            start.wait()
+            claimed.append(worker.claim())
+
+        def cancel():
+            start.wait()
+            admin.cancel(job["id"])
+
+        threads = [threading.Thread(target=claim), threading.Thread(target=cancel)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        final = admin.get(job["id"])
+        if claimed[0] is None:
+            assert final["status"] == "cancelled"
+        else:
+            # the worker owns it; cancelling went through the .cancel flag instead
+            assert final["status"] == "running" and admin.cancel_requested(job["id"])
+
+
+def test_job_with_stale_heartbeat_is_requeued(tmp_path, monkeypatch):
+    queue = JobQueue(tmp_path)
+    queue.submit("econ57")
+    queue.submit("econ101")
+    old, fresh = queue.claim(), queue.claim()
+    jobs._write_json_atomic(queue._path(old["id"]), {**old, "heartbeat": time.time() - 60})
+
+    # the dead worker's pid was reused, so only the heartbeat gives it away
+    monkeypatch.setattr(queue, "worker_pid", lambda: 4242)
+    assert ensure_worker(queue, {}) == 4242
+    assert queue.get(old["id"])["status"] == "queued"
+    assert queue.get(old["id"])["errors"]
+    assert queue.get(fresh["id"])["status"] == "running"
+    assert queue.claim()["id"] == old["id"] and queue.get(old["id"])["attempts"] == 2
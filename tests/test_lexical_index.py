@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from src.hybrid_search import rrf
+from src.lexical_index import BM25Index
+
+DOCS = ["maximum likelihood estimation", "likelihood ratio test likelihood",
+        "ordinary least squares regression", ""]
+
+
+def reference_bm25(docs, query, k1=1.5, b=0.75):
+    toks = [d.split() for d in docs]
+    avgdl = np.mean([len(t) for t in toks])
+    out = []
+    for t in toks:
+        s = 0.0
+        for term in set(query.split()):
+            df = sum(term in d for d in toks)
+            tf = t.count(term)
+            if df and tf:
+                idf = np.log1p((len(docs) - df + 0.5) / (df + 0.5))
+                s += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(t) / avgdl))
+        out.append(s)
+    return out
+
+
+@pytest.mark.parametrize("query", ["likelihood", "maximum likelihood", "regression test"])
+def test_scores_match_the_bm25_formula(query):
+    index = BM25Index.build(DOCS)
+    assert index.scores(query) == pytest.approx(reference_bm25(DOCS, query), rel=1e-5)
+
+
+def test_search_ranks_and_round_trips(tmp_path):
+    index = BM25Index.build(DOCS)
+    rows, scores = index.search("maximum likelihood", k=2)
+    assert rows.tolist() == [0, 1] and scores[0] > scores[1] > 0
+    assert index.scores("unknown words").tolist() == [0.0] * len(DOCS)
+
+    index.save(tmp_path / "x_bm25.npz")
+    loaded = BM25Index.load(tmp_path / "x_bm25.npz", len(DOCS))
+    assert loaded.scores("likelihood") == pytest.approx(index.scores("likelihood"))
+    assert BM25Index.load(tmp_path / "x_bm25.npz", len(DOCS) + 1) is None
+
+
+def test_rrf_orders_by_summed_reciprocal_rank():
+    dense, lexical = np.array([1, 2, 3]), np.array([3, 1, 4])
+    fused = rrf([dense, lexical], k=4)
+    assert fused.tolist() == [1, 3, 2, 4]
+    # a page both rankings agree on beats one ranked first by only one of them
+    assert rrf([np.array([7, 5]), np.array([8, 5])], k=1).tolist() == [5]
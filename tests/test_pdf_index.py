@@ -0,0 +1,29 @@
+import hashlib
+
+from src.course_catalog import scan_course
+from src.course_store import published
+from src.pdf_index import PdfHashIndex, index_path_for
+
+
+def test_index_lives_outside_the_published_course(tmp_path):
+    course_dir = tmp_path / "econ57"
+    (course_dir / "pdfs").mkdir(parents=True)
+    data = b"%PDF lecture one"
+    sha = hashlib.sha256(data).hexdigest()
+    PdfHashIndex(course_dir).add("Lecture_1.pdf", data, sha)
+
+    assert index_path_for(course_dir).is_file()
+    assert not (course_dir / "pdf_index.json").exists()
+    assert scan_course(course_dir).bytes == len(data)
+    assert PdfHashIndex(course_dir).lookup(sha) == "Lecture_1.pdf"
+
+
+def test_legacy_index_is_moved_and_never_published(tmp_path):
+    course_dir = tmp_path / "econ57"
+    (course_dir / "pdfs").mkdir(parents=True)
+    legacy = course_dir / "pdf_index.json"
+    legacy.write_text('{"files": {}}')
+    assert not published(course_dir, legacy)
+
+    PdfHashIndex(course_dir)
+    assert not legacy.exists() and index_path_for(course_dir).is_file()
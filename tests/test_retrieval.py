@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.retrieval import VectorIndex
+
+
+def brute_force(emb, q, k):
+    sims = [float(e @ q / (np.linalg.norm(e) * np.linalg.norm(q))) for e in emb]
+    return sorted(range(len(emb)), key=lambda i: -sims[i])[:k], sorted(sims, reverse=True)[:k]
+
+
+@pytest.mark.parametrize("k", [1, 5, 200])
+def test_top_k_matches_brute_force(k):
+    rng = np.random.default_rng(0)
+    emb = rng.standard_normal((200, 16)).astype(np.float32)
+    index = VectorIndex(emb)
+    for q in rng.standard_normal((5, 16)).astype(np.float32):
+        rows, sims = index.search(q, k=k)
+        want_rows, want_sims = brute_force(emb, q, k)
+        assert rows.tolist() == want_rows
+        assert sims == pytest.approx(want_sims, abs=1e-5)
+
+
+def test_batch_equals_single_queries_and_clamps_k():
+    rng = np.random.default_rng(1)
+    index = VectorIndex(rng.standard_normal((7, 4)))
+    queries = rng.standard_normal((3, 4))
+    rows, sims = index.search_batch(queries, k=10)
+    assert rows.shape == sims.shape == (3, 7)
+    for q, r in zip(queries, rows):
+        assert index.search(q, k=10)[0].tolist() == r.tolist()
+
+
+def test_zero_vectors_and_empty_frames_do_not_produce_nan():
+    index = VectorIndex(np.array([[0.0, 0.0], [1.0, 0.0]]))
+    rows, sims = index.search([1.0, 0.0], k=2)
+    assert rows.tolist() == [1, 0] and not np.isnan(sims).any()
+    empty = VectorIndex.from_frame(pd.DataFrame({"embedding": []}))
+    rows, sims = empty.search_batch(np.zeros((2, 3)), k=5)
+    assert rows.shape == sims.shape == (2, 0)
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import src.warmup as warmup
+from src.answer_cache import AnswerCache
+from src.course_catalog import CourseRecord
+from src.index_cache import CourseIndex
+from src.lexical_index import BM25Index
+from src.retrieval import VectorIndex
+
+
+def record(slug: str, version: str) -> CourseRecord:
+    return CourseRecord(slug, slug.upper(), None, 10, 1, 0, "v", version, 0.0)
+
+
+class FakeCatalog:
+    def __init__(self, *records):
+        self.by_slug = {r.slug: r for r in records}
+
+    def records(self):
+        return self.by_slug
+
+
+@pytest.fixture
+def warm(monkeypatch):
+    """``start_warmup`` with a fake catalog and warm-up that fails while ``broken``."""
+    calls, state = [], {"broken": True}
+    monkeypatch.setattr(warmup, "_WARMED", {})
+    monkeypatch.setattr(warmup, "_WARMING", set())
+    monkeypatch.setattr(warmup, "_FAILED", {})
+    monkeypatch.setattr(warmup, "Warmer", lambda api_key, answers=True: FakeWarmer())
+
+    class FakeWarmer:
+        def warm_course(self, rec):
+            calls.append(rec.slug)
+            if state["broken"]:
+                raise RuntimeError("mistral down")
+
+    def start(*records, now=0.0):
+        monkeypatch.setattr(warmup, "get_course_catalog", lambda: FakeCatalog(*records))
+        monkeypatch.setattr(warmup, "time", SimpleNamespace(monotonic=lambda: now))
+        thread = warmup.start_warmup("key")
+        if thread is not None:
+            thread.join()
+        return thread is not None
+
+    return start, calls, state
+
+
+def test_failed_course_backs_off_instead_of_retrying_every_rerun(warm):
+    start, calls, state = warm
+    econ = record("econ57", "v1")
+    assert start(econ, now=0.0)
+    assert not start(econ, now=1.0) and not start(econ, now=59.0)
+    assert start(econ, now=61.0)                         # first retry after 60 s
+    assert not start(econ, now=61.0 + 100.0)             # then 120 s
+    state["broken"] = False
+    assert start(econ, now=61.0 + 121.0)
+    assert not start(econ, now=10_000.0)                 # warm: never again for v1
+    assert calls == ["econ57"] * 3
+
+
+def test_new_store_version_is_tried_immediately(warm):
+    start, calls, _ = warm
+    assert start(record("econ57", "v1"), now=0.0)
+    assert start(record("econ57", "v2"), now=1.0)
+    assert calls == ["econ57", "econ57"]
+
+
+def test_keyword_path_question_is_pre_answered(tmp_path):
+    df = pd.DataFrame({
+        "filename": ["Lecture_3.pdf", "Lecture_3.pdf", "Lecture_4.pdf"],
+        "page_number": [1, 2, 1],
+        "page_content": ["MLE: maximum likelihood estimation", "the likelihood", "OLS"],
+        "embedding": list(np.eye(3, dtype=np.float32)),
+    })
+    course_index = CourseIndex("econ57", "v", VectorIndex.from_frame(df), None, 0, df=df,
+                               bm25=BM25Index.build(df["page_content"]), store_version="s1")
+    streamed = []
+
+    class FakeStreamer:
+        def stream(self, question, pages, course):
+            streamed.append(list(pages["filename"]))
+            return FakeStream()
+
+    class FakeStream:
+        answer, numbered_sources = "MLE [1]", []
+
+        def __iter__(self):
+            yield "MLE [1]"
+
+    warmer = warmup.Warmer.__new__(warmup.Warmer)
+    warmer.answers, warmer.streamer = True, FakeStreamer()
+    warmer.query_cache = None                        # the keyword path never embeds
+    warmer.answer_cache = AnswerCache(tmp_path / "answers.sqlite")
+    question = "Explain the concept of MLE from lecture 3"
+
+    rec = record("econ57", "s1")
+    assert warmer.warm_question(rec, course_index, question) is False
+    assert warmer.warm_question(rec, course_index, question) is True
+    assert streamed == [["Lecture_3.pdf", "Lecture_3.pdf"]]
+    # the Chat page's lookup for the same question (no query vector) hits
+    pages = [("Lecture_3.pdf", 1), ("Lecture_3.pdf", 2)]
+    assert warmer.answer_cache.lookup("econ57", "s1", None, pages, question=question) \
+        == ("MLE [1]", [])